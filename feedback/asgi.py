@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'feedback.settings')
+# use the async views from feedback_app.async_views
+os.environ.setdefault('FEEDBACK_ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
@@ -48,11 +48,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so the timings cover the whole middleware stack (see /metrics/)
+    'feedback_app.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # 429 for bursts on the submit / login / register POSTs (RATELIMITS below)
+    'feedback_app.ratelimit.RateLimitMiddleware',
+    # per-request replica routing, and primary stickiness after a write (DATABASE_REPLICAS below)
+    'feedback_app.routers.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -61,7 +67,8 @@ ROOT_URLCONF = 'feedback.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates + render timing for the /metrics/ endpoint
+        'BACKEND': 'feedback_app.metrics.TimedDjangoTemplates',
         'DIRS': ['templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -103,6 +110,27 @@ DATABASES = {
     }
 }
 
+# Read replicas of 'default' (comma-separated hosts, same credentials), for the dashboard,
+# its exports and My Feedback; see feedback_app/routers.py
+DATABASE_REPLICAS = []
+for _i, _host in enumerate(filter(None, os.getenv('MYSQL_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{_i}'] = {**DATABASES['default'], 'HOST': _host.strip(), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{_i}')
+# Optional sharding of feedback by user across 'default' plus these databases (comma-separated
+# hosts, same credentials and database name); see feedback_app/sharding.py. Fixed once rows exist.
+FEEDBACK_SHARDS = []
+for _i, _host in enumerate(filter(None, os.getenv('MYSQL_SHARD_HOSTS', '').split(',')), 1):
+    DATABASES[f'shard{_i}'] = {**DATABASES['default'], 'HOST': _host.strip()}
+    FEEDBACK_SHARDS.append(f'shard{_i}')
+if FEEDBACK_SHARDS:
+    FEEDBACK_SHARDS.insert(0, 'default')
+DATABASE_ROUTERS = ['feedback_app.sharding.ShardRouter', 'feedback_app.routers.ReplicaRouter']
+# a replica further behind than this is skipped until it catches up (checked every CHECK_SECONDS)
+DATABASE_REPLICA_MAX_LAG = int(os.getenv('DATABASE_REPLICA_MAX_LAG', '5'))
+DATABASE_REPLICA_CHECK_SECONDS = 5
+# after a write the user's reads stay on the primary this long; keep it above MAX_LAG
+DATABASE_PRIMARY_STICKY_SECONDS = int(os.getenv('DATABASE_PRIMARY_STICKY_SECONDS', '15'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -145,3 +173,79 @@ STATICFILES_DIRS = ['static']
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Feedback write path: "direct" = one INSERT per submission,
+# "buffered" = append to a local spool file, flushed in batches by
+# `python manage.py flush_feedback_spool --loop` (must run on the same host)
+FEEDBACK_INGEST_MODE = os.getenv('FEEDBACK_INGEST_MODE', 'direct')
+FEEDBACK_SPOOL_PATH = Path(os.getenv('FEEDBACK_SPOOL_PATH', BASE_DIR / 'var' / 'feedback_spool.sqlite3'))
+FEEDBACK_SPOOL_BATCH_SIZE = int(os.getenv('FEEDBACK_SPOOL_BATCH_SIZE', '500'))
+FEEDBACK_SPOOL_FLUSH_INTERVAL = float(os.getenv('FEEDBACK_SPOOL_FLUSH_INTERVAL', '2'))
+
+# Bearer tokens accepted by the NDJSON bulk import endpoint (comma separated)
+FEEDBACK_IMPORT_TOKENS = [t.strip() for t in os.getenv('FEEDBACK_IMPORT_TOKENS', '').split(',') if t.strip()]
+FEEDBACK_IMPORT_CHUNK_SIZE = int(os.getenv('FEEDBACK_IMPORT_CHUNK_SIZE', '1000'))
+
+# Feedback older than this is moved to the archive tables by
+# `python manage.py archive_feedback` (run it daily); lists include it with ?archive=1
+FEEDBACK_ARCHIVE_AFTER_DAYS = int(os.getenv('FEEDBACK_ARCHIVE_AFTER_DAYS', '365'))
+FEEDBACK_ARCHIVE_BATCH_SIZE = int(os.getenv('FEEDBACK_ARCHIVE_BATCH_SIZE', '500'))
+
+# Rate limits for POSTs to these URL names, as (key, "requests/period") rules;
+# key "ip" = per client address, "user" = per logged-in user. See feedback_app/ratelimit.py.
+RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+RATELIMITS = {
+    'submit_feedback': [('user', '10/m'), ('ip', '30/m')],
+    'login': [('ip', '10/m')],
+    'register': [('ip', '10/h')],
+}
+# proxies in front of the app that append to X-Forwarded-For (0 = use REMOTE_ADDR)
+RATELIMIT_TRUSTED_PROXIES = int(os.getenv('RATELIMIT_TRUSTED_PROXIES', '0'))
+
+# How often an open admin dashboard asks for new feedback (seconds)
+FEEDBACK_LIVE_POLL_SECONDS = int(os.getenv('FEEDBACK_LIVE_POLL_SECONDS', '10'))
+
+# Serve the submit / dashboard / reply / my-feedback views from feedback_app.async_views.
+# feedback/asgi.py turns this on; it stays off for WSGI (gunicorn sync workers).
+FEEDBACK_ASYNC_VIEWS = os.getenv('FEEDBACK_ASYNC_VIEWS', 'False').lower() in ('1', 'true', 'yes')
+
+# Cache: CACHE_BACKEND = locmem (per process), file (shared by the workers on one host)
+# or redis (shared by all hosts, needs `pip install redis`). CACHE_LOCATION overrides the default.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'feedback'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'var' / 'cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.getenv('CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '10000'))} if CACHE_BACKEND != 'redis' else {},
+    }
+}
+# Rate limit counters (feedback_app/ratelimit.py) need atomic add/incr, which the file
+# cache doesn't have: redis with CACHE_BACKEND=redis, else locmem (each worker counts alone)
+CACHES['ratelimit'] = {
+    'BACKEND': CACHE_BACKENDS['redis' if CACHE_BACKEND == 'redis' else 'locmem'][0],
+    'LOCATION': CACHES['default']['LOCATION'] if CACHE_BACKEND == 'redis' else 'ratelimit',
+}
+RATELIMIT_CACHE = 'ratelimit'
+# rendered feedback cards are keyed by version, so a long timeout is safe
+FEEDBACK_CARD_CACHE_TIMEOUT = int(os.getenv('FEEDBACK_CARD_CACHE_TIMEOUT', str(60 * 60 * 24)))
+# "My Feedback" lists are keyed by a per-user generation; old generations just expire
+FEEDBACK_LIST_CACHE_TIMEOUT = int(os.getenv('FEEDBACK_LIST_CACHE_TIMEOUT', str(60 * 60)))
+
+# Sessions and request.user are read from the cache; session writes go to the
+# database too (cached_db), so a cache flush only costs one query per session.
+# Not with CACHE_BACKEND=locmem: a logout or deactivation in one process couldn't
+# drop the copies the others keep, so both are read from the database then
+# (see feedback_app/auth_backends.py).
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + ('db' if CACHE_BACKEND == 'locmem' else 'cached_db')
+AUTHENTICATION_BACKENDS = [
+    'feedback_app.auth_backends.CachedModelBackend',
+    # sessions created before the cached backend was added still name this one
+    'django.contrib.auth.backends.ModelBackend',
+]
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', str(60 * 60)))
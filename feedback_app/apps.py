@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def restore_search_triggers(sender, using, **kwargs):
+    from django.db import connections
+    from .search import ensure_sqlite_triggers
+    ensure_sqlite_triggers(connections[using])
 
 
 class FeedbackAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'feedback_app'
+
+    def ready(self):
+        post_migrate.connect(restore_search_triggers, sender=self)
+        # card cache invalidation
+        from . import signals  # noqa: F401
+        # ids of sharded rows, and their cleanup when a user is deleted
+        from . import sharding  # noqa: F401
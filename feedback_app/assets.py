@@ -0,0 +1,275 @@
+"""
+CSS build step: Bootstrap trimmed to what the templates use.
+
+build() scans the templates for the classes they can produce, drops every
+Bootstrap rule whose selector needs a class no template uses, and writes two
+files to ASSETS_BUILD_DIR (static/build/, so collectstatic picks them up):
+
+  app.css       every rule the templates can need
+  critical.css  the subset for the page shell (base.html, navbar, footer, sidebar),
+                inlined into base.html by {% stylesheets %} (templatetags/assets.py)
+
+Content hashes and the .gz / .br variants come from collectstatic with
+WhiteNoise's CompressedManifestStaticFilesStorage (see prod_settings), and
+WhiteNoise serves the hashed names with immutable cache headers.
+
+The scan is textual: a class="..." value like "alert-{{ msg.tags }}" keeps
+every class starting with "alert-", and classes added from Python or by
+Bootstrap's JavaScript have to be listed in ASSETS_SAFELIST.
+
+fingerprint() hashes everything build() and collectstatic read, so
+`manage.py bootstrap` can skip both when nothing changed.
+"""
+import gzip
+import hashlib
+import re
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # optional, WhiteNoise only writes .br files when it is installed
+    brotli = None
+
+SOURCE_CSS = "css/bootstrap.min.css"
+SOURCE_JS = "js/bootstrap.bundle.min.js"
+# classes Bootstrap's collapse / alert plugins toggle at runtime
+SAFELIST = ["show", "collapsing", "collapsed", "fade"]
+# the page shell; the dashboard's sidebar is part of the layout for staff
+CRITICAL_TEMPLATES = ["base.html", "navbar.html", "footer.html", "admin_dashboard/dashboard.html"]
+
+# a template variable or tag inside an attribute value
+TEMPLATE_CODE = re.compile(r"\{\{.*?\}\}|\{%.*?%\}")
+CLASS_ATTR = re.compile(r"""\bclass\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+# "class": "form-control" in widget attrs
+PYTHON_CLASS = re.compile(r"""["']class["']\s*:\s*["']([^"']*)["']""")
+SELECTOR_CLASS = re.compile(r"\.((?:\\.|[\w-])+)")
+NESTED_AT_RULES = ("@media", "@supports", "@container", "@layer")
+
+
+def build_dir():
+    return Path(getattr(settings, "ASSETS_BUILD_DIR", Path(settings.BASE_DIR) / "static" / "build"))
+
+
+def source_dir():
+    return Path(settings.BASE_DIR) / "static"
+
+
+def python_sources():
+    # widget attrs ("class": "form-control") in forms.py and friends
+    return sorted((Path(settings.BASE_DIR) / "feedback_app").glob("*.py"))
+
+
+def template_dirs():
+    base = Path(settings.BASE_DIR)
+    return getattr(settings, "ASSETS_TEMPLATE_DIRS", [base / "templates", base / "feedback_app" / "templates"])
+
+
+class UsedClasses:
+    """Class names (and "prefix-" wildcards) found in markup and Python sources."""
+
+    def __init__(self, names=()):
+        self.names = set(names)
+        self.prefixes = set()
+
+    def add_markup(self, text):
+        for match in CLASS_ATTR.finditer(text):
+            value = match.group(1) if match.group(1) is not None else match.group(2)
+            # "alert-{{ x }}" -> "alert- ", and a token ending in "-" becomes a prefix
+            for token in TEMPLATE_CODE.sub(" ", value).split():
+                if token.endswith("-"):
+                    self.prefixes.add(token)
+                else:
+                    self.names.add(token)
+
+    def add_python(self, text):
+        for value in PYTHON_CLASS.findall(text):
+            self.names.update(value.split())
+
+    def __contains__(self, name):
+        return name in self.names or any(name.startswith(prefix) for prefix in self.prefixes)
+
+
+def scan(paths, safelist=()):
+    used = UsedClasses(safelist)
+    for path in paths:
+        text = Path(path).read_text(encoding="utf-8")
+        if path.suffix == ".py":
+            used.add_python(text)
+        else:
+            used.add_markup(text)
+    return used
+
+
+def template_files(names=None):
+    files = []
+    for directory in map(Path, template_dirs()):
+        for path in sorted(directory.rglob("*.html")):
+            if names is None or str(path.relative_to(directory)) in names:
+                files.append(path)
+    return files
+
+
+# --- CSS -------------------------------------------------------------------
+def split_blocks(css):
+    """
+    Top-level (prelude, body) pairs of a comment-free stylesheet; body is None
+    for statements like @charset.
+    """
+    blocks = []
+    i, n = 0, len(css)
+    while i < n:
+        start, depth, quote = i, 0, None
+        while i < n:
+            char = css[i]
+            if quote:
+                if char == "\\":
+                    i += 1
+                elif char == quote:
+                    quote = None
+            elif char in "\"'":
+                quote = char
+            elif char == "{":
+                if depth == 0:
+                    body_start = i + 1
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    prelude = css[start:body_start - 1].strip()
+                    blocks.append((prelude, css[body_start:i]))
+                    i += 1
+                    break
+            elif char == ";" and depth == 0:
+                blocks.append((css[start:i].strip(), None))
+                i += 1
+                break
+            i += 1
+        else:
+            if css[start:].strip():
+                blocks.append((css[start:].strip(), None))
+    return blocks
+
+
+def split_selectors(prelude):
+    """Split a selector list on the commas that aren't inside :not(...) and friends."""
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(prelude):
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(prelude[start:i])
+            start = i + 1
+    parts.append(prelude[start:])
+    return [part.strip() for part in parts]
+
+
+def selector_classes(selector):
+    """Classes an element must have for `selector` to match it."""
+    # a class inside :not() is one the element must *not* have
+    while True:
+        stripped = re.sub(r":not\([^()]*\)", "", selector)
+        if stripped == selector:
+            break
+        selector = stripped
+    selector = re.sub(r"\[[^\]]*\]", "", selector)
+    return [name.replace("\\", "") for name in SELECTOR_CLASS.findall(selector)]
+
+
+def purge(css, used):
+    """`css` without the rules none of whose selectors can match (see UsedClasses)."""
+    kept, keyframes = [], []
+    for prelude, body in split_blocks(css):
+        if body is None:
+            kept.append(f"{prelude};")
+        elif prelude.startswith(NESTED_AT_RULES):
+            inner = purge(body, used)
+            if inner:
+                kept.append(f"{prelude}{{{inner}}}")
+        elif re.match(r"@(-\w+-)?keyframes\b", prelude):
+            # decided below, once it is known which animations survived
+            keyframes.append((len(kept), prelude, body))
+            kept.append(None)
+        elif prelude.startswith("@"):
+            kept.append(f"{prelude}{{{body}}}")
+        else:
+            selectors = [s for s in split_selectors(prelude) if all(c in used for c in selector_classes(s))]
+            if selectors:
+                kept.append(f"{','.join(selectors)}{{{body}}}")
+    text = "".join(rule for rule in kept if rule)
+    for index, prelude, body in keyframes:
+        if re.search(rf"\b{re.escape(prelude.split()[-1])}\b", text):
+            kept[index] = f"{prelude}{{{body}}}"
+    return "".join(rule for rule in kept if rule)
+
+
+def split_banner(css):
+    """(license comment, stylesheet without comments)."""
+    banner = re.match(r"\s*(@charset[^;]*;)?\s*(/\*!.*?\*/)", css, re.S)
+    return (banner.group(2) if banner else ""), re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+
+
+# --- build -----------------------------------------------------------------
+def sizes(data):
+    data = data.encode() if isinstance(data, str) else data
+    return {
+        "raw": len(data),
+        "gzip": len(gzip.compress(data, 9)),
+        "brotli": len(brotli.compress(data)) if brotli else None,
+    }
+
+
+def build(out_dir=None):
+    """Write app.css and critical.css; returns a size report for the first page load."""
+    out_dir = Path(out_dir or build_dir())
+    safelist = getattr(settings, "ASSETS_SAFELIST", SAFELIST)
+
+    source = (source_dir() / SOURCE_CSS).read_text(encoding="utf-8")
+    banner, css = split_banner(source)
+    app_css = purge(css, scan(template_files() + python_sources(), safelist))
+    critical_names = getattr(settings, "ASSETS_CRITICAL_TEMPLATES", CRITICAL_TEMPLATES)
+    critical_css = purge(app_css, scan(template_files(critical_names), safelist))
+
+    # @charset has to stay first in a file and means nothing inside <style>
+    charset = re.match(r"@charset[^;]*;", app_css)
+    if charset:
+        app_css, critical_css = app_css[charset.end():], critical_css.removeprefix(charset.group(0))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    head = (charset.group(0) if charset else "") + banner
+    (out_dir / "app.css").write_text(f"{head}\n{app_css}\n", encoding="utf-8")
+    (out_dir / "critical.css").write_text(critical_css, encoding="utf-8")
+
+    js = (source_dir() / SOURCE_JS).read_bytes()
+    return {
+        "before": {"render-blocking css": sizes(source), "js": sizes(js)},
+        "after": {"inlined critical css": sizes(critical_css), "app.css (not blocking)": sizes(app_css), "js": sizes(js)},
+    }
+
+
+# --- change detection ------------------------------------------------------
+def fingerprint():
+    """sha256 over the inputs of build() + collectstatic (not build()'s own output)."""
+    from django import get_version
+    from django.contrib.staticfiles import finders
+
+    out_dir = build_dir().resolve()
+    files = set(template_files()) | set(python_sources())
+    for finder in finders.get_finders():
+        for name, storage in finder.list(["CVS", ".*", "*~"]):
+            path = Path(storage.path(name)).resolve()
+            if not path.is_relative_to(out_dir):
+                files.add(path)
+
+    digest = hashlib.sha256()
+    # settings and versions that change the output for the same files
+    digest.update(repr((
+        get_version(), brotli is not None, settings.STORAGES.get("staticfiles"),
+        getattr(settings, "ASSETS_SAFELIST", SAFELIST), getattr(settings, "ASSETS_CRITICAL_TEMPLATES", CRITICAL_TEMPLATES),
+    )).encode())
+    for path in sorted(files):
+        digest.update(str(path).encode() + b"\0")
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
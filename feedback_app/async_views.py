@@ -0,0 +1,136 @@
+"""
+Async versions of the busiest views, for running under an ASGI server.
+
+urls.py uses these instead of the ones in views.py when
+settings.FEEDBACK_ASYNC_VIEWS is on (feedback/asgi.py turns it on). They
+subclass the sync views, so permissions, querysets and templates are shared;
+only the I/O is awaited: the user comes from request.auser(), lists are read
+with the async ORM, and writes that need a transaction run in a thread via
+sync_to_async. While a query waits on the database the worker serves other
+requests instead of blocking.
+"""
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.core.cache import cache
+from django.shortcuts import aget_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import caching, ingest, sharding, stats, views
+from .export import EXPORT_FORMATS, export_response
+from .models import Feedback
+
+
+class AsyncUserMixin:
+    """
+    Load request.user with auser() (and the shard marks, see sharding.py)
+    before the (sync) dispatch() checks of the parent view run, so they don't
+    query the database from the event loop.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        if sharding.enabled():
+            # read once per process; the shard lookups below are then plain arithmetic
+            await sync_to_async(sharding.legacy_marks)()
+        response = super().dispatch(request, *args, **kwargs)
+        # redirects / 403s from the permission checks come back synchronously
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+
+
+class SubmitFeedbackView(AsyncUserMixin, views.SubmitFeedbackView):
+    async def post(self, request, *args, **kwargs):
+        name = request.POST.get("name", "").strip()
+        email = request.POST.get("email", "").strip()
+        message_text = request.POST.get("message", "").strip()
+
+        if not message_text:
+            messages.error(request, "Messages cannot be empty")
+            return redirect("feedback_form")
+
+        await sync_to_async(ingest.submit_feedback)(request.user, name, email, message_text)
+        messages.success(request, "Feedback submitted successfully.")
+        return redirect("feedback_form")
+
+    async def get(self, request, *args, **kwargs):
+        return redirect("feedback_form")
+
+
+class AdminDashboardView(AsyncUserMixin, views.AdminDashboardView):
+    async def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        export_format = request.GET.get("export")
+        if export_format in EXPORT_FORMATS:
+            querysets = [qs.with_replies() for qs in self.get_paginated_querysets(queryset)]
+            if self.read_db:
+                querysets = [qs.using(self.read_db) for qs in querysets]
+            return export_response(querysets, self.get_cursor_ordering(), export_format, asynchronous=True)
+
+        self.object_list = queryset
+        paginator, page, feedbacks, is_paginated = await self.apaginate_queryset(queryset, self.paginate_by)
+        context = {
+            "view": self,
+            "request": request,
+            "paginator": paginator,
+            "page_obj": page,
+            "is_paginated": is_paginated,
+            "object_list": feedbacks,
+            "feedbacks": feedbacks,
+            "stats": await stats.asummary(),
+            "matching": await sync_to_async(self.count_matching)(),
+            "trend": await stats.atrend(30),
+            "export_csv_url": self.get_page_url(export="csv"),
+            "export_ndjson_url": self.get_page_url(export="ndjson"),
+            "include_archive": self.include_archive(),
+            "archive_toggle_url": self.get_archive_toggle_url(),
+            "cards": await caching.arender_cards(feedbacks, "admin"),
+            "live_updates": await sync_to_async(self.get_live_updates)(),
+            **self.get_page_links(page),
+        }
+        return self.render_to_response(context)
+
+
+class AdminFeedbackReplyView(AsyncUserMixin, views.AdminFeedbackReplyView):
+    async def get(self, request, pk, *args, **kwargs):
+        feedback = await aget_object_or_404(Feedback.objects.using(sharding.db_for_pk(pk)), pk=pk)
+        return render(request, self.template_name, {"feedback": feedback})
+
+    async def post(self, request, pk, *args, **kwargs):
+        message = request.POST.get("message", "").strip()
+        if not message:
+            return redirect("admin_dashboard")
+        # select_for_update needs a transaction, which only works in sync code
+        await sync_to_async(self.save_reply)(pk, message)
+        return redirect("admin_dashboard")
+
+
+class MyFeedbackView(AsyncUserMixin, views.MyFeedbackView):
+    async def get(self, request, *args, **kwargs):
+        after = request.GET.get("after", "")
+        before = request.GET.get("before", "")
+        archive = "archive" if self.include_archive() else ""
+        key = await caching.auser_fragment_key(request.user.pk, "my-feedback", archive, after, before)
+        list_html = await cache.aget(key)
+        caching.count("my_feedback_hit" if list_html is not None else "my_feedback_miss")
+        if list_html is None:
+            queryset = self.get_queryset()
+            paginator, page, feedbacks, is_paginated = await self.apaginate_queryset(queryset, self.paginate_by)
+            context = {
+                "page_obj": page,
+                "cards": await caching.arender_cards(feedbacks, "owner"),
+                **self.get_page_links(page),
+            }
+            list_html = render_to_string("my_feedback_list.html", context, request)
+            await cache.aset(key, list_html, caching.list_timeout())
+
+        pending = await sync_to_async(ingest.pending_for_user)(request.user) if not (after or before) else []
+        return render(request, self.template_name, {
+            "list_html": mark_safe(list_html),
+            "pending": pending,
+            "include_archive": self.include_archive(),
+            "archive_toggle_url": self.get_archive_toggle_url(),
+        })
@@ -0,0 +1,61 @@
+"""
+ModelBackend that resolves request.user from the cache.
+
+The user row is cached after the first lookup and dropped again whenever the
+User is saved or deleted (see signals.py), which covers password changes,
+deactivation and is_staff / is_superuser changes. On a cache miss it reads the
+database and fills the cache again.
+
+Queryset .update() calls on User bypass the signals; call forget_user() after them.
+
+The drop only reaches other processes (workers, `manage.py` commands, a
+shell) through a shared cache. With a per-process one (locmem) every lookup
+reads the database instead, like ModelBackend, so a deactivated or demoted
+user can't stay logged in on another worker.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .caching import cache_is_shared
+
+
+def user_cache_key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def user_timeout():
+    return getattr(settings, "AUTH_USER_CACHE_TIMEOUT", 60 * 60)
+
+
+def forget_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        shared = cache_is_shared()
+        key = user_cache_key(user_id)
+        user = cache.get(key) if shared else None
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            if shared:
+                cache.set(key, user, user_timeout())
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        shared = cache_is_shared()
+        key = user_cache_key(user_id)
+        user = await cache.aget(key) if shared else None
+        if user is None:
+            UserModel = get_user_model()
+            try:
+                user = await UserModel._default_manager.aget(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+            if shared:
+                await cache.aset(key, user, user_timeout())
+        return user if self.user_can_authenticate(user) else None
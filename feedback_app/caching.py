@@ -0,0 +1,285 @@
+"""
+Rendered-fragment caching for the feedback lists.
+
+Each feedback card is cached as HTML under its id plus `Feedback.version`
+(archived feedback, which never changes, under a variant of its own).
+The version is bumped whenever the card's content can change (an edit, a
+reply being added or removed, see signals.py), so a changed card simply gets
+a new key and the old entry ages out of the cache. Deleting a feedback drops
+its cards right away.
+
+On top of that, the whole "My Feedback" list is cached per user under a
+generation number that every write touching that user's feedback bumps.
+Generations live in the cache when it is shared by all processes (redis,
+file), else in the CacheGeneration table, so that writes from other
+processes (other workers, flush_feedback_spool, archive_feedback) are seen.
+
+Hit/miss counters are kept per process (see counters()).
+"""
+import os
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import F, Prefetch, aprefetch_related_objects, prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import CacheGeneration
+
+CARD_TEMPLATES = {
+    "admin": "admin_dashboard/feedback_card.html",
+    "owner": "my_feedback_card.html",
+}
+
+_counters = Counter()
+_lock = threading.Lock()
+
+
+# caches that each process keeps to itself: deletes and bumps from another process never reach them
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+def cache_is_shared():
+    """True if every process (workers, management commands) sees the same default cache."""
+    return not isinstance(caches["default"], PROCESS_LOCAL_CACHES)
+
+
+def count(name, n=1):
+    with _lock:
+        _counters[name] += n
+
+
+def counters():
+    """Cache hit/miss counters of this process."""
+    with _lock:
+        values = dict(_counters)
+    return {
+        "pid": os.getpid(),
+        "backend": settings.CACHES["default"]["BACKEND"],
+        "counters": values,
+    }
+
+
+def card_timeout():
+    return getattr(settings, "FEEDBACK_CARD_CACHE_TIMEOUT", 60 * 60 * 24)
+
+
+# bump when the card templates change, so cached cards are re-rendered
+CARD_TEMPLATE_VERSION = 3
+
+
+def card_key(variant, feedback_id, version):
+    return f"feedback-card:{CARD_TEMPLATE_VERSION}:{variant}:{feedback_id}:{version}"
+
+
+def _card_key(variant, feedback):
+    # an archived card has no edit/reply buttons, so it mustn't share the live card's key
+    if feedback.is_archived:
+        variant = f"{variant}-archived"
+    return card_key(variant, feedback.pk, feedback.version)
+
+
+def render_cards(feedbacks, variant):
+    """
+    Return the rendered HTML of every card in `feedbacks`, in order.
+
+    Cached cards come from one get_many(); only the misses get their replies
+    loaded (one prefetch for all of them) and are rendered and stored.
+    """
+    feedbacks = list(feedbacks)
+    if not feedbacks:
+        return []
+    keys = {fb.pk: _card_key(variant, fb) for fb in feedbacks}
+    html = cache.get_many(list(keys.values()))
+    misses = _misses(variant, feedbacks, keys, html)
+    if misses:
+        for model, group in _by_model(misses):
+            prefetch_related_objects(group, _replies_prefetch(model))
+        fresh = _render(variant, misses, keys)
+        cache.set_many(fresh, card_timeout())
+        html.update(fresh)
+    return [mark_safe(html[keys[fb.pk]]) for fb in feedbacks]
+
+
+async def arender_cards(feedbacks, variant):
+    """Async version of render_cards() (templates are still rendered inline, they're CPU only)."""
+    feedbacks = list(feedbacks)
+    if not feedbacks:
+        return []
+    keys = {fb.pk: _card_key(variant, fb) for fb in feedbacks}
+    html = await cache.aget_many(list(keys.values()))
+    misses = _misses(variant, feedbacks, keys, html)
+    if misses:
+        for model, group in _by_model(misses):
+            await aprefetch_related_objects(group, _replies_prefetch(model))
+        fresh = _render(variant, misses, keys)
+        await cache.aset_many(fresh, card_timeout())
+        html.update(fresh)
+    return [mark_safe(html[keys[fb.pk]]) for fb in feedbacks]
+
+
+def _by_model(feedbacks):
+    # a list that includes the archive mixes Feedback and ArchivedFeedback
+    groups = {}
+    for fb in feedbacks:
+        groups.setdefault(type(fb), []).append(fb)
+    return groups.items()
+
+
+def _replies_prefetch(model):
+    reply_model = model._meta.get_field("replies").related_model
+    return Prefetch("replies", queryset=reply_model.objects.for_listing())
+
+
+def _misses(variant, feedbacks, keys, html):
+    misses = [fb for fb in feedbacks if keys[fb.pk] not in html]
+    count(f"card_{variant}_hit", len(feedbacks) - len(misses))
+    count(f"card_{variant}_miss", len(misses))
+    return misses
+
+
+def _render(variant, feedbacks, keys):
+    return {
+        keys[fb.pk]: render_to_string(CARD_TEMPLATES[variant], {"feedback": fb})
+        for fb in feedbacks
+    }
+
+
+def forget_cards(feedback):
+    cache.delete_many([card_key(variant, feedback.pk, feedback.version) for variant in CARD_TEMPLATES])
+
+
+# --- per-user list fragments ----------------------------------------------
+# Everything cached for a user is keyed by that user's generation number.
+# A write bumps the generation, which makes all older keys unreachable; they
+# are never deleted, they just time out. A missing generation (evicted, or a
+# fresh cache) starts from the clock, so it can't land on an old number.
+# With a per-process cache the generations are rows of CacheGeneration instead
+# (one primary key lookup per read), or other processes' bumps would be lost.
+
+def list_timeout():
+    return getattr(settings, "FEEDBACK_LIST_CACHE_TIMEOUT", 60 * 60)
+
+
+def user_generation_key(user_id):
+    return f"feedback-user-gen:{user_id}"
+
+
+def user_generation(user_id):
+    return _generation(user_generation_key(user_id))
+
+
+def _generations():
+    return CacheGeneration.objects.using(DEFAULT_DB_ALIAS)
+
+
+def _create_generation(key):
+    """Start `key` from the clock unless a concurrent caller just did."""
+    try:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            _generations().create(name=key, value=time.time_ns(), written_at=time.time())
+        return True
+    except IntegrityError:
+        return False
+
+
+def _generation(key):
+    if not cache_is_shared():
+        generation = _generations().filter(name=key).values_list("value", flat=True).first()
+        if generation is None:
+            _create_generation(key)
+            generation = _generations().filter(name=key).values_list("value", flat=True).first()
+        return generation
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+async def auser_generation(user_id):
+    key = user_generation_key(user_id)
+    if not cache_is_shared():
+        generation = await _generations().filter(name=key).values_list("value", flat=True).afirst()
+        # (a user's first visit only)
+        return generation if generation is not None else await sync_to_async(_generation)(key)
+    generation = await cache.aget(key)
+    if generation is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        generation = await cache.aget(key)
+    return generation
+
+
+def _bump(key):
+    now = time.time()
+    if not cache_is_shared():
+        generations = _generations().filter(name=key)
+        # a concurrent first read may create the row between the UPDATE and ours, so update again
+        if not generations.update(value=F("value") + 1, written_at=now) and not _create_generation(key):
+            generations.update(value=F("value") + 1, written_at=now)
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+    # when, so readers can tell whether a lagging replica may not have the change yet (see routers)
+    cache.set(f"{key}:at", now, timeout=None)
+
+
+def _written_at(key):
+    if not cache_is_shared():
+        return _generations().filter(name=key).values_list("written_at", flat=True).first() or 0
+    return cache.get(f"{key}:at", 0)
+
+
+def user_written_at(user_id):
+    return _written_at(user_generation_key(user_id))
+
+
+def bump_user_generation(user_id, using=None):
+    """
+    Invalidate everything cached for `user_id` once the current transaction
+    (on `using`, the database that was written) commits.
+    """
+    bump_feedback_generation(using)
+    if user_id is None:
+        return
+    # after commit: bumping earlier would let a request re-cache the old rows under the new generation
+    transaction.on_commit(lambda: _bump(user_generation_key(user_id)), using=using)
+
+
+# One generation over all feedback, for the staff pages that list everybody's:
+# every user generation bump bumps it too, and so do writes of feedback
+# without an owner (imports).
+FEEDBACK_GENERATION_KEY = "feedback-gen"
+
+
+def feedback_generation():
+    return _generation(FEEDBACK_GENERATION_KEY)
+
+
+def feedback_written_at():
+    return _written_at(FEEDBACK_GENERATION_KEY)
+
+
+def bump_feedback_generation(using=None):
+    transaction.on_commit(lambda: _bump(FEEDBACK_GENERATION_KEY), using=using)
+
+
+def user_fragment_key(user_id, name, *parts):
+    return _fragment_key(user_id, user_generation(user_id), name, parts)
+
+
+async def auser_fragment_key(user_id, name, *parts):
+    return _fragment_key(user_id, await auser_generation(user_id), name, parts)
+
+
+def _fragment_key(user_id, generation, name, parts):
+    return f"feedback-user:{user_id}:{generation}:{name}:" + ":".join(parts)
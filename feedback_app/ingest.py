@@ -0,0 +1,203 @@
+"""
+Write path for new feedback.
+
+settings.FEEDBACK_INGEST_MODE decides what SubmitFeedbackView does:
+
+  "direct"   → INSERT into the main database right away (default)
+  "buffered" → append to the local spool (see feedback_app.spool); the
+               `flush_feedback_spool` command bulk-inserts it in batches
+"""
+import json
+import uuid
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from . import caching, sharding, stats
+from .forms import FeedbackForm
+from .models import Feedback
+from .search import deferred_sqlite_indexing
+from .seeding import RowWriter, db_datetime
+from .spool import FeedbackSpool
+
+
+def ingest_mode():
+    return getattr(settings, "FEEDBACK_INGEST_MODE", "direct")
+
+
+@lru_cache(maxsize=None)
+def _spool_at(path):
+    return FeedbackSpool(path)
+
+
+def get_spool():
+    return _spool_at(str(getattr(settings, "FEEDBACK_SPOOL_PATH", settings.BASE_DIR / "var" / "feedback_spool.sqlite3")))
+
+
+def submit_feedback(user, name, email, message, mode=None):
+    """Store one submission. Returns the Feedback, or None if it was spooled."""
+    if (mode or ingest_mode()) == "buffered":
+        get_spool().enqueue(
+            ingest_key=uuid.uuid4(),
+            user_id=user.pk if user else None,
+            name=name,
+            email=email,
+            message=message,
+            created_at=timezone.now(),
+        )
+        return None
+
+    # on the user's shard (see sharding.py; None: the default database)
+    db = sharding.db_for_user(user.pk if user else None)
+    with transaction.atomic(using=db):
+        feedback = Feedback.objects.using(db).create(name=name, email=email, message=message, user=user)
+        stats.record_created(day=stats.local_day(feedback.created_at))
+    return feedback
+
+
+def flush_spool(batch_size=None, spool=None):
+    """Move one batch from the spool into the main database. Returns the number of rows."""
+    spool = spool or get_spool()
+    rows = spool.claim(batch_size or getattr(settings, "FEEDBACK_SPOOL_BATCH_SIZE", 500))
+    if not rows:
+        return 0
+
+    batch = [
+        Feedback(
+            ingest_key=uuid.UUID(row["ingest_key"]),
+            user_id=row["user_id"],
+            name=row["name"],
+            email=row["email"],
+            message=row["message"],
+            created_at=datetime.fromisoformat(row["created_at"]),
+        )
+        for row in rows
+    ]
+    # one transaction per shard (a single one without sharding)
+    for db, objs in sharding.group_by_db(batch).items():
+        with transaction.atomic(using=db):
+            # a flusher that died after committing but before ack() leaves rows that are already in
+            keys = [obj.ingest_key for obj in objs]
+            already_in = set(Feedback.objects.using(db).filter(ingest_key__in=keys).values_list("ingest_key", flat=True))
+            new = [obj for obj in objs if obj.ingest_key not in already_in]
+            sharding.assign_ids(new)
+            Feedback.objects.using(db).bulk_create(new, ignore_conflicts=True)
+            for day, count in Counter(stats.local_day(obj.created_at) for obj in new).items():
+                stats.record_created(count, day=day)
+            # bulk_create sends no signals
+            for user_id in {obj.user_id for obj in new}:
+                caching.bump_user_generation(user_id, db)
+
+    spool.ack([row["id"] for row in rows])
+    return len(rows)
+
+
+def pending_for_user(user):
+    """Spooled submissions of `user` that are not in the main database yet."""
+    if ingest_mode() != "buffered":
+        return []
+    pending = get_spool().pending_for_user(user.pk)
+    for item in pending:
+        item["created_at"] = datetime.fromisoformat(item["created_at"])
+    return pending
+
+
+def _validate(data, fields):
+    """Clean one record with the FeedbackForm field rules. Returns (cleaned, errors)."""
+    cleaned, errors = {}, {}
+    for name, field in fields.items():
+        value = data.get(name)
+        # clean() would turn a number, list or object into its str()
+        if value is not None and not isinstance(value, str):
+            errors[name] = ["Must be a string."]
+            continue
+        try:
+            cleaned[name] = field.clean(value)
+        except ValidationError as exc:
+            errors[name] = exc.messages
+    return cleaned, errors
+
+
+IMPORT_FIELDS = ["name", "email", "message"]
+
+
+def _insert_chunk(rows, created_at, day):
+    """Insert (name, email, message) tuples that passed _validate()."""
+    # no owner, so all on the first shard
+    db = sharding.db_for_user(None)
+    connection = connections[db or DEFAULT_DB_ALIAS]
+    # plain INSERTs, like generate_feedback: bulk_create's per-value prep was most of its time
+    created_at = db_datetime(created_at, connection.timezone)
+    if sharding.enabled():
+        writer = RowWriter(Feedback, ["id", *IMPORT_FIELDS, "created_at"])
+        for pk, row in zip(sharding.new_ids(Feedback, len(rows)), rows):
+            writer.add(pk, *row, created_at)
+    else:
+        writer = RowWriter(Feedback, [*IMPORT_FIELDS, "created_at"])
+        for row in rows:
+            writer.add(*row, created_at)
+    with transaction.atomic(using=db):
+        # one INSERT ... SELECT into the SQLite search index instead of its trigger per row
+        with deferred_sqlite_indexing(connection), connection.cursor() as cursor:
+            writer.flush(cursor)
+        stats.record_created(len(rows), day=day)
+        # no owners to bump, but the dashboard lists these rows too
+        caching.bump_feedback_generation(db)
+
+
+def import_ndjson(lines, chunk_size=1000, max_errors=1000):
+    """
+    Validate and insert feedback from an iterable of NDJSON lines (bytes or str).
+
+    Lines are consumed one at a time and inserted in chunks of `chunk_size`,
+    so the whole body is never held in memory. Returns a summary dict with
+    per-line errors (line numbers start at 1, at most `max_errors` listed).
+    """
+    # the same field rules FeedbackForm applies (max length, valid email, required)
+    fields = FeedbackForm.base_fields
+    created = failed = 0
+    errors = []
+    chunk = []
+    # one timestamp for the whole import keeps the rows together in the dashboard
+    now = timezone.now()
+    day = stats.local_day(now)
+
+    for line_no, raw in enumerate(lines, start=1):
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            data = json.loads(raw)
+            if not isinstance(data, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as exc:
+            line_errors = {"__all__": [f"Invalid JSON: {exc}"]}
+        else:
+            cleaned, line_errors = _validate(data, fields)
+        if line_errors:
+            failed += 1
+            if len(errors) < max_errors:
+                errors.append({"line": line_no, "errors": line_errors})
+            continue
+
+        chunk.append(tuple(cleaned[name] for name in IMPORT_FIELDS))
+        if len(chunk) >= chunk_size:
+            _insert_chunk(chunk, now, day)
+            created += len(chunk)
+            chunk = []
+
+    if chunk:
+        _insert_chunk(chunk, now, day)
+        created += len(chunk)
+
+    return {
+        "created": created,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors),
+    }
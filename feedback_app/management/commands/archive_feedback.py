@@ -0,0 +1,99 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from feedback_app import caching, sharding
+from feedback_app.models import ArchivedFeedback, ArchivedFeedbackReply, Feedback, FeedbackReply
+
+FEEDBACK_FIELDS = ["id", "user_id", "name", "email", "message", "created_at", "version"]
+REPLY_FIELDS = ["id", "feedback_id", "admin_id", "message", "created_at"]
+
+
+def archive_batch(cutoff, batch_size, using=None):
+    """
+    Move up to `batch_size` of the oldest feedback created before `cutoff`,
+    with their replies, into the archive tables in one short transaction.
+    `using` is the shard (see sharding.py), None without sharding. Returns
+    (feedback, replies) moved.
+    """
+    feedback = Feedback.objects.using(using)
+    feedback_replies = FeedbackReply.objects.using(using)
+    # picked outside the transaction through the (created_at, id) index; the
+    # transaction then only locks these rows
+    ids = list(
+        feedback.filter(created_at__lt=cutoff)
+        .order_by("created_at", "id")
+        .values_list("pk", flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0, 0
+    with transaction.atomic(using=feedback.db):
+        # same lock the reply view takes, so no reply can arrive for a row that's being moved
+        rows = list(
+            feedback.select_for_update()
+            .filter(pk__in=ids, created_at__lt=cutoff)
+            .values(*FEEDBACK_FIELDS)
+        )
+        ids = [row["id"] for row in rows]
+        replies = list(feedback_replies.filter(feedback_id__in=ids).values(*REPLY_FIELDS))
+        ArchivedFeedback.objects.using(feedback.db).bulk_create([ArchivedFeedback(**row) for row in rows])
+        ArchivedFeedbackReply.objects.using(feedback.db).bulk_create([ArchivedFeedbackReply(**row) for row in replies])
+        # plain DELETEs: .delete() would load every row and run the per-row cache
+        # signals, and archiving isn't a deletion as far as the stats are concerned
+        feedback_replies.filter(feedback_id__in=ids)._raw_delete(feedback.db)
+        feedback.filter(pk__in=ids)._raw_delete(feedback.db)
+        # the owners' cached "My Feedback" lists still show these rows as live
+        for user_id in {row["user_id"] for row in rows if row["user_id"]}:
+            caching.bump_user_generation(user_id, feedback.db)
+    return len(rows), len(replies)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move feedback older than --days (default settings.FEEDBACK_ARCHIVE_AFTER_DAYS), "
+        "with its replies, from the hot tables into the archive tables. Works oldest "
+        "first in small transactions (--batch-size rows each), so it can run while the "
+        "site is up; stop it at any time and rerun to continue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=getattr(settings, "FEEDBACK_ARCHIVE_AFTER_DAYS", 365))
+        parser.add_argument(
+            "--batch-size", type=int, default=getattr(settings, "FEEDBACK_ARCHIVE_BATCH_SIZE", 500),
+        )
+        parser.add_argument("--sleep", type=float, default=0.0, help="Seconds to pause between batches.")
+        parser.add_argument("--limit", type=int, help="Stop after moving about this many feedback rows.")
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would be moved.")
+
+    def handle(self, *args, **options):
+        if options["days"] < 1 or options["batch_size"] < 1:
+            raise CommandError("--days and --batch-size must be at least 1")
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        if options["dry_run"]:
+            count = sum(Feedback.objects.using(db).filter(created_at__lt=cutoff).count() for db in sharding.databases())
+            self.stdout.write(f"{count} feedback created before {cutoff:%Y-%m-%d %H:%M} would be archived")
+            return
+
+        started = time.perf_counter()
+        moved = moved_replies = 0
+        # one shard after the other (a single pass without sharding)
+        for db in sharding.databases():
+            while options["limit"] is None or moved < options["limit"]:
+                batch, replies = archive_batch(cutoff, options["batch_size"], using=db)
+                if not batch:
+                    break
+                moved += batch
+                moved_replies += replies
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"{moved} feedback, {moved_replies} replies")
+                if options["sleep"]:
+                    time.sleep(options["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"archived {moved} feedback and {moved_replies} replies created before "
+            f"{cutoff:%Y-%m-%d %H:%M} in {time.perf_counter() - started:.1f}s"
+        ))
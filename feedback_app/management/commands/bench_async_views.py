@@ -0,0 +1,186 @@
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import AsyncRequestFactory, Client, RequestFactory, override_settings
+from django.test.utils import setup_test_environment
+
+from feedback_app import stats
+from feedback_app.models import Feedback
+
+MODES = ("wsgi", "asgi")
+
+
+class Latency:
+    """execute_wrapper that sleeps before every query, like a database far away."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        time.sleep(self.seconds)
+        return execute(sql, params, many, context)
+
+    def install(self, sender=None, connection=None, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare how many dashboard / my-feedback requests per second the sync (WSGI) "
+        "and async (ASGI) views serve with the same number of workers when every "
+        "query takes --latency-ms. Each worker is a separate process with its own "
+        "throwaway test database; a WSGI worker serves one request at a time, an "
+        "ASGI worker runs one event loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1, help="Worker processes per mode (at most one per CPU core).")
+        parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight at once (all workers).")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per mode (all workers).")
+        parser.add_argument("--latency-ms", type=float, default=20.0)
+        parser.add_argument("--child", choices=MODES, help="Internal: run one worker and print the result as JSON.")
+
+    def handle(self, *args, **options):
+        if options["child"]:
+            self.stdout.write(json.dumps(self.run_child(options["child"], options)))
+            return
+
+        self.stdout.write(
+            f"{options['requests']} requests, {options['workers']} workers, "
+            f"{options['concurrency']} in flight, {options['latency_ms']:g} ms per query\n"
+        )
+        self.stdout.write(f"{'mode':<6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+        for mode in MODES:
+            result = self.run_mode(mode, options)
+            self.stdout.write(
+                f"{mode:<6}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}"
+                f"{result['p95_ms']:>10.1f}{result['errors']:>8}"
+            )
+
+    def run_mode(self, mode, options):
+        workers = options["workers"]
+        env = dict(os.environ, FEEDBACK_ASYNC_VIEWS="1" if mode == "asgi" else "0")
+        command = [
+            sys.executable, str(settings.BASE_DIR / "manage.py"), "bench_async_views",
+            "--child", mode,
+            "--concurrency", str(max(1, options["concurrency"] // workers)),
+            "--requests", str(max(1, options["requests"] // workers)),
+            "--latency-ms", str(options["latency_ms"]),
+        ]
+        children = [
+            subprocess.Popen(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            for _ in range(workers)
+        ]
+        results = []
+        for child in children:
+            out, err = child.communicate()
+            if child.returncode:
+                raise CommandError(f"{mode} worker failed:\n{err}")
+            results.append(json.loads(out.strip().splitlines()[-1]))
+
+        timings = sorted(t for result in results for t in result["timings"])
+        return {
+            # workers run side by side, so their throughput adds up
+            "rps": sum(result["rps"] for result in results),
+            "p50_ms": statistics.median(timings) * 1000,
+            "p95_ms": timings[max(0, int(len(timings) * 0.95) - 1)] * 1000,
+            "errors": sum(result["errors"] for result in results),
+        }
+
+    # --- worker process ------------------------------------------------
+    def run_child(self, mode, options):
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        # DEBUG would log every query and skew the numbers
+        with override_settings(DEBUG=False):
+            requests = self.prepare(options["requests"])
+            latency = Latency(options["latency_ms"] / 1000)
+            connection_created.connect(latency.install, weak=False)
+            latency.install(connection=connection)
+
+            run = self.run_wsgi if mode == "wsgi" else self.run_asgi
+            started = time.perf_counter()
+            timings, errors = run(requests, options["concurrency"])
+            elapsed = time.perf_counter() - started
+        return {"rps": len(requests) / elapsed, "timings": timings, "errors": errors}
+
+    def prepare(self, count):
+        user = User.objects.create_user("bench-user", password="x")
+        staff = User.objects.create_user("bench-staff", password="x", is_staff=True)
+        Feedback.objects.bulk_create(
+            Feedback(user=user, name="bench", email="bench@example.com", message=f"message {i}")
+            for i in range(200)
+        )
+        stats.record_created(200)
+
+        cookies = {}
+        for who in (user, staff):
+            client = Client()
+            client.force_login(who)
+            cookies[who] = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        paths = [("/dashboard", cookies[staff]), ("/my/feedback/", cookies[user])]
+        return [paths[i % len(paths)] for i in range(count)]
+
+    def run_wsgi(self, requests, concurrency):
+        # a sync worker serves one request at a time, whatever the concurrency
+        app = get_wsgi_application()
+        factory = RequestFactory()
+        timings, errors = [], 0
+        for path, cookie in requests:
+            environ = factory.get(path, secure=True, HTTP_COOKIE=cookie).environ
+            status = []
+            started = time.perf_counter()
+            response = app(environ, lambda s, headers, exc_info=None: status.append(s))
+            b"".join(response)
+            response.close()
+            timings.append(time.perf_counter() - started)
+            errors += not status[0].startswith("200")
+        return timings, errors
+
+    def run_asgi(self, requests, concurrency):
+        app = get_asgi_application()
+        factory = AsyncRequestFactory()
+        timings, errors = [], 0
+
+        async def one(path, cookie, slots):
+            nonlocal errors
+            scope = factory.get(path, secure=True).scope
+            scope["headers"] = [(b"host", b"testserver"), (b"cookie", cookie.encode())]
+            sent = []
+            body_sent = False
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await asyncio.Event().wait()  # the client never disconnects
+
+            async def send(message):
+                sent.append(message)
+
+            async with slots:
+                started = time.perf_counter()
+                await app(scope, receive, send)
+                timings.append(time.perf_counter() - started)
+            errors += sent[0]["status"] != 200
+
+        async def main():
+            slots = asyncio.Semaphore(concurrency)
+            await asyncio.gather(*(one(path, cookie, slots) for path, cookie in requests))
+
+        asyncio.run(main())
+        return timings, errors
@@ -0,0 +1,137 @@
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# the start command's inline superuser check from before `bootstrap`
+LEGACY_SUPERUSER = (
+    "import os,django; django.setup(); from django.contrib.auth import get_user_model; U=get_user_model(); "
+    "u=os.environ.get('DJANGO_SUPERUSER_USERNAME'); e=os.environ.get('DJANGO_SUPERUSER_EMAIL'); "
+    "p=os.environ.get('DJANGO_SUPERUSER_PASSWORD'); "
+    "0 if (u and p and U.objects.filter(username=u).exists()) else (U.objects.create_superuser(u,e,p) if u and p else None)"
+)
+MODES = ("before", "after")
+
+
+class Command(BaseCommand):
+    help = (
+        "Time a container start, from the start command to the first response, the old way "
+        "(build_assets, collectstatic and the inline superuser check on every start, each "
+        "worker importing Django itself) and with `bootstrap` + gunicorn.conf.py (static "
+        "files skipped when unchanged, app preloaded and warmed up before forking). Runs "
+        "the real commands with the current settings and database on a free local port; "
+        "needs STATIC_ROOT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3, help="Starts per mode; the median is reported.")
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--path", default="/", help="URL of the first request.")
+        parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for the first response.")
+
+    def handle(self, *args, **options):
+        if not settings.STATIC_ROOT:
+            raise CommandError("STATIC_ROOT is not set (collectstatic has nowhere to write); use the production settings.")
+        self.env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "feedback.settings"))
+        with tempfile.TemporaryDirectory() as tmp:
+            # "before" ran gunicorn without a config file; an empty one keeps ./gunicorn.conf.py out
+            self.empty_config = os.path.join(tmp, "empty.conf.py")
+            open(self.empty_config, "w").close()
+            # static files as they are after a deploy, so "after" measures the usual restart
+            self.run_steps([self.manage("bootstrap", "--skip-superuser")])
+
+            results = {mode: [] for mode in MODES}
+            for _ in range(options["runs"]):
+                for mode in MODES:
+                    results[mode].append(self.start(mode, options))
+
+        self.stdout.write(
+            f"{options['runs']} start(s) per mode, {options['workers']} workers, first request GET {options['path']}\n"
+        )
+        self.stdout.write(f"{'mode':<8}{'setup s':>10}{'to listen s':>13}{'1st resp ms':>13}{'total s':>10}{'2nd resp ms':>13}")
+        for mode in MODES:
+            median = {key: statistics.median(run[key] for run in results[mode]) for key in results[mode][0]}
+            self.stdout.write(
+                f"{mode:<8}{median['setup']:>10.2f}{median['listen']:>13.2f}{median['first'] * 1000:>13.1f}"
+                f"{median['total']:>10.2f}{median['second'] * 1000:>13.1f}"
+            )
+        before, after = (statistics.median(run["total"] for run in results[mode]) for mode in MODES)
+        self.stdout.write(self.style.SUCCESS(
+            f"cold start to first response: {before:.2f}s -> {after:.2f}s ({before - after:.2f}s faster)"
+        ))
+
+    def manage(self, *args):
+        return [sys.executable, str(settings.BASE_DIR / "manage.py"), *args]
+
+    def run_steps(self, steps):
+        for step in steps:
+            done = subprocess.run(step, cwd=settings.BASE_DIR, env=self.env, capture_output=True, text=True)
+            if done.returncode:
+                raise CommandError(f"{' '.join(step[:4])} failed:\n{done.stderr[-2000:]}")
+
+    def start(self, mode, options):
+        port = free_port()
+        server = [sys.executable, "-m", "gunicorn", "feedback.wsgi:application", "--bind", f"127.0.0.1:{port}", "--workers", str(options["workers"])]
+        if mode == "before":
+            steps = [
+                self.manage("build_assets"),
+                self.manage("collectstatic", "--noinput"),
+                [sys.executable, "-c", LEGACY_SUPERUSER],
+            ]
+            server += ["-c", self.empty_config, "--worker-class", "gthread", "--threads", "4"]
+        else:
+            steps = [self.manage("bootstrap")]
+            server += ["-c", str(settings.BASE_DIR / "gunicorn.conf.py")]
+
+        started = time.perf_counter()
+        self.run_steps(steps)
+        setup = time.perf_counter() - started
+        with tempfile.TemporaryFile() as log:
+            process = subprocess.Popen(server, cwd=settings.BASE_DIR, env=self.env, stdout=log, stderr=subprocess.STDOUT)
+            try:
+                listening = self.wait_for_port(port, started + options["timeout"], process, log)
+                url = f"http://127.0.0.1:{port}{options['path']}"
+                first = request_time(url)
+                total = time.perf_counter() - started
+                second = request_time(url)
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+        return {"setup": setup, "listen": listening - started - setup, "first": first, "total": total, "second": second}
+
+    def wait_for_port(self, port, deadline, process, log):
+        while time.perf_counter() < deadline:
+            if process.poll() is not None:
+                log.seek(0)
+                raise CommandError(f"gunicorn exited:\n{log.read().decode(errors='replace')[-2000:]}")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                return time.perf_counter()
+            except OSError:
+                time.sleep(0.01)
+        raise CommandError("gunicorn did not start listening in time")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request_time(url):
+    """Seconds until the whole response is in (any status counts: it's the boot being timed)."""
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=60) as response:
+            response.read()
+    except urllib.error.HTTPError as error:
+        error.read()
+    return time.perf_counter() - started
@@ -0,0 +1,68 @@
+import time
+import uuid
+from collections import Counter
+from tempfile import TemporaryDirectory
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from feedback_app import stats
+from feedback_app.ingest import flush_spool, submit_feedback
+from feedback_app.models import Feedback
+from feedback_app.spool import FeedbackSpool
+
+BENCH_USERNAME = "bench-ingest"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare submission throughput of the direct (one INSERT per request) and "
+        "buffered (spool + bulk flush) ingest modes. Writes to the configured database "
+        "and removes the rows afterwards, so don't point it at production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=2000)
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def run_direct(self, user, count):
+        start = time.perf_counter()
+        for i in range(count):
+            submit_feedback(user, "bench", "bench@example.com", f"direct {i}", mode="direct")
+        return time.perf_counter() - start
+
+    def run_buffered(self, user, count, batch_size):
+        with TemporaryDirectory() as tmp:
+            spool = FeedbackSpool(f"{tmp}/spool.sqlite3")
+            start = time.perf_counter()
+            for i in range(count):
+                spool.enqueue(
+                    ingest_key=uuid.uuid4(), user_id=user.pk, name="bench",
+                    email="bench@example.com", message=f"buffered {i}", created_at=timezone.now(),
+                )
+            enqueued = time.perf_counter() - start
+            while flush_spool(batch_size, spool=spool):
+                pass
+            return enqueued, time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME)
+        try:
+            direct = self.run_direct(user, count)
+            enqueued, buffered = self.run_buffered(user, count, options["batch_size"])
+        finally:
+            # take the benchmark rows back out of the daily rollup as well
+            bench_rows = Feedback.objects.filter(user=user).values_list("created_at", flat=True)
+            for day, n in Counter(stats.local_day(created_at) for created_at in bench_rows).items():
+                stats.bump(day, created=-n)
+            user.delete()
+
+        self.stdout.write(f"{count} submissions, batch size {options['batch_size']}")
+        self.stdout.write(f"direct:   {direct:8.3f}s  {count / direct:10.0f} rows/s")
+        self.stdout.write(
+            f"buffered: {buffered:8.3f}s  {count / buffered:10.0f} rows/s end-to-end "
+            f"({count / enqueued:.0f} submissions/s accepted into the spool)"
+        )
+        self.stdout.write(self.style.SUCCESS(f"speedup:  {direct / buffered:.1f}x"))
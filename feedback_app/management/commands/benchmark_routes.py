@@ -0,0 +1,371 @@
+import json
+import math
+import platform
+import queue
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from dataclasses import dataclass
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from feedback_app import seeding, urls
+from feedback_app.models import Feedback
+
+ROLES = ("anonymous", "user", "staff")
+IMPORT_TOKEN = "benchmark-import-token"
+
+
+@dataclass(frozen=True)
+class Scenario:
+    role: str
+    method: str = "get"
+    # "own": a feedback of the benchmark user, "any": cycle through all of them,
+    # "fresh": a new throwaway feedback for every request (for deletes)
+    target: str = "own"
+    # dict, or callable(n) -> dict / str for the n-th request
+    data: object = None
+    content_type: str = None
+    headers: tuple = ()
+
+
+def submit_data(n):
+    return {"name": "Bench", "email": "bench@example.com", "message": f"benchmark message {n}"}
+
+
+def import_body(n):
+    return "".join(
+        json.dumps({"name": "Kiosk", "email": "kiosk@example.com", "message": f"import {n}.{i}"}) + "\n"
+        for i in range(10)
+    )
+
+
+DEFAULT = tuple(Scenario(role) for role in ROLES)
+
+# routes not listed here get DEFAULT: a GET as every role
+SCENARIOS = {
+    # GET is 405 here, and a logged-in POST would end the client's session
+    "logout": (Scenario("anonymous", "post"),),
+    "submit_feedback": DEFAULT + (Scenario("user", "post", data=submit_data),),
+    "import_feedback": (
+        Scenario(
+            "anonymous", "post", data=import_body, content_type="application/x-ndjson",
+            headers=(("Authorization", f"Bearer {IMPORT_TOKEN}"),),
+        ),
+    ),
+    # a poll after some write that brought nothing new for this page (the range scans)
+    "admin_dashboard_updates": DEFAULT[:2] + (
+        Scenario("staff", data={"feedback_after": 10**12, "reply_after": 10**12}),
+    ),
+    "admin_feedback_reply": DEFAULT + (
+        Scenario("staff", "post", target="any", data=lambda n: {"message": f"benchmark reply {n}"}),
+    ),
+    "edit_feedback": DEFAULT + (
+        Scenario("user", "post", data=lambda n: {"name": "Bench", "email": "bench@example.com", "message": f"edited {n}"}),
+    ),
+    "delete_feedback": DEFAULT + (
+        Scenario("user", "post", target="fresh"),
+        Scenario("staff", "post", target="fresh"),
+    ),
+}
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and drive every route in feedback_app.urls "
+        "with concurrent clients (anonymous, a regular user and staff). Reports "
+        "p50/p95/p99 latency, throughput and SQL queries per request for each "
+        "route/role/method, optionally as JSON (--output) and against an earlier "
+        "run (--baseline). Uses the configured database engine (SQLite or a local "
+        "MySQL), never the real database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20, help="Regular users to seed (plus one staff user).")
+        parser.add_argument("--feedback", type=int, default=2000, help="Feedback rows to seed.")
+        parser.add_argument("--reply-ratio", type=float, default=0.3, help="Share of feedback with a reply.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the data.")
+        parser.add_argument("--clients", type=int, default=4, help="Concurrent clients per scenario.")
+        parser.add_argument("--requests", type=int, default=50, help="Timed requests per scenario (all clients).")
+        parser.add_argument("--warmup", type=int, default=5, help="Untimed requests per scenario first.")
+        parser.add_argument("--routes", nargs="*", help="Only these URL names.")
+        parser.add_argument("--output", help="Write the results as JSON to this file.")
+        parser.add_argument("--baseline", help="JSON file from an earlier run to compare against.")
+        parser.add_argument(
+            "--threshold", type=float, default=0.25,
+            help="Flag a scenario whose p95 grew by more than this fraction over the baseline.",
+        )
+        parser.add_argument("--fail-on-regression", action="store_true", help="Exit with an error if anything regressed.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            baseline = json.loads(Path(options["baseline"]).read_text())
+
+        setup_test_environment()
+        with tempfile.TemporaryDirectory() as tmp:
+            old_name = self.create_database(tmp)
+            try:
+                with override_settings(**self.isolated_settings(tmp)):
+                    report = self.run(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.print_report(report)
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(report, indent=2) + "\n")
+            self.stdout.write(f"wrote {options['output']}")
+        if baseline is not None:
+            regressions = self.compare(report, baseline, options["threshold"])
+            if regressions and options["fail_on_regression"]:
+                raise CommandError(f"{len(regressions)} scenario(s) regressed against {options['baseline']}")
+
+    # --- setup -------------------------------------------------------------
+    def create_database(self, tmp):
+        old_name = connection.settings_dict["NAME"]
+        test = connection.settings_dict.setdefault("TEST", {})
+        if connection.vendor == "sqlite":
+            if not test.get("NAME"):
+                # an in-memory database can't take concurrent writers from several threads
+                test["NAME"] = str(Path(tmp) / "benchmark.sqlite3")
+            # take the write lock when a transaction starts: a deferred transaction that
+            # upgrades later fails with "database is locked" instead of waiting for it
+            connection.settings_dict["OPTIONS"] = dict(
+                connection.settings_dict.get("OPTIONS", {}), transaction_mode="IMMEDIATE",
+            )
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        return old_name
+
+    def isolated_settings(self, tmp):
+        caches = {
+            # same backends as configured, but keys that can't meet real cached rows
+            alias: dict(config, KEY_PREFIX=f"benchmark-{time.time_ns()}")
+            for alias, config in settings.CACHES.items()
+        }
+        return {
+            "DEBUG": False,  # DEBUG keeps every query and skews the numbers
+            "CACHES": caches,
+            "FEEDBACK_IMPORT_TOKENS": [IMPORT_TOKEN],
+            "FEEDBACK_SPOOL_PATH": str(Path(tmp) / "spool.sqlite3"),
+            # every thread posts from the same user and address
+            "RATELIMIT_ENABLED": False,
+        }
+
+    def scenarios(self, only):
+        for pattern in urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name:
+                continue
+            if only and pattern.name not in only:
+                continue
+            params = set(pattern.pattern.converters)
+            if params - {"pk"}:
+                self.stderr.write(f"skipping {pattern.name}: don't know how to fill {sorted(params - {'pk'})}")
+                continue
+            for scenario in SCENARIOS.get(pattern.name, DEFAULT):
+                yield pattern.name, "pk" in params, scenario
+
+    # --- running -----------------------------------------------------------
+    def run(self, options):
+        started = time.perf_counter()
+        seeded = seeding.seed(
+            users=options["users"], feedback=options["feedback"],
+            reply_ratio=options["reply_ratio"], seed=options["seed"],
+        )
+        self.stdout.write(
+            f"seeded {len(seeded.user_ids)} users, {seeded.feedback_count} feedback, "
+            f"{seeded.reply_count} replies in {time.perf_counter() - started:.1f}s"
+        )
+        users = {"anonymous": None, "user": seeded.user, "staff": seeded.staff}
+        own = list(Feedback.objects.filter(user=seeded.user).order_by("-pk").values_list("pk", flat=True)[:50])
+        every = list(Feedback.objects.order_by("-pk").values_list("pk", flat=True)[:500])
+        if not own:
+            raise CommandError("the benchmark user has no feedback; seed more rows (--feedback)")
+
+        results = []
+        for name, takes_pk, scenario in self.scenarios(options["routes"]):
+            count = options["warmup"] + options["requests"]
+            if scenario.target == "fresh":
+                created = Feedback.objects.bulk_create(
+                    Feedback(user=seeded.user, name="Bench", email="bench@example.com", message=f"disposable {n}")
+                    for n in range(count)
+                )
+                pks = [feedback.pk for feedback in created]
+            else:
+                pks = own if scenario.target == "own" else every
+
+            def path(n, name=name, takes_pk=takes_pk, pks=pks):
+                return reverse(name, kwargs={"pk": pks[n % len(pks)]} if takes_pk else None)
+
+            result = self.run_scenario(scenario, path, users[scenario.role], options)
+            result.update(route=name, role=scenario.role, method=scenario.method.upper(), path=path(0))
+            results.append(result)
+
+        return {
+            "meta": {
+                "finished": timezone.now().isoformat(),
+                "database": connection.vendor,
+                "settings": settings.SETTINGS_MODULE,
+                "async_views": settings.FEEDBACK_ASYNC_VIEWS,
+                "cache_backend": settings.CACHES["default"]["BACKEND"],
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "users": options["users"],
+                "feedback": options["feedback"],
+                "reply_ratio": options["reply_ratio"],
+                "seed": options["seed"],
+                "clients": options["clients"],
+                "requests": options["requests"],
+                "warmup": options["warmup"],
+            },
+            "results": results,
+        }
+
+    def make_client(self, user):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        return client
+
+    def send(self, client, scenario, path, n):
+        data = scenario.data(n) if callable(scenario.data) else scenario.data
+        kwargs = {"secure": True, "headers": dict(scenario.headers)}
+        if scenario.content_type:
+            kwargs["content_type"] = scenario.content_type
+        response = getattr(client, scenario.method)(path, data, **kwargs)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response.status_code
+
+    def run_scenario(self, scenario, path, user, options):
+        warmup, total = options["warmup"], options["requests"]
+        client = self.make_client(user)
+        for n in range(warmup):
+            self.send(client, scenario, path(n), n)
+
+        numbers = queue.SimpleQueue()
+        for n in range(warmup, warmup + total):
+            numbers.put(n)
+        timings, queries, statuses = [], [], Counter()
+        errors = 0
+        lock = threading.Lock()
+
+        def worker(client):
+            nonlocal errors
+            counter = QueryCounter()
+            try:
+                with ExitStack() as stack:
+                    for alias in connections:
+                        stack.enter_context(connections[alias].execute_wrapper(counter))
+                    while True:
+                        try:
+                            n = numbers.get_nowait()
+                        except queue.Empty:
+                            return
+                        before = counter.count
+                        started = time.perf_counter()
+                        try:
+                            status = self.send(client, scenario, path(n), n)
+                        except Exception as exc:
+                            status = type(exc).__name__
+                        elapsed = time.perf_counter() - started
+                        with lock:
+                            timings.append(elapsed)
+                            queries.append(counter.count - before)
+                            statuses[str(status)] += 1
+                            errors += not isinstance(status, int) or status >= 500
+            finally:
+                connections.close_all()
+
+        clients = max(1, min(options["clients"], total))
+        threads = [threading.Thread(target=worker, args=(self.make_client(user),)) for _ in range(clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        timings.sort()
+        return {
+            "requests": len(timings),
+            "errors": errors,
+            "status": dict(statuses),
+            "p50_ms": round(percentile(timings, 50) * 1000, 3),
+            "p95_ms": round(percentile(timings, 95) * 1000, 3),
+            "p99_ms": round(percentile(timings, 99) * 1000, 3),
+            "mean_ms": round(statistics.fmean(timings) * 1000, 3) if timings else 0.0,
+            "rps": round(len(timings) / elapsed, 1) if elapsed else 0.0,
+            "queries_per_request": round(statistics.fmean(queries), 2) if queries else 0.0,
+            "max_queries": max(queries, default=0),
+        }
+
+    # --- reporting ---------------------------------------------------------
+    def print_report(self, report):
+        self.stdout.write(
+            f"{'route':<22}{'method':<7}{'role':<11}{'status':<14}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'queries':>9}"
+        )
+        for row in report["results"]:
+            status = ",".join(sorted(row["status"]))
+            line = (
+                f"{row['route']:<22}{row['method']:<7}{row['role']:<11}{status:<14}"
+                f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+                f"{row['rps']:>9.1f}{row['queries_per_request']:>9.1f}"
+            )
+            self.stdout.write(self.style.ERROR(line) if row["errors"] else line)
+
+    def compare(self, report, baseline, threshold):
+        def key(row):
+            return row["route"], row["role"], row["method"]
+
+        before = {key(row): row for row in baseline.get("results", [])}
+        regressions = []
+        for row in report["results"]:
+            old = before.get(key(row))
+            if old is None:
+                continue
+            reasons = []
+            # ignore sub-millisecond wobble on very fast routes
+            if row["p95_ms"] > old["p95_ms"] * (1 + threshold) and row["p95_ms"] - old["p95_ms"] > 1:
+                reasons.append(f"p95 {old['p95_ms']:.1f} -> {row['p95_ms']:.1f} ms")
+            if row["queries_per_request"] > old["queries_per_request"] + 0.5:
+                reasons.append(f"queries {old['queries_per_request']:g} -> {row['queries_per_request']:g}")
+            if row["errors"] > old.get("errors", 0):
+                reasons.append(f"errors {old.get('errors', 0)} -> {row['errors']}")
+            if reasons:
+                regressions.append(key(row))
+                self.stdout.write(self.style.WARNING(f"REGRESSION {' '.join(key(row))}: {'; '.join(reasons)}"))
+
+        missing = set(before) - {key(row) for row in report["results"]}
+        for route, role, method in sorted(missing):
+            self.stdout.write(f"not run this time: {route} {role} {method}")
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f"no regressions against the baseline ({len(before)} scenarios)"))
+        return regressions
@@ -0,0 +1,76 @@
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError
+
+from feedback_app import assets
+
+# assets.fingerprint() of the last successful collectstatic, inside STATIC_ROOT so that
+# a fresh (empty) STATIC_ROOT always collects
+STAMP_NAME = ".assets-fingerprint"
+
+
+class Command(BaseCommand):
+    help = (
+        "Everything the start command does before gunicorn: build_assets + collectstatic, "
+        "skipped when none of their inputs changed since the last run, and the "
+        "DJANGO_SUPERUSER_USERNAME / _EMAIL / _PASSWORD account, created if missing "
+        "(a single query when it exists)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force-static", action="store_true", help="Rebuild the static files even if nothing changed.")
+        parser.add_argument(
+            "--skip-superuser", action="store_true",
+            help="Static files only, e.g. in a build step without database access.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self.static_files(options["force_static"], options["verbosity"])
+        if not options["skip_superuser"]:
+            self.superuser()
+        self.stdout.write(self.style.SUCCESS(f"bootstrap done in {time.perf_counter() - started:.2f}s"))
+
+    def static_files(self, force, verbosity):
+        if not settings.STATIC_ROOT:
+            self.stdout.write("static files: no STATIC_ROOT, nothing to collect")
+            return
+        stamp = Path(settings.STATIC_ROOT) / STAMP_NAME
+        fingerprint = assets.fingerprint()
+        if not force and self.collected() and stamp.is_file() and stamp.read_text() == fingerprint:
+            self.stdout.write("static files: unchanged, build_assets and collectstatic skipped")
+            return
+        call_command("build_assets", verbosity=verbosity)
+        call_command("collectstatic", interactive=False, verbosity=verbosity)
+        stamp.write_text(fingerprint)
+
+    def collected(self):
+        # CompressedManifestStaticFilesStorage: no manifest, nothing can be served
+        manifest = getattr(staticfiles_storage, "manifest_name", None)
+        return manifest is None or staticfiles_storage.exists(manifest)
+
+    def superuser(self):
+        username = os.environ.get("DJANGO_SUPERUSER_USERNAME")
+        password = os.environ.get("DJANGO_SUPERUSER_PASSWORD")
+        if not (username and password):
+            self.stdout.write("superuser: DJANGO_SUPERUSER_USERNAME / _PASSWORD not set, skipped")
+            return
+        User = get_user_model()
+        users = User._default_manager
+        if users.filter(**{User.USERNAME_FIELD: username}).exists():
+            self.stdout.write(f"superuser: {username} exists")
+            return
+        try:
+            users.create_superuser(username, os.environ.get("DJANGO_SUPERUSER_EMAIL", ""), password)
+        except IntegrityError:
+            # another container got there first
+            self.stdout.write(f"superuser: {username} exists")
+            return
+        self.stdout.write(f"superuser: {username} created")
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from feedback_app import assets
+
+
+class Command(BaseCommand):
+    help = (
+        "Trim Bootstrap's CSS to the classes the templates use and write static/build/app.css "
+        "plus the critical.css that base.html inlines. Run it before collectstatic, which adds "
+        "the content hashes and the gzip / brotli variants WhiteNoise serves."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output-dir", help="Default: settings.ASSETS_BUILD_DIR (static/build).")
+
+    def handle(self, *args, **options):
+        report = assets.build(options["output_dir"])
+        self.stdout.write(f"{'first page load':<28}{'raw':>10}{'gzip':>10}{'brotli':>10}")
+        totals = {}
+        for phase, files in report.items():
+            for name, size in files.items():
+                self.stdout.write(f"  {phase:<7}{name:<21}" + "".join(self.column(size[k]) for k in ("raw", "gzip", "brotli")))
+            totals[phase] = {k: self.total(files.values(), k) for k in ("raw", "gzip", "brotli")}
+        before, after = totals["before"], totals["after"]
+        blocking_before = report["before"]["render-blocking css"]["gzip"]
+        blocking_after = report["after"]["inlined critical css"]["gzip"]
+        saved = before["gzip"] - after["gzip"]
+        self.stdout.write(self.style.SUCCESS(
+            f"gzip: {before['gzip']:,} -> {after['gzip']:,} bytes on the first page load "
+            f"({saved:,} saved, {saved / before['gzip']:.0%}); render-blocking CSS "
+            f"{blocking_before:,} -> {blocking_after:,} bytes, now inside the HTML"
+        ))
+        if after["brotli"] is None:
+            self.stdout.write("install Brotli for .br variants (and the brotli column)")
+
+    def column(self, value):
+        return f"{value:>10,}" if value is not None else f"{'-':>10}"
+
+    def total(self, sizes, key):
+        values = [size[key] for size in sizes]
+        return None if None in values else sum(values)
@@ -0,0 +1,127 @@
+import json
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.utils import timezone
+
+from feedback_app.models import ArchivedFeedbackReply, Feedback, FeedbackReply
+from feedback_app.pagination import MergedCursorPaginator
+from feedback_app.views import AdminDashboardView, MyFeedbackView
+
+
+def sqlite_plan_problems(plan):
+    """Find table scans and temp-b-tree sorts in SQLite's EXPLAIN QUERY PLAN text."""
+    problems = []
+    for line in plan.splitlines():
+        if "USE TEMP B-TREE" in line:
+            problems.append(f"filesort: {line.strip()}")
+            continue
+        match = re.search(r"\bSCAN (\S+)(.*)", line)
+        if not match or "VIRTUAL TABLE" in match.group(2):
+            continue
+        # walking an index in order (stopped by LIMIT) is fine, a bare table scan is not
+        if "INDEX" not in match.group(2):
+            problems.append(f"full scan: {line.strip()}")
+    return problems
+
+
+def mysql_plan_problems(plan):
+    """Find access_type ALL and filesorts in MySQL's EXPLAIN FORMAT=JSON output."""
+    problems = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if node.get("access_type") == "ALL":
+                problems.append(f"full scan: {node.get('table_name')}")
+            if node.get("using_filesort"):
+                problems.append("filesort")
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(json.loads(plan))
+    return problems
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN on the querysets the dashboard and my-feedback views build "
+        "and fail if any of them needs a full table scan or a filesort."
+    )
+
+    def build_view(self, view_class, user, params=None):
+        request = RequestFactory().get("/", params or {})
+        request.user = user
+        view = view_class()
+        view.setup(request)
+        return view
+
+    def page_querysets(self, label, view):
+        qs = view.get_queryset()
+        paginator = view.get_paginator(qs, view.paginate_by)
+        # a cursor somewhere in the middle of the list
+        marker = Feedback(id=1, created_at=timezone.now())
+        cursor = paginator.cursor_for(marker)
+        for page, kwargs in (("first page", {}), ("next page", {"after": cursor}), ("previous page", {"before": cursor})):
+            if isinstance(paginator, MergedCursorPaginator):
+                # one query per table (?archive=1)
+                for page_qs in paginator.page_querysets(**kwargs):
+                    yield f"{label}: {page} ({page_qs.model._meta.model_name})", page_qs
+            else:
+                yield f"{label}: {page}", paginator.page_queryset(**kwargs)
+
+    def querysets(self):
+        staff = User(id=1, username="plan-check-staff", is_staff=True)
+        member = User(id=2, username="plan-check-user")
+
+        # (search results are ranked by relevance, so they are not checked here)
+        for date_filter in ("", "today", "week"):
+            view = self.build_view(AdminDashboardView, staff, {"date": date_filter})
+            yield from self.page_querysets(f"dashboard date={date_filter or 'all'}", view)
+
+        view = self.build_view(MyFeedbackView, member)
+        yield from self.page_querysets("my feedback", view)
+
+        view = self.build_view(AdminDashboardView, staff, {"archive": "1"})
+        yield from self.page_querysets("dashboard archive=1", view)
+        view = self.build_view(MyFeedbackView, member, {"archive": "1"})
+        yield from self.page_querysets("my feedback archive=1", view)
+
+        yield "replies prefetch", FeedbackReply.objects.for_listing().filter(feedback__in=[1, 2, 3])
+        yield "archived replies prefetch", ArchivedFeedbackReply.objects.for_listing().filter(feedback__in=[1, 2, 3])
+        # archive_feedback picks each batch this way
+        yield "archive batch", (
+            Feedback.objects.filter(created_at__lt=timezone.now()).order_by("created_at", "id").values_list("pk")[:500]
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            explain = lambda qs: qs.explain()
+            find_problems = sqlite_plan_problems
+        elif connection.vendor == "mysql":
+            explain = lambda qs: qs.explain(format="json")
+            find_problems = mysql_plan_problems
+        else:
+            raise CommandError(f"Don't know how to read query plans for {connection.vendor}.")
+
+        failures = 0
+        for label, qs in self.querysets():
+            plan = explain(qs)
+            problems = find_problems(plan)
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"FAIL  {label}"))
+                for problem in problems:
+                    self.stdout.write(f"      {problem}")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"ok    {label}"))
+            if options["verbosity"] > 1:
+                self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f"{failures} queryset(s) need a full scan or a filesort.")
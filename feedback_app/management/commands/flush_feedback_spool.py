@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from feedback_app.ingest import flush_spool, get_spool
+
+
+class Command(BaseCommand):
+    help = (
+        "Move buffered feedback submissions from the local spool into the database "
+        "with bulk inserts. Use --loop to keep running as a worker process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=getattr(settings, "FEEDBACK_SPOOL_BATCH_SIZE", 500))
+        parser.add_argument(
+            "--interval", type=float, default=getattr(settings, "FEEDBACK_SPOOL_FLUSH_INTERVAL", 2.0),
+            help="Seconds to wait between flushes when the spool has less than a full batch.",
+        )
+        parser.add_argument("--loop", action="store_true", help="Keep flushing until interrupted.")
+
+    def handle(self, *args, **options):
+        spool = get_spool()
+        batch_size = options["batch_size"]
+        self.stdout.write(f"{spool.pending_count()} submission(s) waiting in {spool.path}")
+
+        total = 0
+        try:
+            while True:
+                moved = flush_spool(batch_size, spool=spool)
+                total += moved
+                if moved == batch_size:
+                    continue  # backlog: keep going without sleeping
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Flushed {total} submission(s)."))
@@ -0,0 +1,75 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from feedback_app import sharding
+from feedback_app.seeding import Generator, fast_sqlite_writes
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the configured database with synthetic users, feedback and replies for "
+        "scale testing: a deterministic (--seed) stream of rows with growing, weekly and "
+        "office-hours shaped created_at values, written in batches with one executemany() "
+        "of a plain INSERT each (seeding.RowWriter, no model instances) in constant memory. Adds rows next to "
+        "whatever is there and keeps the daily stats rollup in step. Refuses to run "
+        "with FEEDBACK_SHARDS set. Never run it against production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--feedback", type=int, default=100_000, help="Feedback rows to add.")
+        parser.add_argument("--reply-ratio", type=float, default=0.3, help="Share of feedback that gets replies.")
+        parser.add_argument("--users", type=int, default=1000, help="New users to spread the feedback over.")
+        parser.add_argument("--staff", type=int, default=5, help="New staff users who write the replies.")
+        parser.add_argument("--days", type=int, default=365, help="Length of the period the rows are spread over.")
+        parser.add_argument(
+            "--end", type=date.fromisoformat,
+            help="Last day of the period (YYYY-MM-DD, default yesterday). Fix it for byte-identical runs.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=2000, help="Rows per transaction.")
+
+    def handle(self, *args, **options):
+        if sharding.enabled():
+            # the rows go straight to "default" with sequential ids, past the shard id scheme
+            raise CommandError("FEEDBACK_SHARDS is set; seed a database without sharding")
+        if options["users"] < 1 or options["staff"] < 1 or options["days"] < 1:
+            raise CommandError("--users, --staff and --days must be at least 1")
+        if not 0 <= options["reply_ratio"] <= 1:
+            raise CommandError("--reply-ratio must be between 0 and 1")
+
+        started = time.perf_counter()
+        report_every = max(options["feedback"] // 20, options["batch_size"])
+        reported = 0
+
+        def progress(written, replies):
+            nonlocal reported
+            if written - reported >= report_every or written == options["feedback"]:
+                reported = written
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{written:>12,} feedback {replies:>12,} replies  "
+                    f"{elapsed:7.1f}s  {(written + replies) / elapsed:9,.0f} rows/s"
+                )
+
+        generator = Generator(
+            seed=options["seed"], days=options["days"], end=options["end"],
+            batch_size=options["batch_size"], progress=progress,
+        )
+        # DEBUG would keep the SQL of every batch in memory
+        with override_settings(DEBUG=False):
+            fast_sqlite_writes()
+            user_ids = generator.create_users(options["users"])
+            staff_ids = generator.create_users(options["staff"], staff=True)
+            written, replies = generator.generate(
+                options["feedback"], user_ids, staff_ids, options["reply_ratio"],
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"added {options['users']} users, {options['staff']} staff, {written:,} feedback and "
+            f"{replies:,} replies ({generator.first} .. {generator.end}) "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
+
@@ -0,0 +1,58 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from feedback_app import sharding
+from feedback_app.models import ArchivedFeedback, ArchivedFeedbackReply, DailyFeedbackStats, Feedback, FeedbackReply
+
+# archive_feedback moves rows without touching the rollup, so both tables count
+SOURCES = [(Feedback, FeedbackReply), (ArchivedFeedback, ArchivedFeedbackReply)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the DailyFeedbackStats rollup from the feedback and reply tables, "
+        "archived ones included (on every shard). Deleted rows are gone, so deleted "
+        "counts restart at 0."
+    )
+
+    def handle(self, *args, **options):
+        tz = timezone.get_current_timezone()
+
+        # days are bucketed in Python: TruncDate needs the MySQL time zone tables,
+        # which many hosted databases don't have loaded
+        created = Counter()
+        replied = Counter()
+        # every shard (see sharding.py); a feedback and its replies are always on the same one
+        for db in sharding.databases():
+            for feedback_model, reply_model in SOURCES:
+                timestamps = feedback_model.objects.using(db).order_by().values_list("created_at", flat=True)
+                for created_at in timestamps.iterator(chunk_size=5000):
+                    created[timezone.localdate(created_at, tz)] += 1
+
+                # a feedback counts as "replied" on the day of its first reply
+                # (archived together with it, so never split across the two tables)
+                first_replies = (
+                    reply_model.objects.using(db).order_by()
+                    .values("feedback")
+                    .annotate(first=Min("created_at"))
+                    .values_list("first", flat=True)
+                )
+                for first in first_replies.iterator(chunk_size=5000):
+                    replied[timezone.localdate(first, tz)] += 1
+
+        days = sorted(set(created) | set(replied))
+        with transaction.atomic():
+            DailyFeedbackStats.objects.all().delete()
+            DailyFeedbackStats.objects.bulk_create(
+                [DailyFeedbackStats(day=day, created=created[day], replied=replied[day]) for day in days],
+                batch_size=1000,
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt stats for {len(days)} day(s): "
+            f"{sum(created.values())} feedback, {sum(replied.values())} replied."
+        ))
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from feedback_app.search import create_search_index, drop_search_index
+
+
+def forwards(apps, schema_editor):
+    create_search_index(schema_editor.connection)
+
+
+def backwards(apps, schema_editor):
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0004_feedbackreply'),
+    ]
+
+    operations = [
+        # MySQL: FULLTEXT index, SQLite: FTS5 table + triggers, others: nothing
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0005_feedback_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['created_at', 'id'], name='feedback_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='feedback_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedbackreply',
+            index=models.Index(fields=['feedback', 'created_at', 'id'], name='reply_feedback_created_idx'),
+        ),
+    ]
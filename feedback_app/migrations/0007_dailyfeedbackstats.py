@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:25
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Min
+from django.utils import timezone
+
+
+def fill_stats(apps, schema_editor):
+    # seed the rollup from the rows that already exist (same logic as rebuild_feedback_stats)
+    Feedback = apps.get_model('feedback_app', 'Feedback')
+    FeedbackReply = apps.get_model('feedback_app', 'FeedbackReply')
+    DailyFeedbackStats = apps.get_model('feedback_app', 'DailyFeedbackStats')
+    created = Counter()
+    for created_at in Feedback.objects.order_by().values_list('created_at', flat=True).iterator(chunk_size=5000):
+        created[timezone.localdate(created_at)] += 1
+    replied = Counter()
+    firsts = FeedbackReply.objects.order_by().values('feedback').annotate(first=Min('created_at')).values_list('first', flat=True)
+    for first in firsts.iterator(chunk_size=5000):
+        replied[timezone.localdate(first)] += 1
+    DailyFeedbackStats.objects.bulk_create(
+        [DailyFeedbackStats(day=day, created=created[day], replied=replied[day]) for day in sorted(set(created) | set(replied))],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0006_feedback_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyFeedbackStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('created', models.PositiveIntegerField(default=0)),
+                ('replied', models.PositiveIntegerField(default=0)),
+                ('deleted', models.PositiveIntegerField(default=0)),
+                ('replied_deleted', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:26
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0007_dailyfeedbackstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedback',
+            name='ingest_key',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='feedback',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0008_feedback_ingest_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedback',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
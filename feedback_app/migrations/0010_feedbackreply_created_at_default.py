@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:51
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0009_feedback_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='feedbackreply',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
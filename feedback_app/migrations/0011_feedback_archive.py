@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0010_feedbackreply_created_at_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedFeedback',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254)),
+                ('message', models.TextField()),
+                ('created_at', models.DateTimeField()),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedFeedbackReply',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('message', models.TextField()),
+                ('created_at', models.DateTimeField()),
+                ('admin', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('feedback', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='feedback_app.archivedfeedback')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedfeedback',
+            index=models.Index(fields=['created_at', 'id'], name='archived_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedfeedback',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='archived_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedfeedbackreply',
+            index=models.Index(fields=['feedback', 'created_at', 'id'], name='archived_reply_feedback_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:01
+
+import django.db.models.deletion
+import feedback_app.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0012_sharding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackSearchIndex',
+            fields=[
+                ('feedback', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='feedback_app.feedback')),
+                ('document', feedback_app.search.FTS5Document(db_column='feedback_app_feedback_fts')),
+            ],
+            options={
+                'db_table': 'feedback_app_feedback_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:33
+
+import django.db.models.deletion
+import feedback_app.sharding
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback_app', '0014_cache_generation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # 0012 dropped these constraints everywhere; only shards without the users need that
+    operations = [
+        feedback_app.sharding.AlterUserForeignKey(
+            model_name='archivedfeedback',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        feedback_app.sharding.AlterUserForeignKey(
+            model_name='archivedfeedbackreply',
+            name='admin',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        feedback_app.sharding.AlterUserForeignKey(
+            model_name='feedback',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        feedback_app.sharding.AlterUserForeignKey(
+            model_name='feedbackreply',
+            name='admin',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,226 @@
+import hashlib
+import inspect
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+from . import assets, routers, sharding
+
+
+class OwnerObjectMixin:
+    """
+    Load the object named by the URL's `pk` once per request, together with its
+    owner, and check access against that same instance before the handler runs.
+
+    get_object() returns the loaded instance, so UpdateView & co. and the
+    handlers reuse it instead of querying again. Put it after
+    LoginRequiredMixin so anonymous users are sent to the login page first.
+    """
+    model = None
+    owner_field = "user"
+    # staff may act on anybody's object
+    allow_staff = True
+
+    def get_object_db(self):
+        """The database to load the object from; None leaves it to the routers."""
+        return None
+
+    def get_object_queryset(self):
+        db = self.get_object_db()
+        if db is not None:
+            # a database of its own (e.g. a feedback shard) has no users to join
+            return self.model._default_manager.using(db)
+        return self.model._default_manager.select_related(self.owner_field)
+
+    def get_object(self, queryset=None):
+        if not hasattr(self, "_owned_object"):
+            self._owned_object = get_object_or_404(self.get_object_queryset(), pk=self.kwargs["pk"])
+        return self._owned_object
+
+    def has_object_permission(self, obj):
+        user = self.request.user
+        if self.allow_staff and user.is_staff:
+            return True
+        owner_id = getattr(obj, f"{self.owner_field}_id")
+        return owner_id is not None and owner_id == user.pk
+
+    def handle_object_permission_denied(self):
+        raise PermissionDenied
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.has_object_permission(self.get_object()):
+            return self.handle_object_permission_denied()
+        return super().dispatch(request, *args, **kwargs)
+
+
+class ArchiveToggleMixin:
+    """
+    List views read only the hot Feedback table unless ?archive=1 asks for the
+    archive too (rows moved there by `manage.py archive_feedback`). Then the
+    page is merged from get_queryset() and get_archive_queryset(); put it
+    before CursorPaginationMixin.
+    """
+    archive_param = "archive"
+
+    def include_archive(self):
+        return self.request.GET.get(self.archive_param) == "1"
+
+    def get_archive_queryset(self):
+        """The archived counterpart of get_queryset(), filtered the same way."""
+        raise NotImplementedError
+
+    def get_paginated_querysets(self, queryset):
+        if self.include_archive():
+            return [queryset, self.get_archive_queryset()]
+        return super().get_paginated_querysets(queryset)
+
+    def get_archive_toggle_url(self):
+        params = self.request.GET.copy()
+        for name in ("after", "before", self.archive_param):
+            params.pop(name, None)
+        if not self.include_archive():
+            params[self.archive_param] = "1"
+        return f"?{params.urlencode()}"
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["include_archive"] = self.include_archive()
+        ctx["archive_toggle_url"] = self.get_archive_toggle_url()
+        return ctx
+
+
+@lru_cache(maxsize=1)
+def _templates_version():
+    """Digest of the templates (and inlined CSS) this process renders with, so a deploy changes every ETag."""
+    digest = hashlib.md5(usedforsecurity=False)
+    for path in [*assets.template_files(), assets.build_dir() / "critical.css"]:
+        if Path(path).exists():
+            digest.update(Path(path).read_bytes())
+    return digest.hexdigest()
+
+
+class ConditionalGetMixin:
+    """
+    Answer a GET with 304 Not Modified, before any queryset is built or
+    template rendered, when the browser's copy of the page is still current.
+
+    get_etag_parts() returns the cheap values the page depends on (data
+    versions, counts); the URL, the user, their session and the deployed
+    templates are added here. Return None to always render. Put it after the
+    permission mixins, so their redirects come first; works for the async
+    views too (get_etag() then runs in a thread).
+
+    The pages embed a CSRF token, which the ETag leaves out. It changes at
+    login, which also gives a new session (or, logging in again over the same
+    one, a new csrftoken cookie: the response varies on Cookie), or when the
+    cookie is missing, and then the page is always rendered (it sets a new one).
+    """
+
+    def get_etag_parts(self):
+        return None
+
+    def get_etag(self):
+        parts = self.get_etag_parts()
+        # messages are shown once, so a page with some waiting is always rendered
+        if parts is None or len(messages.get_messages(self.request)):
+            return None
+        request = self.request
+        raw = "\0".join(map(str, [
+            _templates_version(), request.user.pk, request.session.session_key,
+            request.get_full_path(), *parts,
+        ]))
+        # weak: the bytes differ between renders (masked CSRF tokens), the content doesn't
+        return f'W/"{hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()}"'
+
+    def add_etag(self, response, etag):
+        response["ETag"] = etag
+        # per-user page that must be revalidated on every load
+        patch_cache_control(response, private=True, no_cache=True)
+        # a copy stored under other cookies (another login, another CSRF token) isn't revalidated
+        patch_vary_headers(response, ["Cookie"])
+        return response
+
+    def conditional_response(self, etag):
+        """The 304 (or 412) for this request, or None to render the page."""
+        # no CSRF cookie: this render sets one, and the browser's copy has a token for another
+        if "CSRF_COOKIE" not in self.request.META:
+            return None
+        stub = self.add_etag(HttpResponse(), etag)
+        response = get_conditional_response(self.request, etag=etag, response=stub)
+        return None if response is stub else response
+
+    def with_etag(self, response, etag):
+        if etag and response.status_code == 200 and not response.streaming:
+            self.add_etag(response, etag)
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+        if self.view_is_async:
+            return self._adispatch(request, *args, **kwargs)
+        etag = self.get_etag()
+        if etag and (response := self.conditional_response(etag)):
+            return response
+        return self.with_etag(super().dispatch(request, *args, **kwargs), etag)
+
+    async def _adispatch(self, request, *args, **kwargs):
+        etag = await sync_to_async(self.get_etag)()
+        if etag and (response := self.conditional_response(etag)):
+            return response
+        response = super().dispatch(request, *args, **kwargs)
+        if inspect.isawaitable(response):
+            response = await response
+        return self.with_etag(response, etag)
+
+
+class ReplicaReadsMixin:
+    """
+    Read this view's GETs from a database replica when there is a healthy one
+    and the user isn't pinned to the primary (see routers). self.read_db is
+    the alias chosen, None for the primary.
+
+    get_written_at() returns when the data the page shows last changed; a
+    replica is only used once that is older than the sticky window, so a
+    cached copy of the page can't be filled from rows the replica doesn't
+    have yet. Put it before ConditionalGetMixin, so the ETag inputs are read
+    from the same database; set replica_reads = False to opt a subclass out.
+    """
+
+    replica_reads = True
+    read_db = None
+
+    def get_written_at(self):
+        return 0
+
+    def replica_may_be_behind(self, written_at):
+        """True if this request reads a replica and the data changed within the sticky window."""
+        return self.read_db is not None and time.time() - written_at < routers.sticky_seconds()
+
+    def choose_read_db(self):
+        # (replicas and shards don't mix yet)
+        if not (self.replica_reads and routers.replicas() and self.request.method in ("GET", "HEAD")) or sharding.enabled():
+            return
+        self.read_db = routers.replica_for(self.request, self.get_written_at())
+        routers.read_from(self.read_db)
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self._adispatch_read_db(request, *args, **kwargs)
+        self.choose_read_db()
+        return super().dispatch(request, *args, **kwargs)
+
+    async def _adispatch_read_db(self, request, *args, **kwargs):
+        # the health check queries the replica, which can't happen on the event loop
+        await sync_to_async(self.choose_read_db)()
+        response = super().dispatch(request, *args, **kwargs)
+        if inspect.isawaitable(response):
+            response = await response
+        return response
@@ -1,14 +1,63 @@
 from django.db import models
+from django.db.models import Prefetch
+from django.utils import timezone
 from django.contrib.auth.models import User
 
+from .search import FTS_TABLE, FTS5Document
+
+
+class FeedbackQuerySet(models.QuerySet):
+    def with_replies(self):
+        """
+        Batch-load replies (and the admin who wrote each one), so listing
+        feedback costs a fixed number of queries no matter how many items or
+        replies there are. Counts come from the loaded replies
+        (`replies.all|length`, len() in export.py), not a per-row subquery.
+        """
+        # works for Feedback and ArchivedFeedback alike
+        reply_model = self.model._meta.get_field("replies").related_model
+        return self.prefetch_related(
+            Prefetch("replies", queryset=reply_model.objects.for_listing())
+        )
+
+
+class FeedbackReplyQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Replies with their admin user, oldest first within each feedback."""
+        from .sharding import enabled as sharding_enabled
+        # same column order as reply_feedback_created_idx, so no sort step
+        queryset = self.order_by("feedback", "created_at", "id")
+        # users aren't on the shards, so they can't be joined there (see sharding.py)
+        return queryset.prefetch_related("admin") if sharding_enabled() else queryset.select_related("admin")
+
 
 # Create your models here.
+# On shards other than "default" the user foreign keys have no database
+# constraint, as the users live on "default" (see sharding.AlterUserForeignKey,
+# which any migration altering them has to use).
 class Feedback(models.Model):
     user = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     email = models.EmailField()
     message = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # default instead of auto_now_add so buffered/bulk inserts can keep the submit time
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # set by the buffered ingest path; makes replaying a spooled batch idempotent
+    ingest_key = models.UUIDField(null=True, blank=True, unique=True, editable=False)
+    # bumped on every edit / reply (see signals.py); part of the rendered-card cache key
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    objects = FeedbackQuerySet.as_manager()
+
+    is_archived = False
+
+    class Meta:
+        indexes = [
+            # dashboard: ORDER BY created_at DESC, id DESC + today/week ranges
+            models.Index(fields=["created_at", "id"], name="feedback_created_idx"),
+            # my feedback: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+            models.Index(fields=["user", "created_at", "id"], name="feedback_user_created_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -17,7 +66,123 @@ class FeedbackReply(models.Model):
     feedback = models.ForeignKey(Feedback, on_delete=models.CASCADE, related_name='replies')
     admin = models.ForeignKey(User,on_delete=models.SET_NULL,null=True)
     message = models.TextField()
-    created_at= models.DateTimeField(auto_now_add=True)
+    # default instead of auto_now_add so bulk inserts (seeding.py) can keep their own time
+    created_at= models.DateTimeField(default=timezone.now, editable=False)
+
+    objects = FeedbackReplyQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # replies are always read per feedback, oldest first
+            models.Index(fields=["feedback", "created_at", "id"], name="reply_feedback_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"Reply to {self.feedback.id}"
+
+
+class FeedbackSearchIndex(models.Model):
+    """
+    The SQLite FTS5 table (search.py) as a model, only so the dashboard search
+    can join it: Feedback.objects.filter(search_index__document__match=...).
+    Not managed: search.create_search_index() creates it, and only on SQLite.
+    """
+    feedback = models.OneToOneField(
+        Feedback, primary_key=True, db_column="rowid", on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name="search_index",
+    )
+    document = FTS5Document(db_column=FTS_TABLE)
+
+    class Meta:
+        managed = False
+        db_table = FTS_TABLE
+
+class DailyFeedbackStats(models.Model):
+    """
+    Daily rollup for the dashboard cards, updated as feedback is written
+    (see feedback_app.stats) and rebuilt by `manage.py rebuild_feedback_stats`.
+    """
+    day = models.DateField(unique=True)
+    created = models.PositiveIntegerField(default=0)
+    # feedback that got its first reply on this day
+    replied = models.PositiveIntegerField(default=0)
+    deleted = models.PositiveIntegerField(default=0)
+    # how many of the deleted ones had already been replied to
+    replied_deleted = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Stats for {self.day}"
+
+
+class ArchivedFeedback(models.Model):
+    """
+    Feedback moved out of the hot table by `manage.py archive_feedback`, with
+    the same id and columns. Read-only; lists only show it when asked to
+    include the archive (?archive=1).
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE, related_name="+")
+    name = models.CharField(max_length=100)
+    email = models.EmailField()
+    message = models.TextField()
+    created_at = models.DateTimeField()
+    version = models.PositiveIntegerField(default=1)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    objects = FeedbackQuerySet.as_manager()
+
+    is_archived = True
+
+    class Meta:
+        indexes = [
+            # same access paths as the hot table
+            models.Index(fields=["created_at", "id"], name="archived_created_idx"),
+            models.Index(fields=["user", "created_at", "id"], name="archived_user_created_idx"),
+        ]
+
+    def __str__(self):
+        return self.name
+
+class ArchivedFeedbackReply(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    feedback = models.ForeignKey(ArchivedFeedback, on_delete=models.CASCADE, related_name='replies')
+    admin = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="+")
+    message = models.TextField()
+    created_at = models.DateTimeField()
+
+    objects = FeedbackReplyQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["feedback", "created_at", "id"], name="archived_reply_feedback_idx"),
+        ]
+
+    def __str__(self):
+        return f"Reply to {self.feedback_id}"
+
+
+class IdSequence(models.Model):
+    """
+    Counters for ids that have to be unique across databases: the sharded
+    feedback and reply ids (sharding.allocate). Always on "default".
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class CacheGeneration(models.Model):
+    """
+    The cache generations of caching.py, for when the cache is local to each
+    process (locmem): a bump from another process (a worker, flush_feedback_spool,
+    archive_feedback) has to reach every process's cached lists. Always on "default".
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField()
+    # time.time() of the last bump (see routers: a lagging replica may not have that write yet)
+    written_at = models.FloatField(default=0)
 
     def __str__(self):
-        return f"Reply to {self.feedback.id}"
\ No newline at end of file
+        return f"{self.name} = {self.value}"
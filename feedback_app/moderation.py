@@ -0,0 +1,102 @@
+"""
+Set-based bulk moderation for the admin dashboard.
+
+Each action runs the same handful of SQL statements whether the queryset
+matches ten rows or fifty thousand: one aggregate for the counts, DELETE /
+INSERT ... SELECT / UPDATE statements filtered by the queryset itself, and
+the rollup bumps. No feedback rows are loaded into Python, only the owners'
+ids (to invalidate their cached lists); with sharding, bulk reply also reads
+the feedback ids, since reply ids come from the shared sequence. Each call
+works on one database, so the dashboard runs it once per shard.
+
+The signals in signals.py don't fire for these statements, so this module
+updates the stats rollup, Feedback.version and the owners' generations itself.
+"""
+from django.db import connections, transaction
+from django.db.models import Count, Exists, F, Max, OuterRef
+from django.utils import timezone
+
+from . import caching, sharding, stats
+from .models import Feedback, FeedbackReply
+
+
+def _snapshot(queryset):
+    """Match count, how many of those have replies, and the highest id."""
+    has_replies = Exists(FeedbackReply.objects.filter(feedback=OuterRef("pk")))
+    return queryset.aggregate(total=Count("pk"), replied=Count("pk", filter=has_replies), last_id=Max("pk"))
+
+
+def _bump_owners(queryset):
+    owner_ids = queryset.exclude(user=None).values_list("user_id", flat=True).distinct()
+    for user_id in owner_ids:
+        caching.bump_user_generation(user_id, queryset.db)
+
+
+def bulk_delete(queryset):
+    """Delete every feedback in `queryset` with its replies. Returns the number deleted."""
+    queryset = queryset.order_by()
+    with transaction.atomic(using=queryset.db):
+        snapshot = _snapshot(queryset)
+        if not snapshot["total"]:
+            return 0
+        # rows that start matching while this runs (new submissions) are left alone,
+        # so the counts recorded below stay exact
+        queryset = queryset.filter(pk__lte=snapshot["last_id"])
+        _bump_owners(queryset)
+        # plain DELETEs: nothing cascades for us, so replies go first
+        FeedbackReply.objects.filter(feedback__in=queryset.values("pk"))._raw_delete(queryset.db)
+        deleted = queryset._raw_delete(queryset.db)
+        stats.record_deleted(deleted, replied=snapshot["replied"])
+    return deleted
+
+
+def bulk_reply(queryset, admin, message):
+    """Add the same reply from `admin` to every feedback in `queryset`. Returns the number of replies."""
+    queryset = queryset.order_by()
+    db = queryset.db
+    connection = connections[db]
+    with transaction.atomic(using=db):
+        snapshot = _snapshot(queryset)
+        if not snapshot["total"]:
+            return 0
+        queryset = queryset.filter(pk__lte=snapshot["last_id"])
+        _bump_owners(queryset)
+
+        if sharding.enabled():
+            # reply ids come from the shared sequence (see sharding.py), so the rows are built here;
+            # still only the feedback ids are read
+            now = timezone.now()
+            replies = [
+                FeedbackReply(feedback_id=pk, admin_id=admin.pk, message=message, created_at=now)
+                for pk in queryset.values_list("pk", flat=True).iterator()
+            ]
+            sharding.assign_ids(replies)
+            created = len(FeedbackReply.objects.using(db).bulk_create(replies, batch_size=1000))
+        else:
+            created = _insert_replies(queryset, admin, message, connection)
+
+        # the cards show the replies, so their cache keys have to change
+        queryset.update(version=F("version") + 1)
+        # the ones that had no reply yet get their first one today
+        stats.record_replied(snapshot["total"] - snapshot["replied"])
+    return created
+
+
+def _insert_replies(queryset, admin, message, connection):
+    # INSERT ... SELECT: the ORM has no set-based insert
+    quote = connection.ops.quote_name
+    reply_meta, feedback_meta = FeedbackReply._meta, Feedback._meta
+    columns = ", ".join(
+        quote(reply_meta.get_field(name).column) for name in ("feedback", "admin", "message", "created_at")
+    )
+    ids_sql, ids_params = queryset.values("pk").query.sql_with_params()
+    pk_column = quote(feedback_meta.pk.column)
+    sql = (
+        f"INSERT INTO {quote(reply_meta.db_table)} ({columns}) "
+        f"SELECT {pk_column}, %s, %s, %s FROM {quote(feedback_meta.db_table)} "
+        f"WHERE {pk_column} IN ({ids_sql})"
+    )
+    created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [admin.pk, message, created_at, *ids_params])
+        return cursor.rowcount
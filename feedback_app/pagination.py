@@ -0,0 +1,320 @@
+import base64
+import binascii
+import heapq
+import json
+from datetime import date, datetime
+from functools import cmp_to_key
+from itertools import islice
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(Exception):
+    """Raised when a cursor from the query string cannot be decoded."""
+
+
+def _json_default(value):
+    # keep full microsecond precision, DjangoJSONEncoder would cut it to milliseconds
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(values):
+    """Turn a list of ordering values into an opaque url-safe string."""
+    raw = json.dumps(values, default=_json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Reverse of encode_cursor(). Raises InvalidCursor on garbage input."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error) as exc:
+        raise InvalidCursor(cursor) from exc
+    if not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return values
+
+
+class CursorPage:
+    """One page of keyset-paginated results (looks enough like Django's Page for templates)."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset ("seek") pagination.
+
+    Instead of OFFSET, every page filters on the ordering values of the last row
+    of the previous page, e.g. for ordering ("-created_at", "-id"):
+
+        created_at <= c AND (created_at < c OR (created_at = c AND id < i))
+
+    The leading range condition lets the database seek straight into the
+    (created_at, id) index, so page N costs the same as page 1.
+    """
+
+    def __init__(self, queryset, per_page, ordering=("-created_at", "-id")):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+
+    @cached_property
+    def count(self):
+        return self.queryset.count()
+
+    # --- cursor helpers -------------------------------------------------
+    def _fields(self):
+        return [name.lstrip("-") for name in self.ordering]
+
+    def cursor_for(self, obj):
+        return encode_cursor([getattr(obj, name) for name in self._fields()])
+
+    def _parse(self, cursor):
+        values = decode_cursor(cursor)
+        names = self._fields()
+        if len(values) != len(names):
+            raise InvalidCursor(cursor)
+        parsed = []
+        for name, value in zip(names, values):
+            try:
+                field = self.queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                # annotations (e.g. a search rank) are stored as plain JSON values
+                parsed.append(value)
+                continue
+            try:
+                parsed.append(field.to_python(value))
+            except Exception as exc:
+                raise InvalidCursor(cursor) from exc
+        return parsed
+
+    def _seek(self, values, reverse=False):
+        # Build the "strictly after these values" condition for the ordering.
+        ops = []
+        for name in self.ordering:
+            descending = name.startswith("-")
+            if reverse:
+                descending = not descending
+            ops.append("lt" if descending else "gt")
+
+        names = self._fields()
+        leading = Q(**{f"{names[0]}__{ops[0]}e": values[0]})
+        after = Q()
+        for i, name in enumerate(names):
+            step = Q(**{f"{name}__{ops[i]}": values[i]})
+            for j in range(i):
+                step &= Q(**{names[j]: values[j]})
+            after |= step
+        return leading & after
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith("-") else f"-{name}" for name in self.ordering]
+
+    # --- querysets ------------------------------------------------------
+    def page_queryset(self, after=None, before=None):
+        """The sliced queryset that page() evaluates (handy for EXPLAIN)."""
+        qs = self.queryset
+        if before:
+            qs = qs.filter(self._seek(self._parse(before), reverse=True))
+            return qs.order_by(*self._reversed_ordering())[: self.per_page + 1]
+        if after:
+            qs = qs.filter(self._seek(self._parse(after)))
+        return qs.order_by(*self.ordering)[: self.per_page + 1]
+
+    def build_page(self, rows, after=None, before=None):
+        """Turn per_page + 1 fetched rows into a CursorPage."""
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if before:
+            rows.reverse()
+            previous_cursor = self.cursor_for(rows[0]) if has_more else None
+            next_cursor = self.cursor_for(rows[-1]) if rows else None
+        else:
+            next_cursor = self.cursor_for(rows[-1]) if has_more else None
+            previous_cursor = self.cursor_for(rows[0]) if after and rows else None
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+    def page(self, after=None, before=None):
+        rows = list(self.page_queryset(after=after, before=before))
+        return self.build_page(rows, after=after, before=before)
+
+    async def apage(self, after=None, before=None):
+        rows = [obj async for obj in self.page_queryset(after=after, before=before)]
+        return self.build_page(rows, after=after, before=before)
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """
+    Keyset pagination over several querysets with the same ordering fields,
+    e.g. the hot Feedback table and its archive, or the same query on every
+    feedback shard. Each queryset is paged on its own (one indexed query each)
+    and the already ordered pages are k-way merged in Python, so a page still
+    costs a fixed number of queries. Primary keys must not repeat across
+    the querysets, or the id tie-break stops being unique.
+    """
+
+    def __init__(self, querysets, per_page, ordering=("-created_at", "-id")):
+        super().__init__(querysets[0], per_page, ordering)
+        self.querysets = list(querysets)
+
+    @cached_property
+    def count(self):
+        return sum(qs.count() for qs in self.querysets)
+
+    def page_querysets(self, after=None, before=None):
+        return [
+            CursorPaginator(qs, self.per_page, self.ordering).page_queryset(after=after, before=before)
+            for qs in self.querysets
+        ]
+
+    def merge(self, row_lists, before=None):
+        ordering = self._reversed_ordering() if before else self.ordering
+
+        def compare(a, b):
+            for name in ordering:
+                field = name.lstrip("-")
+                x, y = getattr(a, field), getattr(b, field)
+                if x != y:
+                    result = -1 if x < y else 1
+                    return -result if name.startswith("-") else result
+            return 0
+
+        # each list comes back in `ordering` already, so merging only looks at their heads
+        merged = heapq.merge(*row_lists, key=cmp_to_key(compare))
+        return list(islice(merged, self.per_page + 1))
+
+    def page(self, after=None, before=None):
+        row_lists = [list(qs) for qs in self.page_querysets(after=after, before=before)]
+        return self.build_page(self.merge(row_lists, before), after=after, before=before)
+
+    async def apage(self, after=None, before=None):
+        row_lists = [[obj async for obj in qs] for qs in self.page_querysets(after=after, before=before)]
+        return self.build_page(self.merge(row_lists, before), after=after, before=before)
+
+
+def paginator_for(querysets, per_page, ordering=("-created_at", "-id")):
+    """CursorPaginator for one queryset, MergedCursorPaginator for a list of them."""
+    if isinstance(querysets, (list, tuple)):
+        if len(querysets) > 1:
+            return MergedCursorPaginator(querysets, per_page, ordering)
+        querysets = querysets[0]
+    return CursorPaginator(querysets, per_page, ordering)
+
+
+class CursorPaginationMixin:
+    """
+    Drop-in replacement for ListView's page-number pagination.
+
+    Reads ?after=<cursor> / ?before=<cursor> and puts next_page_url /
+    previous_page_url into the context (other GET params such as q and date
+    are kept).
+    """
+    paginate_by = 25
+    cursor_ordering = ("-created_at", "-id")
+
+    def get_cursor_ordering(self):
+        return self.cursor_ordering
+
+    def get_paginated_querysets(self, queryset):
+        """Querysets the list is merged from (see ArchiveToggleMixin)."""
+        return [queryset]
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        return paginator_for(self.get_paginated_querysets(queryset), per_page, self.get_cursor_ordering())
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = self.get_paginator(queryset, page_size)
+        after = self.request.GET.get("after") or None
+        before = self.request.GET.get("before") or None
+        try:
+            page = paginator.page(after=after, before=before)
+        except InvalidCursor:
+            # stale or hand-edited link → just show the first page
+            page = paginator.page()
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    async def apaginate_queryset(self, queryset, page_size):
+        paginator = self.get_paginator(queryset, page_size)
+        after = self.request.GET.get("after") or None
+        before = self.request.GET.get("before") or None
+        try:
+            page = await paginator.apage(after=after, before=before)
+        except InvalidCursor:
+            page = await paginator.apage()
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_page_url(self, **cursor):
+        params = self.request.GET.copy()
+        params.pop("after", None)
+        params.pop("before", None)
+        params.update(cursor)
+        return f"?{params.urlencode()}"
+
+    def get_page_links(self, page):
+        links = {}
+        if page.has_next():
+            links["next_page_url"] = self.get_page_url(after=page.next_cursor)
+        if page.has_previous():
+            links["previous_page_url"] = self.get_page_url(before=page.previous_cursor)
+        return links
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        page = ctx.get("page_obj")
+        if page is not None:
+            ctx.update(self.get_page_links(page))
+        return ctx
+
+
+def iter_keyset(queryset, ordering=("-created_at", "-id"), chunk_size=2000):
+    """
+    Yield every row of `queryset` in `ordering`, fetching `chunk_size` rows at a
+    time with keyset pagination. Memory stays flat however many rows there are,
+    and each chunk is a short indexed query instead of one long-running cursor.
+    Prefetches on the queryset run once per chunk. A list of querysets is
+    merged (see MergedCursorPaginator).
+    """
+    paginator = paginator_for(queryset, chunk_size, ordering)
+    after = None
+    while True:
+        page = paginator.page(after=after)
+        yield page.object_list
+        if not page.has_next():
+            return
+        after = page.next_cursor
+
+
+async def aiter_keyset(queryset, ordering=("-created_at", "-id"), chunk_size=2000):
+    """Async version of iter_keyset()."""
+    paginator = paginator_for(queryset, chunk_size, ordering)
+    after = None
+    while True:
+        page = await paginator.apage(after=after)
+        yield page.object_list
+        if not page.has_next():
+            return
+        after = page.next_cursor
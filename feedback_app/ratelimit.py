@@ -0,0 +1,187 @@
+"""
+Per-endpoint rate limits for the submission and auth views.
+
+settings.RATELIMITS maps a URL name to its rules, each a (key, rate) pair:
+
+    RATELIMITS = {
+        "submit_feedback": [("user", "10/m"), ("ip", "30/m")],
+        "login": [("ip", "10/m")],
+    }
+
+"ip" counts per client address, "user" per logged-in user (per address for
+anonymous requests); a rate is "<requests>/<s|m|h|d>". Only the methods in
+RATELIMIT_METHODS (POST) are counted, so showing the forms is never limited.
+A request over any of its rules gets a 429 with Retry-After.
+
+Counters live in the RATELIMIT_CACHE cache (settings: redis when the app
+cache is redis, else a per-process locmem cache, so each worker counts on its
+own). A bucket is a sliding-window counter: the current window's count plus
+the previous window's, weighted by how much of it still overlaps. That refills
+smoothly like a token bucket but needs only cache.add/incr/get, instead of a
+compare-and-set the cache API doesn't have. add and incr have to be atomic,
+which they are on redis, memcached and locmem but not on the file or database
+caches (a read then a write: concurrent hits get lost), so the middleware
+refuses to start on those. The cost is three cache calls (two for a client's
+first request in a window) per limited request and nothing for any other
+request.
+"""
+import logging
+import math
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 60 * 60 * 24}
+# backends whose add() and incr() are atomic
+ATOMIC_BACKENDS = (LocMemCache, RedisCache, BaseMemcachedCache)
+
+
+def counter_cache():
+    return caches[getattr(settings, "RATELIMIT_CACHE", "default")]
+
+
+def parse_rate(rate):
+    """"10/m" -> (10, 60)."""
+    try:
+        count, unit = rate.split("/")
+        return int(count), PERIODS[unit.strip()]
+    except (ValueError, KeyError):
+        raise ImproperlyConfigured(f"bad rate {rate!r} in RATELIMITS, expected e.g. '10/m'") from None
+
+
+def client_ip(request):
+    """
+    The client address. Behind RATELIMIT_TRUSTED_PROXIES proxies it is the
+    entry that many hops from the right of X-Forwarded-For; the entries
+    further left are whatever the client sent and can't be trusted.
+    """
+    proxies = getattr(settings, "RATELIMIT_TRUSTED_PROXIES", 0)
+    if proxies:
+        forwarded = [ip.strip() for ip in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if ip.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def hit(key, limit, period, now=None):
+    """
+    Count one request against `key` and return 0 if it is allowed, else the
+    seconds until it would be.
+    """
+    now = time.time() if now is None else now
+    cache = counter_cache()
+    window, elapsed = divmod(now, period)
+    window = int(window)
+    current_key = f"{key}:{window}"
+    # add() starts the window at 1 (one call for a client's first request);
+    # both windows have to outlive the next one, which still reads this count
+    if cache.add(current_key, 1, timeout=2 * period):
+        current = 1
+    else:
+        try:
+            current = cache.incr(current_key)
+        except ValueError:  # expired between add() and incr()
+            cache.set(current_key, 1, timeout=2 * period)
+            current = 1
+    previous = cache.get(f"{key}:{window - 1}", 0)
+    weight = 1 - elapsed / period
+    if previous * weight + current <= limit:
+        return 0
+    if current > limit:
+        # over on this window alone: wait for it to end, then for its weight to drop enough
+        wait = period - elapsed + period * (1 - limit / current)
+    else:
+        # under on this window: wait for the previous one's weight to drop enough,
+        # at the latest until it stops counting at all
+        wait = min(period * (1 - (limit - current) / previous) - elapsed, period - elapsed)
+    return max(1, math.ceil(wait))
+
+
+class RateLimitMiddleware:
+    """
+    Applies settings.RATELIMITS; goes after AuthenticationMiddleware (the "user"
+    key needs request.user). Sync and async, so the async views under ASGI
+    don't pay a thread hop here; the counter calls are made directly either way
+    (locmem is in-process, and Django's async cache API would only run them in
+    a thread).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "RATELIMIT_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # the handler awaits process_view when it is a coroutine function
+            self.process_view = self.aprocess_view
+        backend = counter_cache()
+        if not isinstance(backend, ATOMIC_BACKENDS):
+            raise ImproperlyConfigured(
+                f"RATELIMIT_CACHE uses {type(backend).__name__}, whose add/incr aren't atomic; "
+                "use redis, memcached or locmem"
+            )
+        self.methods = set(getattr(settings, "RATELIMIT_METHODS", ["POST"]))
+        self.rules = {
+            name: [(scope, *parse_rate(rate)) for scope, rate in rules]
+            for name, rules in getattr(settings, "RATELIMITS", {}).items()
+        }
+        for name, rules in self.rules.items():
+            for scope, *_ in rules:
+                if scope not in ("ip", "user"):
+                    raise ImproperlyConfigured(f"RATELIMITS[{name!r}]: key must be 'ip' or 'user', not {scope!r}")
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def rules_for(self, request):
+        if request.method not in self.methods:
+            return None
+        return self.rules.get(request.resolver_match.url_name)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        rules = self.rules_for(request)
+        if not rules:
+            return None
+        return self.check(request, rules, request.user)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        rules = self.rules_for(request)
+        if not rules:
+            return None
+        # request.user would load the session and user synchronously
+        return self.check(request, rules, await request.auser())
+
+    def check(self, request, rules, user):
+        ip = client_ip(request)
+        name = request.resolver_match.url_name
+        retry_after = 0
+        try:
+            for scope, limit, period in rules:
+                if scope == "user" and user.is_authenticated:
+                    ident = f"user:{user.pk}"
+                else:
+                    ident = f"ip:{ip}"
+                retry_after = max(retry_after, hit(f"ratelimit:{name}:{scope}:{ident}:{period}", limit, period))
+        except Exception:
+            # a cache outage mustn't take the login and submit forms down with it
+            logger.warning("rate limit check failed, letting the request through", exc_info=True)
+            return None
+        if not retry_after:
+            return None
+        response = HttpResponse(
+            f"Too many requests, please try again in {retry_after} seconds.\n",
+            status=429, content_type="text/plain; charset=utf-8",
+        )
+        response["Retry-After"] = str(retry_after)
+        return response
@@ -0,0 +1,187 @@
+"""
+Read replicas for the heavy list pages, with read-your-writes stickiness.
+
+settings.DATABASE_REPLICAS names the DATABASES aliases that replicate
+"default". Writes always go to the primary; reads go to a replica only
+inside a view that asks for one (mixins.ReplicaReadsMixin: the dashboard, its
+exports and My Feedback), so a form that re-reads what it just saved never
+sees a lagging copy. The choice is per request and lives in a context
+variable set up by ReplicaMiddleware, so it follows the request into
+sync_to_async threads and async ORM calls.
+
+A replica is skipped:
+  - for DATABASE_PRIMARY_STICKY_SECONDS after the user wrote something (any
+    successful POST): their session is pinned to the primary, so they see
+    their own submission, edit, delete or reply at once;
+  - while it is down or more than DATABASE_REPLICA_MAX_LAG seconds behind.
+    Each worker checks each replica at most every DATABASE_REPLICA_CHECK_SECONDS
+    (SHOW REPLICA STATUS on MySQL, which needs the REPLICATION CLIENT grant;
+    a plain SELECT 1 elsewhere).
+With no healthy replica everything reads from the primary.
+"""
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = "default"
+# models whose reads may be served by a replica; sessions and the rest stay on the primary
+REPLICA_APPS = {"feedback_app", "auth"}
+PIN_SESSION_KEY = "_db_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+_read_alias = ContextVar("feedback_read_alias", default=None)
+# alias -> (checked at, healthy), per process
+_health = {}
+
+
+def replicas():
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def sticky_seconds():
+    return getattr(settings, "DATABASE_PRIMARY_STICKY_SECONDS", 15)
+
+
+# --- health ----------------------------------------------------------------
+def replica_lag(alias):
+    """Seconds `alias` is behind its primary; None if it is down or not replicating."""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor != "mysql":
+                cursor.execute("SELECT 1")
+                return 0
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except DatabaseError:  # MySQL < 8.0.22
+                cursor.execute("SHOW SLAVE STATUS")
+            row = cursor.fetchone()
+            if row is None:
+                # not a replica itself (e.g. a managed read endpoint): nothing to lag behind
+                return 0
+            status = dict(zip([column[0] for column in cursor.description], row))
+    except DatabaseError:
+        logger.warning("replica %s is unreachable", alias, exc_info=True)
+        return None
+    # NULL while replication is stopped
+    return status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+
+
+def is_healthy(alias, now=None):
+    now = time.monotonic() if now is None else now
+    checked_at, healthy = _health.get(alias, (None, False))
+    if checked_at is None or now - checked_at >= getattr(settings, "DATABASE_REPLICA_CHECK_SECONDS", 5):
+        lag = replica_lag(alias)
+        healthy = lag is not None and lag <= getattr(settings, "DATABASE_REPLICA_MAX_LAG", 5)
+        if not healthy and _health.get(alias, (None, True))[1]:
+            logger.warning("replica %s out of rotation (lag %s)", alias, lag)
+        _health[alias] = (now, healthy)
+    return healthy
+
+
+def healthy_replicas():
+    return [alias for alias in replicas() if is_healthy(alias)]
+
+
+# --- stickiness ------------------------------------------------------------
+def is_pinned(request):
+    session = getattr(request, "session", None)
+    return session is not None and session.get(PIN_SESSION_KEY, 0) > time.time()
+
+
+def pin(request):
+    """Send this session's replica reads to the primary for the next sticky_seconds()."""
+    request.session[PIN_SESSION_KEY] = time.time() + sticky_seconds()
+
+
+def replica_for(request, written_at=0):
+    """
+    The replica to read this request's data from, or None for the primary.
+    `written_at` is when that data last changed (time.time()); a replica is
+    only trusted once the change is older than the sticky window.
+    """
+    if not replicas() or is_pinned(request) or time.time() - written_at < sticky_seconds():
+        return None
+    candidates = healthy_replicas()
+    return random.choice(candidates) if candidates else None
+
+
+def read_from(alias):
+    """Route this request's reads to `alias` (None: the primary). Needs ReplicaMiddleware."""
+    state = _read_alias.get()
+    if state is not None:
+        state[0] = alias
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _read_alias.get()
+        if state and state[0] and model._meta.app_label in REPLICA_APPS:
+            return state[0]
+        return None
+
+    def db_for_write(self, model, **hints):
+        # also for objects that were read from a replica
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema from the primary
+        return False if db in replicas() else None
+
+
+class ReplicaMiddleware:
+    """
+    Gives each request its own read routing (none until a view asks, see
+    read_from()) and pins the session to the primary after a write. Goes
+    after SessionMiddleware and AuthenticationMiddleware. Sync and async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # a mutable cell, so a view running in another thread or task can still set it
+        token = _read_alias.set([None])
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        if self.wrote(request, response) and request.user.is_authenticated:
+            pin(request)
+        return response
+
+    async def __acall__(self, request):
+        token = _read_alias.set([None])
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        if self.wrote(request, response) and (await request.auser()).is_authenticated:
+            await request.session.aset(PIN_SESSION_KEY, time.time() + sticky_seconds())
+        return response
+
+    def wrote(self, request, response):
+        # token-authenticated clients (the import API) have no session worth pinning
+        return request.method not in SAFE_METHODS and response.status_code < 400
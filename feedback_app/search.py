@@ -0,0 +1,289 @@
+"""
+Search backends for the admin dashboard.
+
+The backend is picked from settings.FEEDBACK_SEARCH_BACKEND (a dotted path)
+or, if that is not set, from the database vendor:
+
+  mysql  → MySQLFulltextSearchBackend  (FULLTEXT index, ranked by MATCH score)
+  sqlite → SQLiteFTS5SearchBackend     (FTS5 table kept in sync by triggers)
+  other  → IcontainsSearchBackend      (plain LIKE, unranked)
+
+Every backend exposes `search(queryset, query)` and an `ordering` tuple that
+the cursor paginator uses for the result list.
+"""
+import re
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Func, Lookup, Q, TextField, Value
+from django.utils.module_loading import import_string
+
+FEEDBACK_TABLE = "feedback_app_feedback"
+FTS_TABLE = "feedback_app_feedback_fts"
+FULLTEXT_INDEX = "feedback_fulltext_idx"
+SEARCH_COLUMNS = ("name", "email", "message")
+
+
+def search_terms(query):
+    """Split user input into plain word tokens (drops any query syntax)."""
+    return re.findall(r"\w+", query)
+
+
+class IcontainsSearchBackend:
+    """Fallback: case-insensitive LIKE on name, email and message."""
+    ordering = ("-created_at", "-id")
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(name__icontains=query) | Q(email__icontains=query) | Q(message__icontains=query)
+        )
+
+
+class FTS5Document(TextField):
+    """FTS5's hidden column named after the table (models.FeedbackSearchIndex.document)."""
+
+
+@FTS5Document.register_lookup
+class FTS5MatchLookup(Lookup):
+    """`fts.fts MATCH ...`"""
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs_sql} MATCH {rhs_sql}", (*lhs_params, *rhs_params)
+
+
+class FTS5Rank(Func):
+    """bm25 score of the joined FTS row (negated, so that higher means more relevant)."""
+    function = "bm25"
+    template = "-%(function)s(%(expressions)s)"
+    output_field = FloatField()
+
+
+class SQLiteFTS5SearchBackend(IcontainsSearchBackend):
+    """SQLite FTS5 external-content index (used locally and in tests)."""
+    ordering = ("-search_rank", "-id")
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return super().search(queryset, query).annotate(search_rank=Value(0.0))
+        # every term must match, as a prefix, like icontains did
+        match = " ".join(f'"{term}"*' for term in terms)
+        # one join: the MATCH finds the rows and bm25() scores them in the same pass
+        return queryset.filter(search_index__document__match=match).annotate(
+            search_rank=FTS5Rank("search_index__document")
+        )
+
+
+class MySQLMatch(Func):
+    """MATCH (name, email, message) AGAINST (%s IN BOOLEAN MODE)"""
+    output_field = FloatField()
+
+    def __init__(self, against, **extra):
+        super().__init__(*(F(column) for column in SEARCH_COLUMNS), Value(against), **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        *columns, against = self.source_expressions
+        column_sql = []
+        params = []
+        for column in columns:
+            sql, column_params = compiler.compile(column)
+            column_sql.append(sql)
+            params.extend(column_params)
+        against_sql, against_params = compiler.compile(against)
+        sql = f"MATCH ({', '.join(column_sql)}) AGAINST ({against_sql} IN BOOLEAN MODE)"
+        return sql, (*params, *against_params)
+
+
+# InnoDB's built-in stopword list (INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD, which
+# needs the PROCESS privilege to read)
+INNODB_DEFAULT_STOPWORDS = frozenset(
+    "a about an are as at be by com de en for from how i in is it la of on or that the this to "
+    "was what when where who will with und www".split()
+)
+# per database alias: (innodb_ft_min_token_size, stopwords), read once per process
+_fulltext_limits = {}
+
+
+def fulltext_limits(connection):
+    """
+    The words an InnoDB FULLTEXT index leaves out: those shorter than
+    innodb_ft_min_token_size, and its stopwords (the server's stopword table
+    if one is set, else the built-in list).
+    """
+    if connection.alias not in _fulltext_limits:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT @@innodb_ft_min_token_size, @@innodb_ft_enable_stopword, @@innodb_ft_server_stopword_table"
+            )
+            min_size, enabled, table = cursor.fetchone()
+            stopwords = frozenset()
+            if enabled and table:
+                # "db_name/table_name"
+                quote = connection.ops.quote_name
+                cursor.execute(f"SELECT value FROM {'.'.join(quote(part) for part in table.split('/'))}")
+                stopwords = frozenset(value.lower() for (value,) in cursor.fetchall())
+            elif enabled:
+                stopwords = INNODB_DEFAULT_STOPWORDS
+        _fulltext_limits[connection.alias] = (min_size, stopwords)
+    return _fulltext_limits[connection.alias]
+
+
+class MySQLFulltextSearchBackend(IcontainsSearchBackend):
+    """
+    MySQL InnoDB FULLTEXT index on (name, email, message).
+
+    The index has no entry for short words and stopwords, so a required
+    `+term*` for one of those matches nothing: such terms are matched with
+    icontains instead, and when no term is left for the index the whole
+    search is a LIKE (unranked).
+    """
+    ordering = ("-search_rank", "-id")
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return super().search(queryset, query).annotate(search_rank=Value(0.0))
+        min_size, stopwords = fulltext_limits(connections[queryset.db])
+        indexed = [term for term in terms if len(term) >= min_size and term.lower() not in stopwords]
+        for term in terms:
+            if term not in indexed:
+                queryset = queryset.filter(
+                    Q(name__icontains=term) | Q(email__icontains=term) | Q(message__icontains=term)
+                )
+        if not indexed:
+            return queryset.annotate(search_rank=Value(0.0))
+        against = " ".join(f"+{term}*" for term in indexed)
+        return queryset.filter(
+            MySQLMatch(against, output_field=BooleanField())
+        ).annotate(search_rank=MySQLMatch(against))
+
+
+VENDOR_BACKENDS = {
+    "mysql": MySQLFulltextSearchBackend,
+    "sqlite": SQLiteFTS5SearchBackend,
+}
+
+
+def get_search_backend(using="default"):
+    path = getattr(settings, "FEEDBACK_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    return VENDOR_BACKENDS.get(connections[using].vendor, IcontainsSearchBackend)()
+
+
+# --- index maintenance (used by migrations, post_migrate and bulk loads) --
+
+SQLITE_TRIGGERS = {
+    f"{FTS_TABLE}_ai": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {FEEDBACK_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, name, email, message)
+            VALUES (new.id, new.name, new.email, new.message);
+        END""",
+    f"{FTS_TABLE}_ad": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {FEEDBACK_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, email, message)
+            VALUES ('delete', old.id, old.name, old.email, old.message);
+        END""",
+    f"{FTS_TABLE}_au": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, email, message
+        ON {FEEDBACK_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, email, message)
+            VALUES ('delete', old.id, old.name, old.email, old.message);
+            INSERT INTO {FTS_TABLE}(rowid, name, email, message)
+            VALUES (new.id, new.name, new.email, new.message);
+        END""",
+}
+
+
+def create_search_index(connection):
+    """Create the vendor's full-text index and fill it from existing rows."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"name, email, message, content='{FEEDBACK_TABLE}', content_rowid='id')"
+            )
+            for sql in SQLITE_TRIGGERS.values():
+                cursor.execute(sql)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        elif connection.vendor == "mysql":
+            cursor.execute(
+                f"ALTER TABLE {FEEDBACK_TABLE} ADD FULLTEXT INDEX {FULLTEXT_INDEX} "
+                f"({', '.join(SEARCH_COLUMNS)})"
+            )
+
+
+def drop_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif connection.vendor == "mysql":
+            cursor.execute(f"ALTER TABLE {FEEDBACK_TABLE} DROP INDEX {FULLTEXT_INDEX}")
+
+
+def _has_fts_table(cursor):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+    return cursor.fetchone() is not None
+
+
+def ensure_sqlite_triggers(connection):
+    """
+    SQLite migrations that rebuild the feedback table (e.g. adding a NOT NULL
+    column) silently drop its triggers. Put them back and re-index if needed.
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        if not _has_fts_table(cursor):
+            return
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s", [FEEDBACK_TABLE]
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+        if not missing:
+            return
+        for name in missing:
+            cursor.execute(SQLITE_TRIGGERS[name])
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+@contextmanager
+def deferred_sqlite_indexing(connection):
+    """
+    For bulk loads on SQLite: drop the insert trigger for the duration and
+    index every row added meanwhile with one INSERT ... SELECT at the end,
+    which is several times faster than the trigger firing per row. Does
+    nothing elsewhere (MySQL maintains its FULLTEXT index itself).
+
+    Inside a transaction it is safe next to other writers: the DROP takes
+    SQLite's write lock, so nobody inserts without the trigger before it is
+    back at commit.
+    """
+    if connection.vendor != "sqlite":
+        yield
+        return
+    with connection.cursor() as cursor:
+        if not _has_fts_table(cursor):
+            yield
+            return
+        # the DROP first, so no other writer can add a row after last_id is read
+        cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai")
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {FEEDBACK_TABLE}")
+        (last_id,) = cursor.fetchone()
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, name, email, message) "
+                f"SELECT id, name, email, message FROM {FEEDBACK_TABLE} WHERE id > %s",
+                [last_id],
+            )
+            cursor.execute(SQLITE_TRIGGERS[f"{FTS_TABLE}_ai"])
@@ -0,0 +1,251 @@
+"""
+Synthetic users, feedback and replies for benchmarks and scale tests.
+
+Everything comes from one random.Random(seed), so the same arguments (and
+the same --end date) produce the same rows. Rows are streamed out day by day,
+in created_at order, and inserted in batches under explicit primary keys, so
+replies can point at their feedback without reading anything back and memory
+stays flat however many rows are asked for.
+
+The shape is meant to look like real traffic rather than uniform noise:
+volume grows over the period and dips at weekends, submissions cluster in
+office hours, a few users write most of the feedback (Zipf), and replies come
+hours to days after the feedback they answer.
+"""
+import math
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import stats
+from .search import deferred_sqlite_indexing
+from .models import Feedback, FeedbackReply
+
+PASSWORD = "bench-password"
+
+WORDS = (
+    "service app slow fast login page great bad support update bug feature "
+    "dashboard reply thanks please fix love hate email error mobile desktop"
+).split()
+
+# relative submissions per hour of the day (local time)
+HOURLY = (1, 1, 1, 1, 1, 2, 4, 7, 10, 12, 12, 11, 9, 10, 11, 11, 10, 8, 6, 5, 4, 3, 2, 1)
+HOURLY_CUM = list(accumulate(HOURLY))
+WEEKEND = 0.6
+# the last day of the period sees 1 + GROWTH times the traffic of the first
+GROWTH = 2.0
+ZIPF = 1.1
+
+
+@dataclass
+class SeedResult:
+    user: User
+    staff: User
+    user_ids: list = field(default_factory=list)
+    feedback_count: int = 0
+    reply_count: int = 0
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def sentence(rng, low=4, high=20):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def next_id(model):
+    return (model.objects.aggregate(top=Max("pk"))["top"] or 0) + 1
+
+
+def db_datetime(value, db_timezone):
+    """
+    An aware datetime as SQLite / MySQL store it, i.e. what
+    adapt_datetimefield_value() returns; pass connection.timezone, looked up once.
+    """
+    return str(value.astimezone(db_timezone).replace(tzinfo=None))
+
+
+class RowWriter:
+    """
+    Batched INSERTs of plain tuples, one executemany() per flush.
+
+    It sends the statement bulk_create would, minus building a model instance
+    and running every value through its field's prep methods, which is most of
+    bulk_create's time at millions of rows (~12k rows/s against ~90k here on
+    SQLite). Values must already be in database form (see db_datetime());
+    concrete fields not named in `fields` get their default.
+    """
+
+    def __init__(self, model, fields):
+        meta = model._meta
+        named = [meta.get_field(name) for name in fields]
+        rest = [f for f in meta.concrete_fields if f not in named]
+        self.defaults = tuple(f.get_db_prep_save(f.get_default(), connection) for f in rest)
+        quote = connection.ops.quote_name
+        columns = ", ".join(quote(f.column) for f in named + rest)
+        placeholders = ", ".join(["%s"] * (len(named) + len(rest)))
+        self.sql = f"INSERT INTO {quote(meta.db_table)} ({columns}) VALUES ({placeholders})"
+        self.rows = []
+
+    def add(self, *values):
+        self.rows.append(values + self.defaults)
+
+    def flush(self, cursor):
+        count = len(self.rows)
+        if count:
+            cursor.executemany(self.sql, self.rows)
+            self.rows.clear()
+        return count
+
+
+class Generator:
+    """
+    Streams Feedback (and FeedbackReply) rows for the `days` days ending on
+    `end` (default yesterday, so every row is in the past).
+
+    generate() inserts the rows and returns (feedback, replies). Users must
+    exist first: create_users() makes new ones, which keeps every cache keyed
+    by user or feedback id cold, so nothing needs invalidating afterwards.
+    """
+
+    def __init__(self, seed=0, days=365, end=None, batch_size=2000, progress=None):
+        self.rng = random.Random(seed)
+        self.days = days
+        self.end = end or timezone.localdate() - timedelta(days=1)
+        self.first = self.end - timedelta(days=days - 1)
+        self.batch_size = batch_size
+        self.progress = progress
+        # canned messages: picking one is far cheaper than building a sentence per row
+        self.messages = [sentence(self.rng) for _ in range(5000)]
+        self.replies = [sentence(self.rng, 2, 10) for _ in range(1000)]
+
+    def create_users(self, count, staff=False, password=None):
+        """Bulk-create `count` users under explicit ids and return the ids."""
+        first = next_id(User)
+        password = make_password(password)  # hashed once; None gives an unusable password
+        prefix = "gen-staff" if staff else "gen-user"
+        ids = list(range(first, first + count))
+        for batch in batched(ids, self.batch_size):
+            User.objects.bulk_create(
+                User(id=pk, username=f"{prefix}-{pk}", email=f"{prefix}-{pk}@example.com",
+                     password=password, is_staff=staff)
+                for pk in batch
+            )
+        return ids
+
+    def day_counts(self, total):
+        """(day, n) for every day of the period, the n adding up to exactly `total`."""
+        weights = []
+        for offset in range(self.days):
+            day = self.first + timedelta(days=offset)
+            weight = 1 + GROWTH * offset / max(1, self.days - 1)
+            weights.append(weight * (WEEKEND if day.weekday() >= 5 else 1))
+        scale = total / sum(weights)
+        placed = 0
+        for offset, cumulative in enumerate(accumulate(weights)):
+            upto = round(cumulative * scale)
+            yield self.first + timedelta(days=offset), upto - placed
+            placed = upto
+
+    def timestamps(self, day, count):
+        """`count` sorted aware datetimes within local `day`, weighted by HOURLY."""
+        rng = self.rng
+        midnight = timezone.make_aware(datetime.combine(day, time()))
+        hours = rng.choices(range(24), cum_weights=HOURLY_CUM, k=count)
+        seconds = sorted(hour * 3600 + rng.randrange(3600) for hour in hours)
+        return [midnight + timedelta(seconds=s) for s in seconds]
+
+    def generate(self, feedback, user_ids, admin_ids, reply_ratio=0.3):
+        rng = self.rng
+        # Zipf: the first users in user_ids write most of the feedback
+        user_cum = list(accumulate(1 / (rank + 1) ** ZIPF for rank in range(len(user_ids))))
+        # end of the period: replies that would come later don't exist yet
+        cutoff = timezone.make_aware(datetime.combine(self.end + timedelta(days=1), time()))
+        feedback_pk, reply_pk = next_id(Feedback), next_id(FeedbackReply)
+        db_timezone = connection.timezone
+        created, replied = Counter(), Counter()
+        feedback_rows = RowWriter(Feedback, ["id", "user", "name", "email", "message", "created_at"])
+        reply_rows = RowWriter(FeedbackReply, ["id", "feedback", "admin", "message", "created_at"])
+        written = replies = 0
+
+        def flush():
+            nonlocal written, replies
+            if not feedback_rows.rows:
+                return
+            with transaction.atomic(), connection.cursor() as cursor:
+                written += feedback_rows.flush(cursor)
+                replies += reply_rows.flush(cursor)
+                # raw inserts skip the stats.record_* calls; keep the rollup in the same transaction
+                for day in sorted(set(created) | set(replied)):
+                    stats.bump(day, created=created[day], replied=replied[day])
+            created.clear()
+            replied.clear()
+            if self.progress:
+                self.progress(written, replies)
+
+        with deferred_sqlite_indexing(connection):
+            for day, count in self.day_counts(feedback):
+                if not count:
+                    continue
+                authors = rng.choices(user_ids, cum_weights=user_cum, k=count)
+                for created_at, user_id in zip(self.timestamps(day, count), authors):
+                    feedback_rows.add(
+                        feedback_pk, user_id, f"User {user_id}", f"user{user_id}@example.com",
+                        rng.choice(self.messages), db_datetime(created_at, db_timezone),
+                    )
+                    created[day] += 1
+                    if rng.random() < reply_ratio:
+                        # median ~5h, long tail into the following days
+                        reply_at = created_at + timedelta(minutes=math.exp(rng.gauss(5.7, 1.2)))
+                        # feedback that is too recent simply hasn't been answered yet
+                        if reply_at < cutoff:
+                            # still in local time (wall-clock arithmetic), so .date() is the local day
+                            replied[reply_at.date()] += 1
+                            while reply_at < cutoff:
+                                reply_rows.add(
+                                    reply_pk, feedback_pk, rng.choice(admin_ids),
+                                    rng.choice(self.replies), db_datetime(reply_at, db_timezone),
+                                )
+                                reply_pk += 1
+                                if rng.random() >= 0.2:
+                                    break
+                                reply_at += timedelta(minutes=math.exp(rng.gauss(6.5, 1.0)))
+                    feedback_pk += 1
+                    if len(feedback_rows.rows) >= self.batch_size:
+                        flush()
+            flush()
+        return written, replies
+
+
+def fast_sqlite_writes():
+    """Don't fsync every commit on SQLite while loading throwaway data."""
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous = OFF")
+
+
+def seed(users=20, feedback=1000, reply_ratio=0.3, days=90, seed=0, batch_size=2000, end=None):
+    """Create `users` users plus one staff user, `feedback` rows and their replies."""
+    generator = Generator(seed=seed, days=days, end=end, batch_size=batch_size)
+    user_ids = generator.create_users(users, password=PASSWORD)
+    staff_ids = generator.create_users(1, staff=True, password=PASSWORD)
+    written, replies = generator.generate(feedback, user_ids, staff_ids, reply_ratio)
+    return SeedResult(
+        # the first user is the busiest one
+        user=User.objects.get(pk=user_ids[0]),
+        staff=User.objects.get(pk=staff_ids[0]),
+        user_ids=user_ids,
+        feedback_count=written,
+        reply_count=replies,
+    )
@@ -0,0 +1,292 @@
+"""
+Optional horizontal sharding of feedback by user.
+
+settings.FEEDBACK_SHARDS lists the DATABASES aliases that hold Feedback and
+FeedbackReply rows (and their archive tables), e.g. ["default", "shard1",
+"shard2"]. A user's feedback, and every reply to it, lives on
+FEEDBACK_SHARDS[crc32(user_id) % len(FEEDBACK_SHARDS)]; feedback without a
+user (imports) on the first shard. Everything else (users, sessions, the
+stats rollup, the id sequence) stays on "default". With no FEEDBACK_SHARDS,
+or an empty list, nothing here changes behaviour.
+
+Ids are unique across shards: a row's id is n * SHARD_SLOTS + shard index,
+with n from IdSequence on "default" (one UPDATE per save, per bulk insert
+for bulk_create), so the shard of any feedback or reply can be read off its
+id, and ids still grow in insert order.
+
+Turning sharding on over an existing database leaves its rows where they
+are: the first time it's needed, legacy_marks() records the highest feedback
+/ reply id and owner id on "default". Ids up to that mark stay on "default"
+(db_for_pk), new ids start above it, and users from before read My Feedback
+from their shard and "default" (databases_for_user).
+
+  - one user's pages (My Feedback, edit, delete) query only their shard:
+    db_for_user() / databases_for_user() / db_for_pk()
+  - the dashboard queries every shard and k-way merges the pages on
+    (created_at, id): scatter() + pagination.MergedCursorPaginator
+  - ShardRouter sends saves and related-object lookups of sharded rows to
+    their shard, and everything else to "default"
+
+Each shard has the full schema (`migrate --database <alias>` for every
+shard, with FEEDBACK_SHARDS set, so the user foreign keys there get no
+constraint: see AlterUserForeignKey), and "default" has to be one of them. The shard count is fixed once rows exist: changing it would move
+users to other shards, and this does not rebalance. Replicas
+(feedback_app.routers) are not used while sharding is on.
+"""
+import zlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import checks
+from django.db import IntegrityError, migrations, transaction
+from django.db.models import F, Max
+from django.db.models.signals import pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import ArchivedFeedback, ArchivedFeedbackReply, Feedback, FeedbackReply, IdSequence
+
+PRIMARY = "default"
+# ids leave room for this many shards
+SHARD_SLOTS = 256
+SHARDED_MODELS = {Feedback, FeedbackReply, ArchivedFeedback, ArchivedFeedbackReply}
+REPLY_MODELS = {FeedbackReply, ArchivedFeedbackReply}
+
+
+def shards():
+    return list(getattr(settings, "FEEDBACK_SHARDS", None) or [])
+
+
+def enabled():
+    return bool(shards())
+
+
+def databases():
+    """Every shard, or [None] (the router's choice) without sharding; for loops over all feedback."""
+    return shards() or [None]
+
+
+def shard_index_for_user(user_id):
+    if user_id is None:
+        return 0
+    return zlib.crc32(str(user_id).encode()) % len(shards())
+
+
+def db_for_user(user_id):
+    """The shard holding `user_id`'s feedback; None without sharding."""
+    return shards()[shard_index_for_user(user_id)] if enabled() else None
+
+
+def databases_for_user(user_id):
+    """Where `user_id`'s feedback is: their shard, plus "default" for rows from before sharding."""
+    db = db_for_user(user_id)
+    if db is None or db == PRIMARY or user_id is None or user_id > legacy_marks()[1]:
+        return [db]
+    return [db, PRIMARY]
+
+
+def db_for_pk(pk):
+    """The shard holding the feedback (or reply) with this id; None without sharding."""
+    if not enabled():
+        return None
+    pk = int(pk)
+    if pk <= legacy_marks()[0]:
+        # from before sharding was turned on
+        return PRIMARY
+    index = pk % SHARD_SLOTS
+    names = shards()
+    return names[index] if index < len(names) else PRIMARY
+
+
+def scatter(querysets):
+    """One copy of each queryset per shard, for pagination.paginator_for() to merge."""
+    if not enabled():
+        return list(querysets)
+    return [queryset.using(db) for queryset in querysets for db in shards()]
+
+
+def group_by_db(objs):
+    """{shard: unsaved rows of that shard}; {None: objs} without sharding."""
+    groups = {}
+    for obj in objs:
+        groups.setdefault(db_for_instance(obj) if enabled() else None, []).append(obj)
+    return groups
+
+
+# --- ids -------------------------------------------------------------------
+LEGACY_ID_MARK = "sharding.legacy_id"
+LEGACY_USER_MARK = "sharding.legacy_user"
+# per process: (highest id, highest owner id) on "default" when sharding was turned on
+_legacy_marks = {}
+
+
+def _create_sequence(name, value):
+    """Create the row unless a concurrent caller just did; returns its value."""
+    sequences = IdSequence.objects.using(PRIMARY)
+    try:
+        with transaction.atomic(using=PRIMARY):
+            sequences.create(name=name, value=value)
+        return value
+    except IntegrityError:
+        return sequences.get(name=name).value
+
+
+def legacy_marks():
+    """(highest feedback / reply id, highest owner id) from before sharding; written once, then fixed."""
+    key = tuple(shards())
+    if key not in _legacy_marks:
+        rows = dict(IdSequence.objects.using(PRIMARY).filter(
+            name__in=[LEGACY_ID_MARK, LEGACY_USER_MARK]).values_list("name", "value"))
+        if len(rows) < 2:
+            top_id = top_user = 0
+            sequences = [model._meta.label_lower for model in (Feedback, FeedbackReply)]
+            # (ids already handed out here mean sharding was on from the start)
+            if not IdSequence.objects.using(PRIMARY).filter(name__in=sequences).exists():
+                top_id = max(
+                    model.objects.using(PRIMARY).aggregate(top=Max("pk"))["top"] or 0 for model in SHARDED_MODELS
+                )
+                # only users up to here can own feedback on "default"
+                top_user = max(
+                    model.objects.using(PRIMARY).aggregate(top=Max("user_id"))["top"] or 0
+                    for model in (Feedback, ArchivedFeedback)
+                )
+            rows = {
+                LEGACY_ID_MARK: _create_sequence(LEGACY_ID_MARK, top_id),
+                LEGACY_USER_MARK: _create_sequence(LEGACY_USER_MARK, top_user),
+            }
+        _legacy_marks[key] = (rows[LEGACY_ID_MARK], rows[LEGACY_USER_MARK])
+    return _legacy_marks[key]
+
+
+def allocate(name, count=1):
+    """Reserve `count` consecutive numbers of the sequence `name`; returns the first."""
+    sequences = IdSequence.objects.using(PRIMARY)
+    with transaction.atomic(using=PRIMARY):
+        # the UPDATE locks the row until commit, so concurrent callers queue up here
+        if not sequences.filter(name=name).update(value=F("value") + count):
+            # first use: start above every id from before sharding
+            _create_sequence(name, legacy_marks()[0] // SHARD_SLOTS)
+            sequences.filter(name=name).update(value=F("value") + count)
+        return sequences.get(name=name).value - count + 1
+
+
+def new_ids(model, count, user_id=None):
+    """`count` fresh ids for rows of `model` owned by `user_id`, for inserts without instances (see assign_ids())."""
+    first = allocate(model._meta.label_lower, count)
+    index = shard_index_for_user(user_id)
+    return [n * SHARD_SLOTS + index for n in range(first, first + count)]
+
+
+def _shard_index(obj):
+    if type(obj) in REPLY_MODELS:
+        # the feedback's shard, which for feedback from before sharding is "default"
+        return shards().index(db_for_pk(obj.feedback_id))
+    return shard_index_for_user(obj.user_id)
+
+
+def assign_ids(objs):
+    """Give unsaved sharded rows of one model their ids (before bulk_create)."""
+    objs = [obj for obj in objs if obj.pk is None]
+    if not enabled() or not objs:
+        return
+    first = allocate(objs[0]._meta.label_lower, len(objs))
+    for n, obj in enumerate(objs, first):
+        obj.pk = n * SHARD_SLOTS + _shard_index(obj)
+
+
+@receiver(pre_save, sender=Feedback, dispatch_uid="feedback_shard_id")
+@receiver(pre_save, sender=FeedbackReply, dispatch_uid="reply_shard_id")
+def assign_id_on_save(sender, instance, raw=False, **kwargs):
+    if not raw and instance._state.adding:
+        assign_ids([instance])
+
+
+@receiver(pre_delete, sender=get_user_model(), dispatch_uid="user_deleted_sharded_rows")
+def delete_sharded_rows(sender, instance, using=None, **kwargs):
+    # the user delete's own cascade only reaches the database it runs on
+    if not enabled():
+        return
+    db = db_for_user(instance.pk)
+    for shard in shards():
+        if shard == using:
+            continue
+        if shard == db:
+            Feedback.objects.using(shard).filter(user_id=instance.pk).delete()
+            ArchivedFeedback.objects.using(shard).filter(user_id=instance.pk).delete()
+        FeedbackReply.objects.using(shard).filter(admin_id=instance.pk).update(admin=None)
+        ArchivedFeedbackReply.objects.using(shard).filter(admin_id=instance.pk).update(admin=None)
+
+
+@checks.register(checks.Tags.database)
+def check_shards(app_configs, **kwargs):
+    if enabled() and PRIMARY not in shards():
+        return [checks.Error(
+            f'FEEDBACK_SHARDS must include "{PRIMARY}"',
+            hint="It keeps the id sequence and the feedback from before sharding was turned on.",
+            id="feedback_app.E001",
+        )]
+    return []
+
+
+# --- routing ---------------------------------------------------------------
+def db_for_instance(obj):
+    """The shard of a sharded row (saved or not) or of a user's rows."""
+    if type(obj) in SHARDED_MODELS:
+        if obj.pk is not None:
+            return db_for_pk(obj.pk)
+        if type(obj) in REPLY_MODELS:
+            return db_for_pk(obj.feedback_id)
+        return db_for_user(obj.user_id)
+    if isinstance(obj, get_user_model()):
+        return db_for_user(obj.pk)
+    return obj._state.db
+
+
+class ShardRouter:
+    """
+    Goes before routers.ReplicaRouter in DATABASE_ROUTERS. Queries without an
+    instance hint can't be routed; they fall through to "default" unless the
+    caller picks the shard with .using(db_for_user(...) / db_for_pk(...)).
+    """
+
+    def _route(self, model, hints):
+        if not enabled():
+            return None
+        if model not in SHARDED_MODELS:
+            # users & co. live on "default", even when reached from a sharded row
+            return PRIMARY
+        instance = hints.get("instance")
+        return db_for_instance(instance) if instance is not None else None
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if enabled() and {obj1._state.db, obj2._state.db} <= {PRIMARY, *shards()}:
+            return True
+        return None
+
+
+# --- schema ----------------------------------------------------------------
+def has_users(alias):
+    """Whether the users live on the database `alias`; not on any shard but "default"."""
+    return alias == PRIMARY or alias not in shards()
+
+
+class AlterUserForeignKey(migrations.AlterField):
+    """
+    AlterField for the user / admin foreign keys of the sharded models. On a
+    shard without the users the column keeps no database constraint (its
+    auth_user table stays empty), so the schema is left alone there; on
+    "default" and without sharding it is a plain AlterField.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if has_users(schema_editor.connection.alias):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if has_users(schema_editor.connection.alias):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
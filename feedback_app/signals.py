@@ -0,0 +1,68 @@
+"""
+Cache invalidation hooks. Connected in FeedbackAppConfig.ready().
+
+Bulk operations (bulk_create, queryset update/delete) don't send these
+signals; code that uses them has to bump versions / generations itself.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import caching
+from .auth_backends import forget_user
+from .models import Feedback, FeedbackReply
+
+
+@receiver(pre_save, sender=Feedback, dispatch_uid="feedback_bump_version")
+def bump_version_on_edit(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    # F() in the UPDATE, like reply_changed, so an edit racing another edit or a reply
+    # can't write back the version it read; feedback_saved reads the result back
+    instance.version = F("version") + 1
+
+
+@receiver(post_save, sender=Feedback, dispatch_uid="feedback_saved_bump_generation")
+def feedback_saved(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    if hasattr(instance.version, "resolve_expression"):
+        instance.refresh_from_db(using=using, fields=["version"])
+    caching.bump_user_generation(instance.user_id, using)
+
+
+@receiver(post_delete, sender=Feedback, dispatch_uid="feedback_forget_cards")
+def feedback_deleted(sender, instance, using=None, **kwargs):
+    caching.forget_cards(instance)
+    caching.bump_user_generation(instance.user_id, using)
+
+
+def _owner_id(reply, using):
+    if FeedbackReply.feedback.is_cached(reply):
+        return reply.feedback.user_id
+    return Feedback.objects.using(using).filter(pk=reply.feedback_id).values_list("user_id", flat=True).first()
+
+
+@receiver(post_save, sender=FeedbackReply, dispatch_uid="reply_saved_bump_version")
+@receiver(post_delete, sender=FeedbackReply, dispatch_uid="reply_deleted_bump_version")
+def reply_changed(sender, instance, raw=False, origin=None, using=None, **kwargs):
+    # raw fixture loads, and replies removed together with their feedback
+    # (feedback_deleted already covers those)
+    if raw or isinstance(origin, Feedback):
+        return
+    # F() so two admins replying at once both count; `using`: the reply's (and so its feedback's) shard
+    Feedback.objects.using(using).filter(pk=instance.feedback_id).update(version=F("version") + 1)
+    caching.bump_user_generation(_owner_id(instance, using), using)
+
+
+# cached request.user (auth_backends.CachedModelBackend): password, is_active and
+# is_staff all change through save(), so any save drops the cached copy
+@receiver(post_save, sender=get_user_model(), dispatch_uid="user_saved_forget_cached")
+@receiver(post_delete, sender=get_user_model(), dispatch_uid="user_deleted_forget_cached")
+def user_changed(sender, instance, **kwargs):
+    user_id = instance.pk
+    forget_user(user_id)
+    # and again after commit, in case a request re-cached the old row in between
+    transaction.on_commit(lambda: forget_user(user_id))
@@ -0,0 +1,96 @@
+"""
+A small durable queue for feedback submissions, stored in a local SQLite file.
+
+Web workers append to it (one cheap local commit per submission) and the
+`flush_feedback_spool` command moves the rows into the main database in
+batches. Rows are only deleted after the main database committed them; a
+flusher that dies mid-batch leaves its claim behind, which expires after
+`lease` seconds so the rows are picked up again on restart.
+"""
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS spool (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ingest_key TEXT NOT NULL UNIQUE,
+    user_id INTEGER,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    message TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    claimed_until REAL
+);
+CREATE INDEX IF NOT EXISTS spool_user_idx ON spool (user_id, id);
+"""
+
+COLUMNS = ("id", "ingest_key", "user_id", "name", "email", "message", "created_at")
+
+
+class FeedbackSpool:
+    def __init__(self, path):
+        self.path = Path(path)
+        self._local = threading.local()
+
+    # one connection per thread (sqlite3 connections can't be shared)
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            # WAL + NORMAL: a commit survives a killed process, and writers don't block readers
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, *, ingest_key, user_id, name, email, message, created_at):
+        self.connection().execute(
+            "INSERT INTO spool (ingest_key, user_id, name, email, message, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (str(ingest_key), user_id, name, email, message, created_at.isoformat()),
+        )
+
+    def claim(self, limit, lease=60):
+        """Reserve up to `limit` unclaimed (or expired) rows, oldest first."""
+        conn = self.connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM spool "
+                "WHERE claimed_until IS NULL OR claimed_until < ? ORDER BY id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            if rows:
+                ids = [row["id"] for row in rows]
+                conn.execute(
+                    f"UPDATE spool SET claimed_until = ? WHERE id IN ({', '.join('?' * len(ids))})",
+                    (now + lease, *ids),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [dict(row) for row in rows]
+
+    def ack(self, ids):
+        """Forget rows that made it into the main database."""
+        if ids:
+            self.connection().execute(
+                f"DELETE FROM spool WHERE id IN ({', '.join('?' * len(ids))})", tuple(ids)
+            )
+
+    def pending_for_user(self, user_id):
+        rows = self.connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM spool WHERE user_id = ? ORDER BY id DESC",
+            (user_id,),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def pending_count(self):
+        return self.connection().execute("SELECT COUNT(*) FROM spool").fetchone()[0]
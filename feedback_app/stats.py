@@ -0,0 +1,120 @@
+"""
+Incremental dashboard statistics.
+
+Every write path calls one of the record_* helpers inside the same
+transaction as the write, so the DailyFeedbackStats rows always match the
+feedback table. The dashboard then reads O(days) rollup rows instead of
+counting Feedback.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import DailyFeedbackStats
+
+
+def bump(day=None, **deltas):
+    """Add `deltas` (e.g. created=1) to the rollup row for `day` (default: today)."""
+    deltas = {field: n for field, n in deltas.items() if n}
+    if not deltas:
+        return
+    day = day or timezone.localdate()
+    increments = {field: F(field) + n for field, n in deltas.items()}
+    if DailyFeedbackStats.objects.filter(day=day).update(**increments):
+        return
+    try:
+        # savepoint, so a concurrent insert of the same day doesn't break the caller's transaction
+        with transaction.atomic():
+            DailyFeedbackStats.objects.create(day=day, **deltas)
+    except IntegrityError:
+        DailyFeedbackStats.objects.filter(day=day).update(**increments)
+
+
+def local_day(value):
+    return timezone.localdate(value) if value else None
+
+
+def record_created(count=1, day=None):
+    bump(day, created=count)
+
+
+def record_replied(count=1, day=None):
+    bump(day, replied=count)
+
+
+def record_deleted(count=1, replied=0, day=None):
+    bump(day, deleted=count, replied_deleted=replied)
+
+
+TOTALS = {
+    "created": Sum("created"),
+    "replied": Sum("replied"),
+    "deleted": Sum("deleted"),
+    "replied_deleted": Sum("replied_deleted"),
+}
+
+
+def _today_created():
+    return DailyFeedbackStats.objects.filter(day=timezone.localdate()).values_list("created", flat=True)
+
+
+def totals():
+    """Sums over the whole rollup; they only grow, so any change to the stats changes them."""
+    return DailyFeedbackStats.objects.aggregate(**TOTALS)
+
+
+def summary():
+    """Totals for the stat cards (one aggregate over the rollup table)."""
+    return _summary(totals(), _today_created().first())
+
+
+async def asummary():
+    return _summary(await DailyFeedbackStats.objects.aaggregate(**TOTALS), await _today_created().afirst())
+
+
+def _summary(totals, today):
+    totals = {key: value or 0 for key, value in totals.items()}
+    total = totals["created"] - totals["deleted"]
+    replied = totals["replied"] - totals["replied_deleted"]
+    return {
+        "total": total,
+        "replied": replied,
+        "unreplied": total - replied,
+        "today": today or 0,
+    }
+
+
+def _trend_rows(days):
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    return start, DailyFeedbackStats.objects.filter(day__gte=start, day__lte=today)
+
+
+def trend(days=30):
+    """One dict per day for the last `days` days (oldest first), zero-filled."""
+    start, rows = _trend_rows(days)
+    return _trend(start, days, {row.day: row for row in rows})
+
+
+async def atrend(days=30):
+    start, rows = _trend_rows(days)
+    return _trend(start, days, {row.day: row async for row in rows})
+
+
+def _trend(start, days, rows):
+    peak = max([row.created for row in rows.values()] or [0]) or 1
+    result = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = rows.get(day)
+        created = row.created if row else 0
+        result.append({
+            "day": day,
+            "created": created,
+            "replied": row.replied if row else 0,
+            "deleted": row.deleted if row else 0,
+            "percent": round(created * 100 / peak),
+        })
+    return result
@@ -0,0 +1,41 @@
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from feedback_app import assets
+
+register = template.Library()
+
+
+@lru_cache(maxsize=1)
+def _critical_css(path):
+    # read once per process; a deploy runs build_assets and then restarts the workers
+    try:
+        return path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+
+
+@register.simple_tag
+def stylesheets():
+    """
+    The page's CSS: with a build (manage.py build_assets, used unless DEBUG or
+    ASSETS_USE_BUILD = False) the critical rules inline and the trimmed
+    stylesheet loaded without blocking rendering, otherwise all of Bootstrap.
+    """
+    critical = None
+    if getattr(settings, "ASSETS_USE_BUILD", not settings.DEBUG):
+        critical = _critical_css(assets.build_dir() / "critical.css")
+    if critical is None:
+        return format_html('<link href="{}" rel="stylesheet" />', static(assets.SOURCE_CSS))
+    href = static("build/app.css")
+    return format_html(
+        '<style>{}</style>\n'
+        '<link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'" />\n'
+        '<noscript><link href="{}" rel="stylesheet" /></noscript>',
+        mark_safe(critical), href, href,
+    )
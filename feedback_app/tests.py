@@ -1,3 +1,1165 @@
-from django.test import TestCase
+import csv
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, resolve, reverse
+from django.utils import timezone
+
+from . import (
+    assets, async_views, caching, export, ingest, metrics, moderation, ratelimit, routers, search, sharding, stats, views,
+)
+from . import urls as feedback_app_urls
+from .management.commands import bootstrap
+from .models import ArchivedFeedback, DailyFeedbackStats, Feedback, FeedbackReply
+from .pagination import CursorPaginator, InvalidCursor, decode_cursor, encode_cursor
+from .search import SQLiteFTS5SearchBackend
+from .spool import FeedbackSpool
+
+
+def make_feedback(user, message, minutes_ago=0, **fields):
+    fields = {"name": user.username if user else "anon", "email": "someone@example.com", **fields}
+    return Feedback.objects.create(
+        user=user, message=message, created_at=timezone.now() - timedelta(minutes=minutes_ago), **fields,
+    )
+
+
+@contextmanager
+def another_process():
+    """Run the block the way another process (a worker, a management command) would: with a locmem cache of its own."""
+    own = {**settings.CACHES, "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "other"}}
+    with override_settings(CACHES=own):
+        yield
+
+
+def adapted_middleware():
+    """The log lines Django writes when it builds the ASGI middleware chain and has to wrap a sync-only middleware."""
+    records = []
+    handler = logging.Handler(logging.DEBUG)
+    handler.emit = records.append
+    logger = logging.getLogger("django.request")
+    level = logger.level
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    try:
+        # (only logged with DEBUG on)
+        with override_settings(DEBUG=True):
+            ASGIHandler()
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+    return " ".join(record.getMessage() for record in records if "adapted" in record.msg)
+
+
+# one database, whatever MYSQL_REPLICA_HOSTS / MYSQL_SHARD_HOSTS say; the tests that
+# need replicas or shards turn them on. (The default PBKDF2 hasher is made to be slow.)
+@override_settings(
+    DATABASE_REPLICAS=[], FEEDBACK_SHARDS=[],
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class FeedbackTestCase(TestCase):
+    def setUp(self):
+        # pks repeat between tests, so cached cards and lists could outlive their rows
+        for cache in caches.all():
+            cache.clear()
+        self.user = User.objects.create_user("alice", "alice@example.com", "pw")
+        self.other = User.objects.create_user("bob", "bob@example.com", "pw")
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+
+
+class CachedUserTests(FeedbackTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("my_feedback"))
+        self.assertEqual(response.status_code, 200)
+        return [q for q in queries if 'FROM "auth_user"' in q["sql"] or "FROM `auth_user`" in q["sql"]]
+
+    def assert_logged_out(self):
+        response = self.client.get(reverse("my_feedback"))
+        self.assertRedirects(response, f"{settings.LOGIN_URL}?next={reverse('my_feedback')}", fetch_redirect_response=False)
+
+    def test_deactivated_by_another_process(self):
+        self.client.get(reverse("my_feedback"))
+        with another_process():
+            self.user.is_active = False
+            self.user.save()
+        self.assert_logged_out()
+
+    def test_shared_cache_is_used_and_dropped_on_save(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        shared = {**settings.CACHES, "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": cache_dir.name}}
+        with override_settings(CACHES=shared):
+            self.assertTrue(caching.cache_is_shared())
+            self.user_queries()
+            self.assertEqual(self.user_queries(), [])
+            # any process writing to the same cache, e.g. `manage.py shell`
+            self.user.is_active = False
+            self.user.save()
+            self.assert_logged_out()
+
+    def test_demoted_staff_loses_the_dashboard(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse("admin_dashboard")).status_code, 200)
+        with another_process():
+            self.admin.is_staff = self.admin.is_superuser = False
+            self.admin.save()
+        self.assertRedirects(self.client.get(reverse("admin_dashboard")), reverse("homepage"), fetch_redirect_response=False)
+
+
+class CardCacheTests(FeedbackTestCase):
+    def setUp(self):
+        super().setUp()
+        self.feedback = make_feedback(self.user, "the lift is broken")
+
+    def card(self, variant="owner"):
+        return caching.render_cards([Feedback.objects.get(pk=self.feedback.pk)], variant)[0]
+
+    def test_edit_and_reply_give_a_new_card(self):
+        self.assertIn("the lift is broken", self.card())
+        self.client.force_login(self.user)
+        self.client.post(
+            reverse("edit_feedback", args=[self.feedback.pk]),
+            {"name": "alice", "email": "alice@example.com", "message": "the lift works again"},
+        )
+        self.assertIn("the lift works again", self.card())
+        self.assertIn("the lift works again", self.card("admin"))
+
+        self.client.force_login(self.admin)
+        self.client.post(reverse("admin_feedback_reply", args=[self.feedback.pk]), {"message": "fixed it"})
+        self.assertIn("fixed it", self.card("admin"))
+        self.assertEqual(Feedback.objects.get(pk=self.feedback.pk).version, 3)
+
+    def test_unchanged_card_comes_from_cache(self):
+        self.card()
+        with self.assertNumQueries(1):
+            self.card()
+
+    def test_concurrent_edits_both_count(self):
+        first, second = Feedback.objects.get(pk=self.feedback.pk), Feedback.objects.get(pk=self.feedback.pk)
+        first.message = "edited once"
+        first.save()
+        second.message = "edited twice"
+        second.save()
+        # each sees the version it wrote, and neither reuses the other's card key
+        self.assertEqual((first.version, second.version), (2, 3))
+        self.assertEqual(Feedback.objects.get(pk=self.feedback.pk).version, 3)
+
+    def test_delete_drops_the_cards(self):
+        self.card()
+        self.card("admin")
+        feedback = Feedback.objects.get(pk=self.feedback.pk)
+        keys = [caching.card_key(variant, feedback.pk, feedback.version) for variant in caching.CARD_TEMPLATES]
+        self.assertEqual(len(caches["default"].get_many(keys)), 2)
+        feedback.delete()
+        self.assertEqual(caches["default"].get_many(keys), {})
+
+
+class MyFeedbackCacheTests(FeedbackTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.url = reverse("my_feedback")
+
+    def write(self):
+        # generations are bumped once the write commits
+        return self.captureOnCommitCallbacks(execute=True)
+
+    def test_list_follows_edits_replies_and_deletes(self):
+        with self.write():
+            feedback = make_feedback(self.user, "first version")
+        self.assertContains(self.client.get(self.url), "first version")
+        with self.write():
+            feedback.message = "second version"
+            feedback.save()
+        self.assertContains(self.client.get(self.url), "second version")
+        with self.write():
+            FeedbackReply.objects.create(feedback=feedback, admin=self.admin, message="an answer")
+        self.assertContains(self.client.get(self.url), "an answer")
+        with self.write():
+            feedback.delete()
+        self.assertNotContains(self.client.get(self.url), "second version")
+
+    def test_list_is_served_from_cache(self):
+        with self.write():
+            make_feedback(self.user, "cached")
+        self.client.get(self.url)
+        # .update() sends no signals, so nothing bumps the generation
+        Feedback.objects.update(message="changed quietly")
+        self.assertContains(self.client.get(self.url), "cached")
+
+    def test_other_users_writes_keep_the_list(self):
+        with self.write():
+            make_feedback(self.user, "mine")
+        generation = caching.user_generation(self.user.pk)
+        with self.write():
+            make_feedback(self.other, "theirs")
+        self.assertEqual(caching.user_generation(self.user.pk), generation)
+
+    def test_spool_flushed_by_another_process(self):
+        spool_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spool_dir.cleanup)
+        with override_settings(FEEDBACK_INGEST_MODE="buffered", FEEDBACK_SPOOL_PATH=Path(spool_dir.name) / "spool.sqlite3"):
+            self.client.post(reverse("submit_feedback"), {"message": "spooled"})
+            response = self.client.get(self.url)
+            self.assertContains(response, "Pending")
+            self.assertContains(response, "spooled")
+
+            with another_process(), self.write():
+                call_command("flush_feedback_spool", stdout=StringIO())
+            response = self.client.get(self.url)
+            self.assertNotContains(response, "Pending")
+            self.assertContains(response, "spooled")
+
+    def test_archived_by_another_process(self):
+        with self.write():
+            make_feedback(self.user, "very old", minutes_ago=60 * 24 * 40)
+        self.assertContains(self.client.get(self.url), "very old")
+        with another_process(), self.write():
+            call_command("archive_feedback", days=30, stdout=StringIO())
+        self.assertNotContains(self.client.get(self.url), "very old")
+        self.assertContains(self.client.get(self.url, {"archive": "1"}), "very old")
+
+
+@override_settings(RATELIMIT_ENABLED=False)
+class DailyStatsTests(FeedbackTestCase):
+    def test_rollup_follows_writes(self):
+        self.client.force_login(self.user)
+        for message in ("first", "second"):
+            self.client.post(reverse("submit_feedback"), {"message": message})
+        self.assertEqual(stats.summary(), {"total": 2, "replied": 0, "unreplied": 2, "today": 2})
+
+        first = Feedback.objects.get(message="first")
+        self.client.force_login(self.admin)
+        for message in ("thanks", "again"):
+            self.client.post(reverse("admin_feedback_reply", args=[first.pk]), {"message": message})
+        # only the first reply counts
+        self.assertEqual(stats.summary(), {"total": 2, "replied": 1, "unreplied": 1, "today": 2})
+
+        self.client.force_login(self.user)
+        self.client.post(reverse("delete_feedback", args=[first.pk]))
+        self.assertEqual(stats.summary(), {"total": 1, "replied": 0, "unreplied": 1, "today": 2})
+        self.assertEqual(stats.trend(30)[-1] | {"percent": None}, {
+            "day": timezone.localdate(), "created": 2, "replied": 1, "deleted": 1, "percent": None,
+        })
+
+        # the same cards as counting from scratch (which has no deletions to record)
+        call_command("rebuild_feedback_stats", stdout=StringIO())
+        self.assertEqual(stats.summary() | {"today": None}, {"total": 1, "replied": 0, "unreplied": 1, "today": None})
+
+    def test_total_card_follows_the_filters(self):
+        make_feedback(self.user, "login is slow")
+        make_feedback(self.user, "payment failed")
+        make_feedback(self.other, "login again", minutes_ago=60 * 24 * 10)
+        call_command("rebuild_feedback_stats", stdout=StringIO())
+        self.client.force_login(self.admin)
+        url = reverse("admin_dashboard")
+
+        response = self.client.get(url)
+        self.assertIsNone(response.context["matching"])
+        self.assertEqual(response.context["stats"]["total"], 3)
+        self.assertContains(response, "Total Feedback")
+
+        for params, matching in [({"q": "login"}, 2), ({"date": "week"}, 2), ({"q": "login", "date": "today"}, 1)]:
+            response = self.client.get(url, params)
+            self.assertEqual(response.context["matching"], matching, params)
+            self.assertContains(response, "Matching Feedback")
+            self.assertContains(response, "of 3 in total")
+
+
+class SpoolTests(FeedbackTestCase):
+    def setUp(self):
+        super().setUp()
+        spool_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spool_dir.cleanup)
+        self.spool_path = Path(spool_dir.name) / "spool.sqlite3"
+        self.spool = FeedbackSpool(self.spool_path)
+
+    def enqueue(self, message, user=None):
+        self.spool.enqueue(
+            ingest_key=uuid.uuid4(), user_id=user.pk if user else None, name="alice", email="alice@example.com",
+            message=message, created_at=timezone.now(),
+        )
+
+    @override_settings(FEEDBACK_INGEST_MODE="buffered", RATELIMIT_ENABLED=False)
+    def test_submissions_wait_in_the_spool_until_flushed(self):
+        with override_settings(FEEDBACK_SPOOL_PATH=self.spool_path):
+            self.client.force_login(self.user)
+            self.client.post(reverse("submit_feedback"), {"message": "spooled"})
+            self.assertFalse(Feedback.objects.exists())
+            self.assertEqual([item["message"] for item in ingest.pending_for_user(self.user)], ["spooled"])
+
+            out = StringIO()
+            call_command("flush_feedback_spool", stdout=out)
+        self.assertIn("Flushed 1 submission(s).", out.getvalue())
+        feedback = Feedback.objects.get()
+        self.assertEqual((feedback.user, feedback.message), (self.user, "spooled"))
+        self.assertIsNotNone(feedback.ingest_key)
+        self.assertEqual(stats.summary()["total"], 1)
+        self.assertEqual(self.spool.pending_count(), 0)
+
+    def test_batches(self):
+        for n in range(5):
+            self.enqueue(f"message {n}", self.user)
+        self.assertEqual(ingest.flush_spool(2, spool=self.spool), 2)
+        self.assertEqual(ingest.flush_spool(10, spool=self.spool), 3)
+        self.assertEqual(ingest.flush_spool(10, spool=self.spool), 0)
+        # submission order is kept
+        messages = Feedback.objects.order_by("id").values_list("message", flat=True)
+        self.assertEqual(list(messages), [f"message {n}" for n in range(5)])
+
+    def test_claim_of_a_dead_flusher_expires(self):
+        self.enqueue("left behind")
+        self.assertEqual(len(self.spool.claim(10, lease=60)), 1)
+        # still leased to the flusher that claimed it
+        self.assertEqual(ingest.flush_spool(spool=self.spool), 0)
+
+        self.spool.connection().execute("UPDATE spool SET claimed_until = ?", (time.time() - 1,))
+        self.assertEqual(ingest.flush_spool(spool=self.spool), 1)
+        self.assertEqual(Feedback.objects.get().message, "left behind")
+
+    def test_batch_committed_before_a_crash_is_not_inserted_twice(self):
+        self.enqueue("only once", self.user)
+
+        class DiesBeforeAck(FeedbackSpool):
+            def ack(self, ids):
+                raise RuntimeError("killed")
+
+        with self.assertRaises(RuntimeError):
+            ingest.flush_spool(spool=DiesBeforeAck(self.spool_path))
+        self.assertEqual(Feedback.objects.count(), 1)
+
+        self.spool.connection().execute("UPDATE spool SET claimed_until = ?", (time.time() - 1,))
+        self.assertEqual(ingest.flush_spool(spool=self.spool), 1)
+        self.assertEqual(Feedback.objects.count(), 1)
+        self.assertEqual(stats.summary()["total"], 1)
+        self.assertEqual(self.spool.pending_count(), 0)
+
+
+class ExportTests(FeedbackTestCase):
+    def setUp(self):
+        super().setUp()
+        self.formula = make_feedback(self.user, "=HYPERLINK(\"http://evil.example\")", minutes_ago=2)
+        FeedbackReply.objects.create(feedback=self.formula, admin=self.admin, message="@look")
+        self.plain = make_feedback(self.other, "login is slow", minutes_ago=1, name="-bob")
+        self.client.force_login(self.admin)
+
+    def export(self, export_format, **params):
+        response = self.client.get(reverse("admin_dashboard"), {"export": export_format, **params})
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response, body = self.export("csv")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertRegex(response["Content-Disposition"], r'^attachment; filename="feedback-\d{8}-\d{4}\.csv"$')
+        rows = list(csv.reader(StringIO(body)))
+        self.assertEqual(rows[0], export.CSV_HEADER)
+        # newest first; anything a spreadsheet would run as a formula starts with a quote
+        self.assertEqual([row[0] for row in rows[1:]], [str(self.plain.pk), str(self.formula.pk)])
+        self.assertEqual(rows[1][2], "'-bob")
+        self.assertEqual(rows[2][4], "'=HYPERLINK(\"http://evil.example\")")
+        self.assertEqual(rows[2][6:], ["1", "admin: @look"])
+
+    def test_ndjson_keeps_the_raw_text(self):
+        response, body = self.export("ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row["id"] for row in rows], [self.plain.pk, self.formula.pk])
+        self.assertEqual(rows[0]["name"], "-bob")
+        self.assertEqual(rows[1]["message"], self.formula.message)
+        self.assertEqual([reply["message"] for reply in rows[1]["replies"]], ["@look"])
+
+    def test_follows_the_filters(self):
+        _, body = self.export("csv", q="login")
+        self.assertEqual([row[0] for row in list(csv.reader(StringIO(body)))[1:]], [str(self.plain.pk)])
+
+    def test_streamed_in_chunks(self):
+        for n in range(5):
+            make_feedback(self.user, f"more {n}", minutes_ago=10 + n)
+        # one query for each chunk of 2 and one for its replies, nothing up front
+        with self.assertNumQueries(0):
+            response = export.export_response(Feedback.objects.with_replies(), ("-created_at", "-id"), "ndjson", chunk_size=2)
+        with self.assertNumQueries(8):
+            rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(len({row["id"] for row in rows}), 7)
+
+    def test_staff_only(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("admin_dashboard"), {"export": "csv"})
+        self.assertRedirects(response, reverse("homepage"), fetch_redirect_response=False)
+
+
+class RebuildStatsTests(FeedbackTestCase):
+    def test_archived_feedback_still_counts(self):
+        old = make_feedback(self.user, "old", minutes_ago=60 * 24 * 40)
+        FeedbackReply.objects.create(feedback=old, admin=self.admin, message="seen", created_at=old.created_at)
+        FeedbackReply.objects.create(feedback=old, admin=self.admin, message="again", created_at=old.created_at)
+        make_feedback(self.user, "new")
+        call_command("archive_feedback", days=30, stdout=StringIO())
+        self.assertEqual(ArchivedFeedback.objects.count(), 1)
+
+        call_command("rebuild_feedback_stats", stdout=StringIO())
+        self.assertEqual(stats.totals()["created"], 2)
+        self.assertEqual(stats.totals()["replied"], 1)
+        self.assertEqual(DailyFeedbackStats.objects.get(day=stats.local_day(old.created_at)).replied, 1)
+
+
+class CursorPaginationTests(FeedbackTestCase):
+    def setUp(self):
+        super().setUp()
+        # newest first: message "5" ... "1"
+        self.rows = [make_feedback(self.user, str(n), minutes_ago=10 - n) for n in range(1, 6)]
+        self.rows.reverse()
+        self.paginator = CursorPaginator(Feedback.objects.all(), per_page=2)
+
+    def messages(self, page):
+        return [fb.message for fb in page]
+
+    def test_next_and_previous(self):
+        first = self.paginator.page()
+        self.assertEqual(self.messages(first), ["5", "4"])
+        self.assertFalse(first.has_previous())
+
+        second = self.paginator.page(after=first.next_cursor)
+        self.assertEqual(self.messages(second), ["3", "2"])
+        last = self.paginator.page(after=second.next_cursor)
+        self.assertEqual(self.messages(last), ["1"])
+        self.assertFalse(last.has_next())
+
+        back = self.paginator.page(before=last.previous_cursor)
+        self.assertEqual(self.messages(back), ["3", "2"])
+        self.assertEqual(self.messages(self.paginator.page(before=back.previous_cursor)), ["5", "4"])
+
+    def test_same_created_at_is_split_by_id(self):
+        now = timezone.now()
+        Feedback.objects.update(created_at=now)
+        seen = []
+        after = None
+        while True:
+            page = self.paginator.page(after=after)
+            seen += [fb.pk for fb in page]
+            if not page.has_next():
+                break
+            after = page.next_cursor
+        self.assertEqual(seen, sorted((fb.pk for fb in self.rows), reverse=True))
+
+    def test_tampered_cursor(self):
+        for cursor in ["not base64!", encode_cursor({"id": 1}), encode_cursor([1]), encode_cursor(["yesterday", 1])]:
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                self.paginator.page(after=cursor)
+        with self.assertRaises(InvalidCursor):
+            decode_cursor("%%%")
+
+    def test_view_falls_back_to_first_page_on_tampered_cursor(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("admin_dashboard"), {"after": "garbage"})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'data-feedback-id="{self.rows[0].pk}"')
+
+
+@skipUnless(connection.vendor == "sqlite", "the FTS5 index only exists on SQLite")
+class SearchTests(FeedbackTestCase):
+    def setUp(self):
+        super().setUp()
+        self.once = make_feedback(self.user, "the login page is slow and the colours are a bit off")
+        self.often = make_feedback(self.user, "login fails, login again, login broken")
+        self.unrelated = make_feedback(self.user, "payment failed")
+
+    def search(self, query):
+        return list(SQLiteFTS5SearchBackend().search(Feedback.objects.all(), query).order_by("-search_rank", "-id"))
+
+    def test_matches_every_term_as_prefix(self):
+        self.assertCountEqual(self.search("log"), [self.once, self.often])
+        self.assertEqual(self.search("login slow"), [self.once])
+        self.assertEqual(self.search("refund"), [])
+
+    def test_best_match_first(self):
+        self.assertEqual(self.search("login"), [self.often, self.once])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.unrelated.message = "login works again"
+        self.unrelated.save()
+        self.once.delete()
+        self.assertCountEqual(self.search("login"), [self.often, self.unrelated])
+
+    def test_dashboard_search(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("admin_dashboard"), {"q": "login"})
+        content = response.content.decode()
+        self.assertNotIn(f'data-feedback-id="{self.unrelated.pk}"', content)
+        self.assertLess(
+            content.index(f'data-feedback-id="{self.often.pk}"'), content.index(f'data-feedback-id="{self.once.pk}"')
+        )
+
+
+class MySQLFulltextTermTests(FeedbackTestCase):
+    """Which terms go to MATCH ... AGAINST; only the SQL is looked at, so this runs on any database."""
+
+    def setUp(self):
+        super().setUp()
+        # innodb_ft_min_token_size 3 and a few of the built-in stopwords
+        search._fulltext_limits[connection.alias] = (3, {"the", "and", "about"})
+        self.addCleanup(search._fulltext_limits.clear)
+
+    def sql(self, query):
+        sql, params = search.MySQLFulltextSearchBackend().search(Feedback.objects.all(), query).query.sql_with_params()
+        return sql, [str(param) for param in params]
+
+    def test_indexed_terms_use_the_fulltext_index(self):
+        sql, params = self.sql("login slow")
+        self.assertIn("AGAINST", sql)
+        self.assertIn("+login* +slow*", params)
+        self.assertNotIn("LIKE", sql)
+
+    def test_short_words_and_stopwords_use_icontains(self):
+        sql, params = self.sql("The ui and login")
+        self.assertIn("+login*", params)
+        self.assertNotIn("+ui*", " ".join(params))
+        self.assertNotIn("+The*", " ".join(params))
+        self.assertIn("%ui%", params)
+        self.assertIn("%The%", params)
+
+    def test_only_short_words_skip_the_index(self):
+        sql, params = self.sql("ui ok")
+        self.assertNotIn("AGAINST", sql)
+        self.assertEqual(params.count("%ui%"), 3)
+
+
+class OwnerObjectTests(FeedbackTestCase):
+    def setUp(self):
+        super().setUp()
+        self.feedback = make_feedback(self.user, "mine")
+
+    def test_owner_can_delete(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse("delete_feedback", args=[self.feedback.pk]))
+        self.assertRedirects(response, reverse("my_feedback"), fetch_redirect_response=False)
+        self.assertFalse(Feedback.objects.filter(pk=self.feedback.pk).exists())
+
+    def test_other_user_gets_403(self):
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(reverse("delete_feedback", args=[self.feedback.pk])).status_code, 403)
+        self.assertEqual(self.client.post(reverse("delete_feedback", args=[self.feedback.pk])).status_code, 403)
+        self.assertTrue(Feedback.objects.filter(pk=self.feedback.pk).exists())
+
+    def test_other_user_cannot_edit(self):
+        self.client.force_login(self.other)
+        response = self.client.post(
+            reverse("edit_feedback", args=[self.feedback.pk]), {"name": "x", "email": "x@example.com", "message": "hijacked"}
+        )
+        self.assertRedirects(response, reverse("my_feedback"), fetch_redirect_response=False)
+        self.feedback.refresh_from_db()
+        self.assertEqual(self.feedback.message, "mine")
+
+    def test_missing_feedback_is_404(self):
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(reverse("delete_feedback", args=[self.feedback.pk + 100])).status_code, 404)
+
+    def test_anonymous_is_sent_to_login(self):
+        response = self.client.get(reverse("delete_feedback", args=[self.feedback.pk]))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse("login"), response["Location"])
+
+    def test_staff_can_delete(self):
+        self.client.force_login(self.admin)
+        self.client.post(reverse("delete_feedback", args=[self.feedback.pk]))
+        self.assertFalse(Feedback.objects.filter(pk=self.feedback.pk).exists())
+
+
+@override_settings(RATELIMIT_ENABLED=True, RATELIMITS={"login": [("ip", "2/m")], "submit_feedback": [("user", "1/m")]})
+class RateLimitTests(FeedbackTestCase):
+    def test_429_with_retry_after(self):
+        url = reverse("login")
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, {"username": "alice", "password": "wrong"}).status_code, 200)
+        response = self.client.post(url, {"username": "alice", "password": "wrong"})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        self.assertLessEqual(int(response["Retry-After"]), 120)
+        # showing the form is never limited
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_counted_per_user(self):
+        url = reverse("submit_feedback")
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.post(url, {"message": "one"}).status_code, 302)
+        self.assertEqual(self.client.post(url, {"message": "two"}).status_code, 429)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.post(url, {"message": "three"}).status_code, 302)
+        self.assertEqual(Feedback.objects.count(), 2)
+
+    async def test_async_requests_are_limited(self):
+        url = reverse("submit_feedback")
+        await self.async_client.aforce_login(self.user)
+        self.assertEqual((await self.async_client.post(url, {"message": "one"})).status_code, 302)
+        response = await self.async_client.post(url, {"message": "two"})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        self.assertEqual(await Feedback.objects.acount(), 1)
+
+    def test_not_adapted_under_asgi(self):
+        self.assertNotIn("RateLimitMiddleware", adapted_middleware())
+
+    def test_sliding_window(self):
+        key = "ratelimit:test"
+        self.assertEqual(ratelimit.hit(key, 2, 60, now=600.0), 0)
+        self.assertEqual(ratelimit.hit(key, 2, 60, now=610.0), 0)
+        # over on this window alone: its end (50 s) plus a third of the next one
+        self.assertEqual(ratelimit.hit(key, 2, 60, now=610.0), 70)
+        # next window, 40 s in: the previous one still counts 3 * 20/60 = 1
+        self.assertEqual(ratelimit.hit(key, 2, 60, now=700.0), 0)
+        # 1 + 2 > 2 until that window stops counting, 20 s later
+        self.assertEqual(ratelimit.hit(key, 2, 60, now=700.0), 20)
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], DATABASE_PRIMARY_STICKY_SECONDS=15)
+class ReplicaStickinessTests(FeedbackTestCase):
+    def setUp(self):
+        super().setUp()
+        # "replica" never gets queried here: report it healthy without a health check
+        routers._health["replica"] = (time.monotonic(), True)
+        self.addCleanup(routers._health.clear)
+        self.factory = RequestFactory()
+
+    def request_with(self, session):
+        request = self.factory.get(reverse("admin_dashboard"))
+        request.session = session
+        return request
+
+    def test_reads_go_to_replica_until_a_write(self):
+        self.client.force_login(self.user)
+        self.assertEqual(routers.replica_for(self.request_with(self.client.session)), "replica")
+
+        response = self.client.post(reverse("submit_feedback"), {"message": "hello"})
+        self.assertEqual(response.status_code, 302)
+        session = self.client.session
+        self.assertGreater(session[routers.PIN_SESSION_KEY], time.time())
+        self.assertIsNone(routers.replica_for(self.request_with(session)))
+
+        # the pin runs out after the sticky window
+        session[routers.PIN_SESSION_KEY] = time.time() - 1
+        self.assertEqual(routers.replica_for(self.request_with(session)), "replica")
+
+    async def test_async_write_pins(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(reverse("submit_feedback"), {"message": "hello"})
+        self.assertEqual(response.status_code, 302)
+        session = await self.async_client.asession()
+        self.assertGreater(await session.aget(routers.PIN_SESSION_KEY), time.time())
+
+    def test_not_adapted_under_asgi(self):
+        self.assertNotIn("ReplicaMiddleware", adapted_middleware())
+
+    def test_failed_write_does_not_pin(self):
+        self.client.force_login(self.other)
+        feedback = make_feedback(self.user, "not yours")
+        self.assertEqual(self.client.post(reverse("delete_feedback", args=[feedback.pk])).status_code, 403)
+        self.assertNotIn(routers.PIN_SESSION_KEY, self.client.session)
+
+    def test_recent_data_is_read_from_primary(self):
+        self.client.force_login(self.user)
+        request = self.request_with(self.client.session)
+        self.assertIsNone(routers.replica_for(request, written_at=time.time()))
+        self.assertEqual(routers.replica_for(request, written_at=time.time() - 60), "replica")
+
+    def test_unhealthy_replica_is_skipped(self):
+        routers._health["replica"] = (time.monotonic(), False)
+        self.client.force_login(self.user)
+        self.assertIsNone(routers.replica_for(self.request_with(self.client.session)))
+
+
+SHARDS = ["default", "shard1", "shard2"]
+
+
+class ShardRoutingTests(FeedbackTestCase):
+    """Routing only: the shard aliases are never queried, so they needn't be configured."""
+
+    def setUp(self):
+        super().setUp()
+        sharding._legacy_marks.clear()
+        self.addCleanup(sharding._legacy_marks.clear)
+
+    def new_feedback(self, user):
+        feedback = Feedback(user=user, name=user.username, email="someone@example.com", message="new")
+        sharding.assign_ids([feedback])
+        return feedback
+
+    def test_disabled(self):
+        self.assertFalse(sharding.enabled())
+        self.assertIsNone(sharding.db_for_pk(1))
+        self.assertIsNone(sharding.db_for_user(self.user.pk))
+        self.assertEqual(sharding.databases(), [None])
+
+    @override_settings(FEEDBACK_SHARDS=SHARDS)
+    def test_new_ids_name_their_shard(self):
+        for user in User.objects.all():
+            feedback = self.new_feedback(user)
+            self.assertEqual(feedback.pk % sharding.SHARD_SLOTS, SHARDS.index(sharding.db_for_user(user.pk)))
+            self.assertEqual(sharding.db_for_pk(feedback.pk), sharding.db_for_user(user.pk))
+            self.assertEqual(sharding.db_for_instance(feedback), sharding.db_for_user(user.pk))
+        # without an owner: the first shard
+        self.assertEqual(sharding.db_for_user(None), "default")
+
+    @override_settings(FEEDBACK_SHARDS=SHARDS)
+    def test_ids_keep_growing(self):
+        first, second = self.new_feedback(self.user), self.new_feedback(self.user)
+        self.assertGreater(second.pk, first.pk)
+
+    def test_ids_from_before_sharding_stay_on_default(self):
+        old = [make_feedback(user, "before sharding") for user in (self.user, self.other)]
+        with override_settings(FEEDBACK_SHARDS=SHARDS):
+            for feedback in old:
+                self.assertEqual(sharding.db_for_pk(feedback.pk), "default")
+            # new ids start above the old ones, and still name their shard
+            new = self.new_feedback(self.user)
+            self.assertGreater(new.pk, max(feedback.pk for feedback in old))
+            self.assertEqual(sharding.db_for_pk(new.pk), sharding.db_for_user(self.user.pk))
+
+            # an old owner's list reads their shard and "default"; a new user only their shard
+            databases = sharding.databases_for_user(self.other.pk)
+            self.assertIn("default", databases)
+            self.assertEqual(databases[0], sharding.db_for_user(self.other.pk))
+            newcomer = User.objects.create_user("carol", "carol@example.com", "pw")
+            self.assertEqual(sharding.databases_for_user(newcomer.pk), [sharding.db_for_user(newcomer.pk)])
+
+    def test_user_constraints_only_where_the_users_are(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Feedback._meta.db_table)
+        self.assertIn(
+            ["user_id"], [info["columns"] for info in constraints.values() if info["foreign_key"] == ("auth_user", "id")]
+        )
+        self.assertTrue(sharding.has_users("default"))
+        self.assertTrue(sharding.has_users("shard1"))
+        with override_settings(FEEDBACK_SHARDS=SHARDS):
+            self.assertTrue(sharding.has_users("default"))
+            self.assertFalse(sharding.has_users("shard1"))
+
+    def test_marks_are_fixed_once_written(self):
+        make_feedback(self.user, "before sharding")
+        with override_settings(FEEDBACK_SHARDS=SHARDS):
+            marks = sharding.legacy_marks()
+        # rows added to "default" later don't move them (e.g. in another process)
+        make_feedback(self.other, "after")
+        sharding._legacy_marks.clear()
+        with override_settings(FEEDBACK_SHARDS=SHARDS):
+            self.assertEqual(sharding.legacy_marks(), marks)
+
+
+class MetricsTests(FeedbackTestCase):
+    def served(self, view, status=200):
+        return metrics.registry.requests.get((view, status), 0)
+
+    def test_endpoint_is_staff_only(self):
+        url = reverse("metrics")
+        self.assertRedirects(self.client.get(url), f"{settings.LOGIN_URL}?next={url}", fetch_redirect_response=False)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn('feedback_requests_total{view="metrics",status="403"', response.content.decode())
+
+    def test_records_each_request(self):
+        before = self.served("login")
+        self.client.get(reverse("login"))
+        self.assertEqual(self.served("login"), before + 1)
+        histogram = metrics.registry.histograms["feedback_template_duration_seconds", "login"]
+        self.assertGreater(histogram.sum, 0)
+
+    async def test_records_async_requests(self):
+        before = self.served("login")
+        await self.async_client.get(reverse("login"))
+        self.assertEqual(self.served("login"), before + 1)
+
+    def test_not_adapted_under_asgi(self):
+        self.assertNotIn("MetricsMiddleware", adapted_middleware())
+
+
+@override_settings(FEEDBACK_IMPORT_TOKENS=["kiosk-token"], RATELIMIT_ENABLED=False)
+class ImportTests(FeedbackTestCase):
+    def post(self, lines, token="kiosk-token"):
+        body = "\n".join(line if isinstance(line, str) else json.dumps(line) for line in lines)
+        return self.client.post(
+            reverse("import_feedback"), body, content_type="application/x-ndjson",
+            headers={"Authorization": f"Bearer {token}"} if token else {},
+        )
+
+    def test_needs_a_token(self):
+        self.assertEqual(self.post([], token=None).status_code, 401)
+        self.assertEqual(self.post([], token="wrong").status_code, 401)
+
+    def test_error_lines(self):
+        good = {"name": "Kiosk", "email": "kiosk@example.com", "message": "lobby is cold"}
+        response = self.post([
+            good,
+            "not json",
+            "",
+            '["a list"]',
+            {"name": ["a"], "email": "kiosk@example.com", "message": {"x": 1}},
+            {"name": None, "email": "kiosk@example.com", "message": "no name"},
+            {"name": "Kiosk", "email": "nope", "message": 42},
+            {"name": "K" * 101, "email": "kiosk@example.com", "message": "long name"},
+            {**good, "message": "second"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual((result["created"], result["failed"], result["errors_truncated"]), (2, 6, False))
+        errors = {error["line"]: error["errors"] for error in result["errors"]}
+        self.assertEqual(sorted(errors), [2, 4, 5, 6, 7, 8])
+        self.assertIn("Invalid JSON", errors[2]["__all__"][0])
+        self.assertEqual(errors[4], {"__all__": ["Invalid JSON: expected a JSON object"]})
+        self.assertEqual(errors[5], {"name": ["Must be a string."], "message": ["Must be a string."]})
+        self.assertEqual(errors[6], {"name": ["This field is required."]})
+        self.assertEqual(sorted(errors[7]), ["email", "message"])
+        self.assertEqual(sorted(errors[8]), ["name"])
+        self.assertQuerySetEqual(
+            Feedback.objects.order_by("id").values_list("name", "message", "user"),
+            [("Kiosk", "lobby is cold", None), ("Kiosk", "second", None)],
+        )
+        self.assertEqual(sum(DailyFeedbackStats.objects.values_list("created", flat=True)), 2)
+
+    def test_errors_listed_up_to_max_errors(self):
+        result = ingest.import_ndjson(["{}"] * 5, max_errors=2)
+        self.assertEqual((result["failed"], len(result["errors"]), result["errors_truncated"]), (5, 2, True))
+
+    @skipUnless(connection.vendor == "sqlite", "the FTS5 index only exists on SQLite")
+    def test_imported_rows_are_searchable(self):
+        lines = [{"name": "Kiosk", "email": "kiosk@example.com", "message": f"lobby heater {n}"} for n in range(5)]
+        with override_settings(FEEDBACK_IMPORT_CHUNK_SIZE=2):
+            self.assertEqual(self.post(lines).json()["created"], 5)
+        later = make_feedback(self.user, "heater again")
+
+        def search(query):
+            return SQLiteFTS5SearchBackend().search(Feedback.objects.all(), query)
+
+        self.assertEqual(search("lobby heater").count(), 5)
+        # the per-row trigger is back afterwards
+        self.assertEqual(list(search("again")), [later])
+
+
+class ConditionalGetTests(FeedbackTestCase):
+    def setUp(self):
+        super().setUp()
+        make_feedback(self.user, "first")
+        self.client.force_login(self.user)
+        self.url = reverse("my_feedback")
+
+    def revalidate(self, etag):
+        return self.client.get(self.url, headers={"If-None-Match": etag})
+
+    def test_304_once_the_csrf_cookie_is_set(self):
+        # force_login sets no csrftoken: the first page issues it, and its ETag still holds after
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn(settings.CSRF_COOKIE_NAME, first.cookies)
+        self.assertIn("Cookie", first["Vary"])
+        self.assertEqual(self.revalidate(first["ETag"]).status_code, 304)
+
+    def test_rendered_without_a_csrf_cookie(self):
+        etag = self.client.get(self.url)["ETag"]
+        del self.client.cookies[settings.CSRF_COOKIE_NAME]
+        response = self.revalidate(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_rendered_after_a_change(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            make_feedback(self.user, "second")
+        response = self.revalidate(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertContains(response, "second")
+
+    def test_rendered_after_logging_in_again(self):
+        etag = self.client.get(self.url)["ETag"]
+        # (a login rotates the CSRF token; the new session changes the ETag)
+        self.client.logout()
+        self.client.force_login(self.user)
+        self.assertEqual(self.revalidate(etag).status_code, 200)
+
+    def test_dashboard(self):
+        self.client.force_login(self.admin)
+        url = reverse("admin_dashboard")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, headers={"If-None-Match": etag}).status_code, 304)
+        # another filter is another page
+        self.assertEqual(self.client.get(url, {"q": "first"}, headers={"If-None-Match": etag}).status_code, 200)
+
+
+def _async_view(pattern):
+    view = getattr(async_views, pattern.callback.view_class.__name__, None)
+    return path(str(pattern.pattern), view.as_view(), name=pattern.name) if view else pattern
+
+
+class AsyncViewsURLConf:
+    """feedback_app.urls as FEEDBACK_ASYNC_VIEWS sets it up (urls.py picks the views when it is imported)."""
+    urlpatterns = [_async_view(pattern) for pattern in feedback_app_urls.urlpatterns]
+
+
+@override_settings(ROOT_URLCONF=AsyncViewsURLConf, RATELIMIT_ENABLED=False)
+class AsyncViewTests(FeedbackTestCase):
+    def setUp(self):
+        super().setUp()
+        self.feedback = make_feedback(self.user, "login is slow")
+        make_feedback(self.other, "payment failed")
+
+    def test_the_hot_views_are_async(self):
+        for name, args in [("submit_feedback", []), ("admin_dashboard", []), ("my_feedback", []),
+                           ("admin_feedback_reply", [self.feedback.pk])]:
+            view_class = resolve(reverse(name, args=args)).func.view_class
+            self.assertTrue(view_class.view_is_async, name)
+            self.assertEqual(view_class.__module__, async_views.__name__)
+
+    async def test_dashboard(self):
+        url = reverse("admin_dashboard")
+        self.assertRedirects(await self.async_client.get(url), reverse("homepage"), fetch_redirect_response=False)
+        await self.async_client.aforce_login(self.user)
+        self.assertRedirects(await self.async_client.get(url), reverse("homepage"), fetch_redirect_response=False)
+
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(url)
+        self.assertContains(response, "login is slow")
+        self.assertContains(response, "payment failed")
+        response = await self.async_client.get(url, {"q": "login"})
+        self.assertContains(response, "login is slow")
+        self.assertNotContains(response, "payment failed")
+        self.assertEqual(response.context["matching"], 1)
+
+    async def test_export_streams(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(reverse("admin_dashboard"), {"export": "ndjson"})
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(body.splitlines()), 2)
+
+    async def test_submit(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(reverse("submit_feedback"), {"message": "sent async"})
+        self.assertRedirects(response, reverse("feedback_form"), fetch_redirect_response=False)
+        self.assertTrue(await Feedback.objects.filter(user=self.user, message="sent async").aexists())
+        await self.async_client.post(reverse("submit_feedback"), {"message": "  "})
+        self.assertEqual(await Feedback.objects.acount(), 3)
+
+    async def test_reply(self):
+        url = reverse("admin_feedback_reply", args=[self.feedback.pk])
+        await self.async_client.aforce_login(self.user)
+        self.assertEqual((await self.async_client.post(url, {"message": "not staff"})).status_code, 403)
+
+        await self.async_client.aforce_login(self.admin)
+        self.assertContains(await self.async_client.get(url), "login is slow")
+        response = await self.async_client.post(url, {"message": "on it"})
+        self.assertRedirects(response, reverse("admin_dashboard"), fetch_redirect_response=False)
+        self.assertEqual([reply.message async for reply in FeedbackReply.objects.all()], ["on it"])
+        missing = reverse("admin_feedback_reply", args=[self.feedback.pk + 1000])
+        self.assertEqual((await self.async_client.get(missing)).status_code, 404)
+
+    async def test_my_feedback(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("my_feedback"))
+        self.assertContains(response, "login is slow")
+        self.assertNotContains(response, "payment failed")
+        # the second visit comes from the list cache
+        hits = caching.counters()["counters"].get("my_feedback_hit", 0)
+        self.assertContains(await self.async_client.get(reverse("my_feedback")), "login is slow")
+        self.assertEqual(caching.counters()["counters"]["my_feedback_hit"], hits + 1)
+
+
+class BulkActionTests(FeedbackTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login = [make_feedback(self.user, f"login broken {n}") for n in range(3)]
+        self.other_rows = [make_feedback(self.other, f"payment {n}") for n in range(2)]
+        FeedbackReply.objects.create(feedback=self.login[0], admin=self.admin, message="looking")
+        call_command("rebuild_feedback_stats", stdout=StringIO())
+        self.client.force_login(self.admin)
+        self.url = reverse("admin_bulk_action")
+
+    def post(self, query="", **data):
+        # the dashboard filters ride along in the query string
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url + query, data, follow=True)
+        return [str(message) for message in response.context["messages"]]
+
+    def test_delete_selected(self):
+        generation = caching.user_generation(self.user.pk)
+        messages = self.post(action="delete", ids=[self.login[0].pk, self.other_rows[0].pk, "x"])
+        self.assertEqual(messages, ["Deleted 2 feedback."])
+        self.assertEqual(Feedback.objects.count(), 3)
+        self.assertFalse(FeedbackReply.objects.exists())
+        self.assertEqual(stats.summary() | {"today": None}, {"total": 3, "replied": 0, "unreplied": 3, "today": None})
+        self.assertNotEqual(caching.user_generation(self.user.pk), generation)
+
+    def test_delete_everything_matching_the_search(self):
+        self.assertEqual(self.post("?q=login", action="delete", scope="all"), ["Deleted 3 feedback."])
+        self.assertEqual(sorted(Feedback.objects.values_list("message", flat=True)), ["payment 0", "payment 1"])
+        self.assertEqual(stats.summary()["total"], 2)
+
+    def test_reply_to_selected(self):
+        versions = dict(Feedback.objects.values_list("pk", "version"))
+        ids = [self.login[0].pk, self.login[1].pk]
+        self.assertEqual(self.post(action="reply", message="fixed now", ids=ids), ["Replied to 2 feedback."])
+        replies = FeedbackReply.objects.filter(message="fixed now")
+        self.assertCountEqual(replies.values_list("feedback_id", flat=True), ids)
+        self.assertEqual({reply.admin for reply in replies}, {self.admin})
+        # only the feedback without a reply yet counts as newly replied
+        self.assertEqual(stats.summary()["replied"], 2)
+        for pk, version in Feedback.objects.values_list("pk", "version"):
+            self.assertEqual(version, versions[pk] + (pk in ids))
+        # the owner's cards show it
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse("my_feedback")), "fixed now", count=2)
+
+    def test_refused(self):
+        self.assertEqual(self.post(action="reply", message=" ", ids=[self.login[0].pk]), ["Replies cannot be empty."])
+        self.assertEqual(self.post(action="delete"), ["Select some feedback first."])
+        self.assertEqual(self.post(action="archive", ids=[self.login[0].pk]), ["Unknown action."])
+        self.assertEqual(Feedback.objects.count(), 5)
+        self.client.force_login(self.user)
+        self.client.post(self.url, {"action": "delete", "scope": "all"})
+        self.assertEqual(Feedback.objects.count(), 5)
+
+    def test_statements_dont_grow_with_the_rows(self):
+        def statements(queryset):
+            with CaptureQueriesContext(connection) as queries:
+                moderation.bulk_reply(queryset, self.admin, "bulk")
+            return len(queries)
+
+        # (one owner each way, so the per-owner generation bumps are the same)
+        few = statements(Feedback.objects.filter(pk=self.login[1].pk))
+        for n in range(20):
+            make_feedback(self.user, f"more {n}")
+        self.assertEqual(statements(Feedback.objects.filter(user=self.user)), few)
+
+
+class DashboardUpdatesTests(FeedbackTestCase):
+    def setUp(self):
+        super().setUp()
+        self.old = make_feedback(self.user, "old one", minutes_ago=60)
+        self.client.force_login(self.admin)
+
+    def marks(self, query=""):
+        return self.client.get(reverse("admin_dashboard") + query).context["live_updates"]
+
+    def poll(self, marks, **params):
+        query = {key: marks[key] for key in ("generation", "feedback_after", "reply_after")} | params
+        return self.client.get(reverse("admin_dashboard_updates"), query).json()
+
+    def test_nothing_written(self):
+        marks = self.marks()
+        self.assertEqual(self.poll(marks, generation=caching.feedback_generation()), {"generation": caching.feedback_generation()})
+        self.assertEqual(self.client.get(reverse("admin_dashboard_updates")).status_code, 400)
+
+    def test_new_and_newly_replied_cards(self):
+        marks = self.marks()
+        with self.captureOnCommitCallbacks(execute=True):
+            new = make_feedback(self.other, "brand new")
+            reply = FeedbackReply.objects.create(feedback=self.old, admin=self.admin, message="on it")
+        data = self.poll(marks)
+        self.assertEqual(data["generation"], caching.feedback_generation())
+        self.assertEqual((data["feedback_after"], data["reply_after"]), (new.pk, reply.pk))
+        self.assertEqual([(card["id"], card["new"]) for card in data["cards"]], [(new.pk, True), (self.old.pk, False)])
+        self.assertIn("brand new", data["cards"][0]["html"])
+        self.assertIn("on it", data["cards"][1]["html"])
+
+        # the next poll from the new marks has nothing left to show
+        self.assertEqual(self.poll(data), {"generation": data["generation"]})
+        self.assertEqual(self.poll(data, generation="")["cards"], [])
+
+    def test_keeps_to_the_page_filters(self):
+        last_week = make_feedback(self.user, "last week", minutes_ago=7 * 24 * 60)
+        marks = self.marks("?date=today")
+        FeedbackReply.objects.create(feedback=last_week, admin=self.admin, message="on it")
+        today = make_feedback(self.user, "today")
+        # the filters come along in the polled url, like on the page
+        data = self.poll(marks, generation="", date="today")
+        self.assertEqual([card["id"] for card in data["cards"]], [today.pk])
+
+    def test_too_much_to_patch_in(self):
+        marks = self.marks()
+        for n in range(views.AdminDashboardUpdatesView.max_cards + 1):
+            make_feedback(self.other, f"flood {n}")
+        self.assertEqual(self.poll(marks, generation="")["reload"], True)
+
+    def test_staff_only(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("admin_dashboard_updates"), {"feedback_after": 0, "reply_after": 0})
+        self.assertRedirects(response, reverse("homepage"), fetch_redirect_response=False)
+
+
+class BootstrapTests(FeedbackTestCase):
+    def setUp(self):
+        super().setUp()
+        static_root = self.enterContext(tempfile.TemporaryDirectory())
+        build_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(STATIC_ROOT=static_root, ASSETS_BUILD_DIR=build_dir))
+        self.stamp = Path(static_root) / bootstrap.STAMP_NAME
+
+    def bootstrap(self, *args):
+        out = StringIO()
+        call_command("bootstrap", "--skip-superuser", *args, verbosity=0, stdout=out)
+        return out.getvalue().splitlines()[0]
+
+    def test_static_files_skipped_when_unchanged(self):
+        self.assertNotIn("skipped", self.bootstrap())
+        self.assertEqual(self.stamp.read_text(), assets.fingerprint())
+        self.assertTrue((Path(settings.STATIC_ROOT) / "css" / "bootstrap.min.css").is_file())
+        self.assertIn("skipped", self.bootstrap())
+        self.assertNotIn("skipped", self.bootstrap("--force-static"))
+
+        self.stamp.write_text("an older build")
+        self.assertNotIn("skipped", self.bootstrap())
+        self.assertEqual(self.stamp.read_text(), assets.fingerprint())
+
+    @override_settings(STORAGES={
+        **settings.STORAGES,
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.ManifestStaticFilesStorage"},
+    })
+    def test_missing_manifest_collects(self):
+        self.bootstrap()
+        manifest = Path(settings.STATIC_ROOT) / "staticfiles.json"
+        self.assertIn("skipped", self.bootstrap())
+        manifest.unlink()
+        self.assertNotIn("skipped", self.bootstrap())
+        self.assertTrue(manifest.is_file())
+
+    def test_superuser(self):
+        def run():
+            out = StringIO()
+            call_command("bootstrap", verbosity=0, stdout=out)
+            return out.getvalue().splitlines()[1]
+
+        self.stamp.write_text(assets.fingerprint())
+        with mock.patch.dict(os.environ, {"DJANGO_SUPERUSER_USERNAME": "root", "DJANGO_SUPERUSER_PASSWORD": ""}):
+            self.assertIn("not set, skipped", run())
+        with mock.patch.dict(os.environ, {"DJANGO_SUPERUSER_USERNAME": "root", "DJANGO_SUPERUSER_PASSWORD": "s3cret"}):
+            self.assertEqual(run(), "superuser: root created")
+            self.assertTrue(User.objects.get(username="root").is_superuser)
+            # a single lookup, not an INSERT that fails
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(run(), "superuser: root exists")
+            self.assertEqual(len(queries), 1)
+            self.assertTrue(queries[0]["sql"].startswith("SELECT"))
@@ -1,16 +1,28 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# under ASGI (FEEDBACK_ASYNC_VIEWS on) the busiest views come from async_views
+if settings.FEEDBACK_ASYNC_VIEWS:
+    from . import async_views as hot_views
+else:
+    hot_views = views
+
 urlpatterns = [
     path('',views.HomePageView.as_view(),name="homepage"),
     path('register/',views.UserRegistrationView.as_view(),name="register"),
     path('login/',views.UserLoginView.as_view(),name="login"),
     path('logout/',views.UserLogoutView.as_view(),name="logout"),
     path('feedback_form',views.FeedbackFormView.as_view(),name="feedback_form"),
-    path('feedback/submit',views.SubmitFeedbackView.as_view(),name="submit_feedback"),
-    path('dashboard',views.AdminDashboardView.as_view(),name="admin_dashboard"), # admin dashboard panel url
-    path('dashboard/feedback/<int:pk>/reply/',views.AdminFeedbackReplyView.as_view(),name="admin_feedback_reply"), # admin reply url
-    path('my/feedback/',views.MyFeedbackView.as_view(),name="my_feedback"),  # regular user feedback list url
+    path('feedback/submit',hot_views.SubmitFeedbackView.as_view(),name="submit_feedback"),
+    path('feedback/import',views.FeedbackImportView.as_view(),name="import_feedback"), # NDJSON bulk import (token auth)
+    path('dashboard',hot_views.AdminDashboardView.as_view(),name="admin_dashboard"), # admin dashboard panel url
+    path('dashboard/updates',views.AdminDashboardUpdatesView.as_view(),name="admin_dashboard_updates"), # new cards since a mark, JSON (staff)
+    path('dashboard/bulk',views.AdminBulkActionView.as_view(),name="admin_bulk_action"), # bulk delete / reply (staff)
+    path('dashboard/cache-stats',views.CacheStatsView.as_view(),name="cache_stats"), # card cache hit/miss counters (staff)
+    path('metrics/',views.MetricsView.as_view(),name="metrics"), # Prometheus metrics (staff)
+    path('dashboard/feedback/<int:pk>/reply/',hot_views.AdminFeedbackReplyView.as_view(),name="admin_feedback_reply"), # admin reply url
+    path('my/feedback/',hot_views.MyFeedbackView.as_view(),name="my_feedback"),  # regular user feedback list url
     path('update/feedback/<int:pk>/',views.EditFeedbackView.as_view(),name="edit_feedback"),
     path('delete/feedback/<int:pk>/',views.DeleteFeedbackView.as_view(),name="delete_feedback")
 ]
\ No newline at end of file
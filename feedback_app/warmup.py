@@ -0,0 +1,110 @@
+"""
+Per-process start-up work done ahead of the first request.
+
+gunicorn.conf.py calls warm_up() in the gunicorn master after it has loaded
+the app (preload_app) and before it forks, so every worker starts with the
+URL resolvers built, the project's templates compiled (the cached template
+loader keeps them) and the static manifest loaded, shared copy-on-write
+instead of being redone by each worker's first requests. Database
+connections can't cross a fork: the master only checks that every database
+answers and closes again, and connect() opens the worker's own connections
+afterwards.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.urls import get_resolver
+from django.utils import translation
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_SUFFIXES = {".html", ".txt"}
+
+
+def _timed(timings, name, func):
+    started = time.perf_counter()
+    result = func()
+    timings[name] = time.perf_counter() - started
+    return result
+
+
+def resolve_urls():
+    # imports every view module and builds the reverse() lookup tables
+    resolver = get_resolver()
+    resolver.url_patterns
+    resolver._populate()
+    return len(resolver.reverse_dict)
+
+
+def project_templates(engine):
+    """(name, path) of the templates under BASE_DIR that `engine` can load; Django's own are left alone."""
+    base = Path(settings.BASE_DIR).resolve()
+    for directory in map(Path, engine.template_dirs):
+        directory = directory.resolve() if directory.is_absolute() else (base / directory).resolve()
+        if not directory.is_dir() or not directory.is_relative_to(base):
+            continue
+        for path in sorted(directory.rglob("*")):
+            if path.suffix in TEMPLATE_SUFFIXES:
+                yield path.relative_to(directory).as_posix(), path
+
+
+def compile_templates():
+    compiled = 0
+    for engine in engines.all():
+        for name, path in project_templates(engine):
+            try:
+                engine.get_template(name)
+                compiled += 1
+            except Exception:
+                # a broken template should fail its own page, not the boot
+                logger.warning("warm-up: could not compile template %s", path, exc_info=True)
+    return compiled
+
+
+def load_static():
+    # reads the static manifest (hashed names) and the critical CSS base.html inlines
+    from .templatetags.assets import stylesheets
+    stylesheets()
+
+
+def load_translations():
+    # loads the gettext catalogs; requests activate the language themselves
+    translation.activate(settings.LANGUAGE_CODE)
+    translation.deactivate()
+
+
+def check_databases():
+    try:
+        for alias in connections:
+            connections[alias].ensure_connection()
+    except Exception:
+        # not fatal here: the workers connect (and fail) on their own
+        logger.warning("warm-up: database check failed", exc_info=True)
+    finally:
+        # a connection opened before fork would be shared by every worker
+        connections.close_all()
+
+
+def warm_up():
+    """Run in the master before forking. Returns {step: seconds}."""
+    timings = {}
+    _timed(timings, "urls", resolve_urls)
+    _timed(timings, "templates", compile_templates)
+    _timed(timings, "translations", load_translations)
+    _timed(timings, "static", load_static)
+    _timed(timings, "databases", check_databases)
+    return timings
+
+
+def connect():
+    """Open this thread's database connections (kept for CONN_MAX_AGE) so a request doesn't wait on the handshake."""
+    for alias in connections:
+        try:
+            connections[alias].ensure_connection()
+        except Exception:
+            # the request will retry and report it
+            logger.warning("warm-up: could not connect to database %r", alias, exc_info=True)
@@ -0,0 +1,54 @@
+"""
+Gunicorn settings. gunicorn reads ./gunicorn.conf.py by itself; command line
+options (e.g. -k uvicorn.workers.UvicornWorker) still override these.
+
+The master loads Django once (preload_app) and warms it up before forking
+(feedback_app/warmup.py), so new workers answer their first request without
+first importing the views, building the URL resolvers and compiling the
+templates. Code changes need a full restart: HUP reloads the workers from
+the master's already-imported code.
+"""
+import os
+import threading
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+# workers: WEB_CONCURRENCY, gunicorn's own default
+worker_class = "gthread"
+threads = 4
+preload_app = True
+
+
+def when_ready(server):
+    # after the app is loaded, before the first fork
+    if not server.cfg.preload_app:
+        return
+    from feedback_app import warmup
+    timings = warmup.warm_up()
+    server.log.info("warm-up: %s", ", ".join(f"{step} {seconds * 1000:.0f} ms" for step, seconds in timings.items()))
+
+
+def post_worker_init(worker):
+    from gunicorn.workers.sync import SyncWorker
+
+    from feedback_app import warmup
+    if isinstance(worker, SyncWorker):
+        # requests run on this thread
+        warmup.connect()
+        return
+    pool = getattr(worker, "tpool", None)  # gthread
+    if pool is None:
+        # ASGI workers get a fresh connection per request anyway
+        return
+    # Django connections are per thread: open one on each of the pool's threads
+    # (the barrier keeps every task on a thread of its own)
+    barrier = threading.Barrier(worker.cfg.threads)
+
+    def connect():
+        warmup.connect()
+        try:
+            barrier.wait(timeout=5)
+        except threading.BrokenBarrierError:
+            pass
+
+    for _ in range(worker.cfg.threads):
+        pool.submit(connect)